@@ -0,0 +1,78 @@
+"""Поля ответов API и выражения ``values()``, из которых они читаются."""
+from django.core.files.storage import default_storage
+
+FIELDS_PARAM = 'fields'
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def image_url(name):
+    return default_storage.url(name) if name else None
+
+
+class FieldSet:
+    """Имена полей ответа и соответствующие им выражения values()."""
+
+    def __init__(self, lookups, converters=None):
+        self.lookups = lookups
+        self.converters = converters or {}
+
+    def prefixed(self, prefix, **overrides):
+        """Те же поля, читаемые через связь prefix."""
+        lookups = {
+            name: overrides.get(name, prefix + lookup)
+            for name, lookup in self.lookups.items()
+        }
+        return FieldSet(lookups, self.converters)
+
+    def requested(self, request):
+        """Поля из ``?fields=a,b``, по умолчанию все."""
+        names = [
+            name.strip()
+            for name in request.GET.get(FIELDS_PARAM, '').split(',')
+            if name.strip()
+        ]
+        if not names:
+            return list(self.lookups)
+        unknown = sorted(set(names) - set(self.lookups))
+        if unknown:
+            raise InvalidFields('Неизвестные поля: %s' % ', '.join(unknown))
+        return list(dict.fromkeys(names))
+
+    def columns(self, names, ordering=()):
+        """Аргументы values(): поля ответа и ключи пагинации."""
+        columns = [self.lookups[name] for name in names]
+        columns += [field.lstrip('-') for field in ordering]
+        return list(dict.fromkeys(columns))
+
+    def serialize(self, row, names):
+        result = {}
+        for name in names:
+            value = row[self.lookups[name]]
+            converter = self.converters.get(name)
+            result[name] = value if converter is None else converter(value)
+        return result
+
+
+POST_FIELDS = FieldSet({
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'modified': 'modified',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}, {'image': image_url})
+
+TIMELINE_FIELDS = POST_FIELDS.prefixed(
+    'post__', id='post_id', pub_date='pub_date')
+
+COMMENT_FIELDS = FieldSet({
+    'id': 'pk',
+    'text': 'text',
+    'author': 'author__username',
+    'created': 'created',
+})
@@ -0,0 +1,180 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='cats',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text='Пост %s' % i, author=cls.author, group=cls.group)
+            for i in range(3)
+        ]
+        cls.post = cls.posts[-1]
+        for i in range(3):
+            Comment.objects.create(
+                text='Комментарий %s' % i, author=cls.user, post=cls.post)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_lists_mirror_posts_urls(self):
+        """Списки API отдают те же посты, что и страницы"""
+        expected = [post.pk for post in reversed(self.posts)]
+        cases = (
+            (self.guest_client, 'api:v1:index', {}),
+            (self.guest_client, 'api:v1:group_list', {'slug': 'cats'}),
+            (self.guest_client, 'api:v1:profile', {'username': 'author'}),
+            (self.authorized_client, 'api:v1:follow_index', {}),
+        )
+        for client, name, kwargs in cases:
+            with self.subTest(name=name):
+                response = client.get(reverse(name, kwargs=kwargs))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    [post['id'] for post in response.json()['results']],
+                    expected)
+
+    def test_post_fields(self):
+        """Пост сериализуется со всеми полями"""
+        response = self.guest_client.get(reverse(
+            'api:v1:post_detail', kwargs={'post_id': self.post.pk}))
+        data = response.json()
+        self.assertEqual(data['post'], {
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': self.post.pub_date.isoformat()[:23] + 'Z',
+            'modified': self.post.modified.isoformat()[:23] + 'Z',
+            'author': 'author',
+            'group': 'cats',
+            'image': None,
+            'comments_count': 3,
+        })
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Комментарий 0', 'Комментарий 1', 'Комментарий 2'])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет только перечисленные поля"""
+        response = self.guest_client.get(
+            reverse('api:v1:index'), {'fields': 'id,author'})
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.post.pk, 'author': 'author'})
+        response = self.guest_client.get(
+            reverse('api:v1:index'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(NUMBER_OF_POSTS=2)
+    def test_cursor_pagination(self):
+        """Ссылка next ведёт на следующую страницу"""
+        first = self.guest_client.get(
+            reverse('api:v1:index'), {'fields': 'id'}).json()
+        self.assertIsNone(first['previous'])
+        second = self.guest_client.get(first['next']).json()
+        self.assertEqual(
+            [post['id'] for post in first['results'] + second['results']],
+            [post.pk for post in reversed(self.posts)])
+        self.assertIsNone(second['next'])
+        self.assertIn('fields=id', first['next'])
+
+    def test_list_is_one_query(self):
+        """Гостевой список постов читается одним запросом"""
+        self.guest_client.get(reverse('api:v1:index'))
+        with self.assertNumQueries(1):
+            self.guest_client.get(reverse('api:v1:index'), {'page': 2})
+
+    def test_unchanged_poll_returns_304(self):
+        """Повторный опрос с ETag или датой получает 304 без базы"""
+        url = reverse('api:v1:index')
+        response = self.guest_client.get(url)
+        cases = {
+            'HTTP_IF_NONE_MATCH': response['ETag'],
+            'HTTP_IF_MODIFIED_SINCE': response['Last-Modified'],
+        }
+        for header, value in cases.items():
+            with self.subTest(header=header):
+                with self.assertNumQueries(0):
+                    repeated = self.guest_client.get(url, **{header: value})
+                self.assertEqual(repeated.status_code, 304)
+
+    def test_changes_update_etag(self):
+        """Новый пост, комментарий или подписка меняют ETag"""
+        detail = reverse(
+            'api:v1:post_detail', kwargs={'post_id': self.post.pk})
+        cases = {
+            reverse('api:v1:index'): lambda: Post.objects.create(
+                text='Новый', author=self.author),
+            detail: lambda: Comment.objects.create(
+                text='Новый', author=self.user, post=self.post),
+            reverse('api:v1:profile', args=('reader',)): lambda: (
+                Follow.objects.create(user=self.author, author=self.user)),
+        }
+        for url, change in cases.items():
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                change()
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_following_changes_follower_profile(self):
+        """Подписка и отписка профиля меняют его ETag и счётчик"""
+        url = reverse('api:v1:profile', args=('reader',))
+        other = User.objects.create_user(username='other')
+        changes = (
+            lambda: Follow.objects.create(user=self.user, author=other),
+            lambda: Follow.objects.filter(
+                user=self.user, author=other).delete(),
+        )
+        for following, change in zip((2, 1), changes):
+            with self.subTest(following=following):
+                etag = self.guest_client.get(url)['ETag']
+                change()
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.json()['author']['following_count'],
+                    following)
+
+    def test_etag_depends_on_query(self):
+        """ETag разных страниц и наборов полей различается"""
+        url = reverse('api:v1:index')
+        self.assertNotEqual(
+            self.guest_client.get(url)['ETag'],
+            self.guest_client.get(url, {'fields': 'id'})['ETag'])
+
+    def test_errors(self):
+        """Несуществующие объекты, гость в ленте и POST дают ошибки"""
+        cases = (
+            ('get', 'api:v1:group_list', {'slug': 'dogs'}, 404),
+            ('get', 'api:v1:profile', {'username': 'nobody'}, 404),
+            ('get', 'api:v1:post_detail', {'post_id': 0}, 404),
+            ('get', 'api:v1:follow_index', {}, 401),
+            ('post', 'api:v1:index', {}, 405),
+        )
+        for method, name, kwargs, status in cases:
+            with self.subTest(name=name, method=method):
+                response = getattr(self.guest_client, method)(
+                    reverse(name, kwargs=kwargs))
+                self.assertEqual(response.status_code, status)
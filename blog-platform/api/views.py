@@ -0,0 +1,182 @@
+"""Версия 1 API только для чтения.
+
+Адреса повторяют ``posts.urls``. Записи читаются через ``values()`` без
+создания моделей, ``?fields=`` сужает набор полей, страницы листаются
+курсором ``?cursor=`` из ``posts.utils.paginate``.
+
+Каждый ответ несёт сильный ``ETag`` и ``Last-Modified`` из отметок
+``posts.freshness``, поэтому повторный опрос без изменений получает 304
+без запросов к базе. Для ленты подписок к ним добавляется дата
+последней записи ленты, которая читается одним шагом по индексу.
+"""
+from functools import wraps
+
+from django.db.models import Max
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from posts import counters, freshness, timeline
+from posts.models import Comment, Group, Post, TimelineEntry, User
+from posts.utils import COMMENT_ORDERING, POST_ORDERING, paginate
+
+from .serializers import (COMMENT_FIELDS, POST_FIELDS, TIMELINE_FIELDS,
+                          InvalidFields)
+
+GROUP_FIELDS = ('title', 'slug', 'description')
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def api_view(view):
+    """GET и HEAD, ошибки полей — ответ 400."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except InvalidFields as invalid:
+            return error(400, str(invalid))
+    return wrapper
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error(401, 'Требуется вход.')
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def site_state(request, **kwargs):
+    return freshness.state(freshness.SITE, freshness.NAMES)
+
+
+def group_state(request, slug):
+    return freshness.state(
+        freshness.SITE, freshness.group(slug), freshness.NAMES)
+
+
+def profile_state(request, username):
+    # Подписки в обе стороны меняют отметку автора, от неё зависят счётчики.
+    return freshness.state(
+        freshness.SITE, freshness.author(username), freshness.NAMES)
+
+
+def post_state(request, post_id):
+    return freshness.state(freshness.post(post_id), freshness.NAMES)
+
+
+def follow_state(request):
+    timeline.schedule_pull(request.user.pk)
+    changed, version = freshness.state(freshness.SITE, freshness.NAMES)
+    newest = TimelineEntry.objects.filter(user=request.user).aggregate(
+        newest=Max('pub_date'))['newest']
+    following = counters.get_user_counter(request.user).following_count
+    return max(changed, newest or changed), '%s|%s|%s|%s' % (
+        version, request.user.pk, following, newest)
+
+
+def _link(request, page, querystring):
+    return request.path + '?' + querystring if page else None
+
+
+def page_data(request, queryset, fields, ordering, names=None):
+    """Страница выборки values() с полями names или из ``?fields=``."""
+    if names is None:
+        names = fields.requested(request)
+    page = paginate(
+        request,
+        queryset.values(*fields.columns(names, ordering)),
+        ordering=ordering,
+    )
+    return {
+        'results': [fields.serialize(row, names) for row in page],
+        'next': _link(request, page.has_next(), page.next_querystring),
+        'previous': _link(
+            request, page.has_previous(), page.previous_querystring),
+    }
+
+
+def respond(data):
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+
+@api_view
+@freshness.conditional(site_state)
+def index(request):
+    return respond(page_data(
+        request, Post.objects.all(), POST_FIELDS, POST_ORDERING))
+
+
+@api_view
+@freshness.conditional(group_state)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).values(
+        'pk', *GROUP_FIELDS).first()
+    if group is None:
+        return error(404, 'Группа не найдена.')
+    data = page_data(
+        request,
+        Post.objects.filter(group_id=group.pop('pk')),
+        POST_FIELDS,
+        POST_ORDERING,
+    )
+    data['group'] = group
+    return respond(data)
+
+
+@api_view
+@freshness.conditional(profile_state)
+def profile(request, username):
+    author = User.objects.filter(username=username).values(
+        'pk', 'username', 'first_name', 'last_name',
+        'counters__posts_count', 'counters__followers_count',
+        'counters__following_count',
+    ).first()
+    if author is None:
+        return error(404, 'Автор не найден.')
+    data = page_data(
+        request,
+        Post.objects.filter(author_id=author.pop('pk')),
+        POST_FIELDS,
+        POST_ORDERING,
+    )
+    data['author'] = {
+        name.replace('counters__', ''): value
+        for name, value in author.items()
+    }
+    return respond(data)
+
+
+@api_view
+@freshness.conditional(post_state)
+def post_detail(request, post_id):
+    names = POST_FIELDS.requested(request)
+    post = Post.objects.filter(pk=post_id).values(
+        *POST_FIELDS.columns(names)).first()
+    if post is None:
+        return error(404, 'Пост не найден.')
+    data = page_data(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS,
+        COMMENT_ORDERING,
+        names=list(COMMENT_FIELDS.lookups),
+    )
+    data['post'] = POST_FIELDS.serialize(post, names)
+    return respond(data)
+
+
+@api_view
+@api_login_required
+@freshness.conditional(follow_state)
+def follow_index(request):
+    return respond(page_data(
+        request,
+        TimelineEntry.objects.filter(user=request.user),
+        TIMELINE_FIELDS,
+        timeline.TIMELINE_ORDERING,
+    ))
@@ -4,6 +4,61 @@ import os
 load_dotenv()
 
 NUMBER_OF_POSTS = 10
+NUMBER_OF_COMMENTS = 20
+NUMBER_OF_FOLLOWS = 50
+
+TIMELINE_FANOUT_LIMIT = 10000
+# Сколько последних постов автора попадает в ленту подписок; более
+# старые в ней не показываются.
+TIMELINE_BACKFILL = 500
+TIMELINE_BATCH_SIZE = 1000
+
+POST_CARD_TIMEOUT = 60 * 60 * 24
+
+TRENDING_HALF_LIFE = 60 * 60 * 12
+TRENDING_FLUSH_INTERVAL = 10
+TRENDING_BATCH_SIZE = 500
+TRENDING_FOLLOW_POSTS = 5
+
+FOLLOW_GRAPH_MAX_AGE = 60 * 60
+SUGGESTIONS_COUNT = 5
+SUGGESTIONS_TIMEOUT = 60 * 10
+SUGGESTIONS_SAMPLE = 100
+SUGGESTIONS_MAX_VISITS = 50000
+
+NOTIFICATION_BATCH_SIZE = 1000
+NOTIFICATION_RETENTION_DAYS = 30
+NOTIFICATION_UNREAD_TIMEOUT = 60 * 10
+
+FEED_ITEMS = 50
+FEED_TIMEOUT = 60 * 60 * 24
+
+IMAGE_MAX_SIZE = 2048
+IMAGE_WIDTHS = (480, 960, 1920)
+IMAGE_QUALITY = 85
+
+BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', 2))
+TASK_MAX_ATTEMPTS = 5
+TASK_BACKOFF = 10
+TASK_TIMEOUT = 60 * 10
+TASK_RETENTION_DAYS = 7
+
+# Ведро токенов на пользователя: (размер, секунд до полного наполнения).
+THROTTLE_RATES = {
+    'post': (10, 60 * 60),
+    'comment': (20, 60 * 10),
+    'follow': (60, 60 * 10),
+}
+
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5
+
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+
+AUTHENTICATION_BACKENDS = ['core.auth.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = 60 * 60
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -21,6 +76,8 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'assets')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
 
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 SECRET_KEY = os.getenv('SECRET_KEY')
@@ -48,11 +105,12 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,13 +118,18 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
 
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+
 ROOT_URLCONF = 'blog-platform.urls'
 
 TEMPLATES = [
@@ -80,6 +143,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'posts.context_processors.inbox',
             ],
         },
     },
@@ -90,11 +154,24 @@ WSGI_APPLICATION = 'blog-platform.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            'pragmas': {
+                'journal_mode': 'wal',
+                'synchronous': 'normal',
+                'busy_timeout': 5000,
+                'mmap_size': 256 * 2 ** 20,
+                'cache_size': -64 * 2 ** 10,
+            },
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+DATABASE_WRITE_ATTEMPTS = 5
+DATABASE_WRITE_BACKOFF = 0.05
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -113,10 +190,18 @@ AUTH_PASSWORD_VALIDATORS = [
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 2 ** 20,
+        },
     }
 }
 
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
@@ -0,0 +1,46 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'key',
+        'status',
+        'attempts',
+        'run_at',
+        'finished',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key')
+    readonly_fields = (
+        'name', 'args', 'key', 'created', 'started', 'finished', 'error')
+    actions = ('retry', 'cancel')
+    empty_value_display = '-пусто-'
+
+    def retry(self, request, queryset):
+        # Аргументы сохраняются только у упавших задач. В очереди может
+        # ждать только одна задача с ключом.
+        pending = Task.objects.filter(
+            status=Task.PENDING, key__isnull=False).values('key')
+        latest = {}
+        for pk, key in (
+                queryset.filter(status=Task.FAILED)
+                .exclude(key__in=pending)
+                .order_by('pk').values_list('pk', 'key')):
+            latest[key or pk] = pk
+        Task.objects.filter(pk__in=latest.values()).update(
+            status=Task.PENDING, run_at=timezone.now(), attempts=0,
+            finished=None)
+    retry.short_description = 'Повторить'
+
+    def cancel(self, request, queryset):
+        queryset.filter(status=Task.PENDING).update(
+            status=Task.FAILED, finished=timezone.now(), error='Отменена')
+    cancel.short_description = 'Отменить'
+
+
+admin.site.register(Task, TaskAdmin)
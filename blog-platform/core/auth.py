@@ -0,0 +1,34 @@
+"""Пользователь запроса из кеша.
+
+``CachedModelBackend.get_user`` читает пользователя сессии из кеша, а
+``forget_user`` удаляет запись при каждом сохранении и удалении
+пользователя: входе (``last_login``), смене и сбросе пароля, правке
+имени. Хеш пароля в закешированном пользователе поэтому всегда
+текущий, и ``get_user`` Django разлогинивает сессии после смены пароля
+как обычно. Сессии хранит движок ``cached_db``, который при выходе
+удаляет их и из кеша, и из базы.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+USER_KEY = 'auth_user:%s'
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = USER_KEY % user_id
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+            return user
+        return user if self.user_can_authenticate(user) else None
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def forget_user(sender, instance, **kwargs):
+    cache.delete(USER_KEY % instance.pk)
@@ -0,0 +1,42 @@
+"""Выполнение тяжёлой работы вне потока запроса.
+
+Задачи записываются в очередь ``core.tasks`` в текущей транзакции и
+выполняются командой ``run_tasks``. При ``BACKGROUND_WORKERS = 0``
+задача выполняется сразу, в текущем потоке.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import connections
+
+
+def init_worker():
+    """Готовит дочерний процесс пула к работе с Django."""
+    django.setup()
+    for connection in connections.all():
+        # Соединение, унаследованное от родителя через fork, не трогаем.
+        connection.connection = None
+
+
+def create_executor(workers):
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('fork'),
+        initializer=init_worker,
+    )
+
+
+def run_in_background(func, *args, key=None):
+    """Ставит func(*args) в очередь фоновых задач.
+
+    func должна импортироваться по пути, а её аргументы — сериализоваться
+    в JSON. Пока в очереди ждёт задача с тем же key, новая не ставится.
+    """
+    if not settings.BACKGROUND_WORKERS:
+        func(*args)
+        return
+    from .tasks import enqueue
+    enqueue(func, *args, key=key)
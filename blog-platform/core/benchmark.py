@@ -0,0 +1,381 @@
+"""Нагрузочный замер именованных адресов приложений.
+
+Адреса запрашиваются параллельными клиентами ``django.test.Client`` в
+потоках текущего процесса, поэтому вместе со временем ответа видны
+число SQL-запросов на запрос и память процесса. Результат — словарь,
+который сохраняется в JSON и сравнивается с прошлыми прогонами.
+
+Это сравнение версий кода между собой, а не замер развёрнутого сайта:
+запросы не проходят через HTTP-сервер и WSGI-воркеры, потоки делят
+один GIL и кеши процесса, а RSS — память самого замера. Задержки и
+память в бою будут другими; для них нужен внешний нагрузочный
+инструмент против запущенного сервера.
+
+``contention`` нагружает базу из нескольких процессов смесью чтений и
+записей и сравнивает пропускную способность и ошибки «database is
+locked» с настройками SQLite из ``core.db`` и без них, а
+``cache_contention`` так же сравнивает бэкенды кеша: скорость операций и
+долю попаданий, когда ключи читают и пишут несколько процессов.
+"""
+import math
+import platform
+import random
+import resource
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, URLPattern, get_resolver, reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .background import create_executor
+
+NAMESPACES = ('posts', 'users', 'about')
+PERCENTILES = (50, 95, 99)
+
+# Адрес вне INTERNAL_IPS, чтобы не включалась панель django-debug-toolbar.
+REMOTE_ADDR = '10.0.0.1'
+
+# После этих адресов клиент теряет сессию и входит заново.
+RELOGIN_ROUTES = {'users:logout'}
+
+# Настройки базы для contention: None — как в settings.
+DATABASE_MODES = {
+    # Журнал отката, транзакции DEFERRED и запись без повторов.
+    'baseline': (
+        {'pragmas': {'journal_mode': 'delete'},
+         'transaction_mode': 'DEFERRED'},
+        1,
+    ),
+    'tuned': (None, None),
+}
+
+
+def named_routes(namespaces=NAMESPACES):
+    """Имена адресов пространств имён и аргументы, которые им нужны."""
+    resolver = get_resolver()
+    routes = []
+    for namespace in namespaces:
+        _, namespace_resolver = resolver.namespace_dict[namespace]
+        for pattern in namespace_resolver.url_patterns:
+            if isinstance(pattern, URLPattern) and pattern.name:
+                routes.append((
+                    '%s:%s' % (namespace, pattern.name),
+                    list(pattern.pattern.converters),
+                ))
+    return routes
+
+
+def route_urls(routes, sample_kwargs):
+    """Собирает url каждого адреса, возвращает их и список пропущенных."""
+    urls = {}
+    skipped = []
+    for name, arguments in routes:
+        try:
+            urls[name] = reverse(name, kwargs={
+                argument: sample_kwargs[argument] for argument in arguments})
+        except (KeyError, NoReverseMatch):
+            skipped.append(name)
+    return urls, skipped
+
+
+def percentile(values, percent):
+    """Процентиль по ближайшему рангу для отсортированного списка."""
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+    return values[rank]
+
+
+def rss_bytes():
+    """Текущая резидентная память процесса, без /proc — пиковая."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _client(user):
+    client = Client(REMOTE_ADDR=REMOTE_ADDR)
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def _request(client, name, url, user):
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        try:
+            status = client.get(url).status_code
+        except Exception:
+            status = 500
+        elapsed = time.perf_counter() - started
+    if name in RELOGIN_ROUTES and user is not None:
+        client.force_login(user)
+    return elapsed, len(queries), status
+
+
+def _worker(name, url, user, count):
+    client = _client(user)
+    try:
+        return [_request(client, name, url, user) for _ in range(count)]
+    finally:
+        connections.close_all()
+
+
+def _shares(total, parts):
+    return [total // parts + (part < total % parts) for part in range(parts)]
+
+
+def measure(name, url, user=None, requests=50, concurrency=4, warmup=1):
+    """Замер одного адреса: задержки, запросы к базе и ответы."""
+    client = _client(user)
+    for _ in range(warmup):
+        _request(client, name, url, user)
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as executor:
+            futures = [
+                executor.submit(_worker, name, url, user, count)
+                for count in _shares(requests, concurrency) if count
+            ]
+            samples = [
+                sample for future in futures for sample in future.result()]
+    else:
+        samples = [
+            _request(client, name, url, user) for _ in range(requests)]
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    statuses = Counter(sample[2] for sample in samples)
+    result = {
+        'url': url,
+        'requests': len(samples),
+        'errors': sum(
+            count for status, count in statuses.items() if status >= 500),
+        'statuses': {
+            str(status): count for status, count in statuses.items()},
+        'mean_ms': sum(latencies) / len(latencies) if latencies else None,
+        'queries': (
+            sum(sample[1] for sample in samples) / len(samples)
+            if samples else None),
+        'rss_mb': rss_bytes() / 2 ** 20,
+    }
+    for percent in PERCENTILES:
+        result['p%s_ms' % percent] = percentile(latencies, percent)
+    return result
+
+
+def run(urls, user=None, requests=50, concurrency=4, warmup=1):
+    """Замеряет адреса по очереди и собирает отчёт прогона."""
+    started = timezone.now()
+    results = {
+        name: measure(name, url, user, requests, concurrency, warmup)
+        for name, url in urls.items()
+    }
+    return {
+        'started': started.isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'requests': requests,
+        'concurrency': concurrency,
+        'peak_rss_mb': max(
+            [result['rss_mb'] for result in results.values()], default=0),
+        'routes': results,
+    }
+
+
+def compare(previous, current, metrics=('p95_ms', 'queries')):
+    """Изменения метрик по адресам, которые есть в обоих прогонах."""
+    changes = {}
+    for name, result in current['routes'].items():
+        before = previous.get('routes', {}).get(name)
+        if before is None:
+            continue
+        changes[name] = {
+            metric: result[metric] - before[metric]
+            for metric in metrics
+            if result.get(metric) is not None
+            and before.get(metric) is not None
+        }
+    return changes
+
+
+@contextmanager
+def database_mode(mode):
+    """Переключает соединение по умолчанию на настройки режима mode.
+
+    Дочерние процессы пула наследуют настройки при fork. Режим журнала
+    хранится в файле базы, поэтому соединение открывается сразу.
+    """
+    options, attempts = DATABASE_MODES[mode]
+    if options is None:
+        yield
+        return
+    saved = connection.settings_dict['OPTIONS']
+    connection.close()
+    connection.settings_dict['OPTIONS'] = options
+    try:
+        with override_settings(DATABASE_WRITE_ATTEMPTS=attempts):
+            connection.ensure_connection()
+            yield
+    finally:
+        connection.close()
+        connection.settings_dict['OPTIONS'] = saved
+        connection.ensure_connection()
+
+
+def contention_worker(user, reads, writes, duration, write_ratio, seed):
+    """Чтения и записи вперемешку в течение duration секунд."""
+    client = _client(user)
+    rng = random.Random(seed)
+    samples = []
+    deadline = time.monotonic() + duration
+    try:
+        while time.monotonic() < deadline:
+            kind = 'write' if rng.random() < write_ratio else 'read'
+            started = time.perf_counter()
+            try:
+                if kind == 'write':
+                    status = client.post(*rng.choice(writes)).status_code
+                else:
+                    status = client.get(rng.choice(reads)).status_code
+            except Exception:
+                status = 500
+            samples.append((kind, time.perf_counter() - started, status))
+    finally:
+        connections.close_all()
+    return samples
+
+
+def _summary(samples, duration):
+    latencies = sorted(sample[1] * 1000 for sample in samples)
+    result = {
+        'operations': len(samples),
+        'per_second': len(samples) / duration,
+        'errors': sum(1 for sample in samples if sample[2] >= 500),
+    }
+    for percent in PERCENTILES:
+        result['p%s_ms' % percent] = percentile(latencies, percent)
+    return result
+
+
+def contention(reads, writes, user=None, mode='tuned', processes=4,
+               duration=10, write_ratio=0.2, seed=0):
+    """Замер чтений reads и записей writes из processes процессов.
+
+    reads — список адресов для GET, writes — пары (адрес, данные) для
+    POST. Каждый процесс работает со своим соединением к базе.
+    """
+    with database_mode(mode):
+        with create_executor(processes) as executor:
+            futures = [
+                executor.submit(
+                    contention_worker, user, reads, writes, duration,
+                    write_ratio, seed + number)
+                for number in range(processes)
+            ]
+            samples = [
+                sample for future in futures for sample in future.result()]
+    return {
+        'mode': mode,
+        'processes': processes,
+        'duration': duration,
+        'write_ratio': write_ratio,
+        'total': _summary(samples, duration),
+        'read': _summary(
+            [sample for sample in samples if sample[0] == 'read'], duration),
+        'write': _summary(
+            [sample for sample in samples if sample[0] == 'write'],
+            duration),
+    }
+
+
+def cache_backends(directory):
+    """Бэкенды кеша для сравнения; файлы кладутся в directory."""
+    return {
+        'locmem': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'benchmark',
+        },
+        'filebased': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory + '/filebased',
+        },
+        'sqlite': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': directory + '/cache.sqlite3',
+        },
+    }
+
+
+def create_cache(config):
+    params = {'OPTIONS': {'MAX_ENTRIES': 100000}}
+    params.update(config)
+    return import_string(params.pop('BACKEND'))(params['LOCATION'], params)
+
+
+def cache_worker(config, operations, keys, value_size, seed):
+    """Чтение с заполнением при промахе, get_many и incr по ключам."""
+    cache = create_cache(config)
+    rng = random.Random(seed)
+    value = 'x' * value_size
+    samples = []
+    hits = misses = 0
+    for _ in range(operations):
+        # Квадрат смещает выбор к первым ключам, как у популярных страниц.
+        key = 'key:%s' % int(keys * rng.random() ** 2)
+        choice = rng.random()
+        started = time.perf_counter()
+        if choice < 0.1:
+            operation = 'get_many'
+            cache.get_many(['key:%s' % rng.randrange(keys) for _ in range(10)])
+        elif choice < 0.15:
+            operation = 'incr'
+            if not cache.add('counter', 1):
+                cache.incr('counter')
+        else:
+            operation = 'get'
+            if cache.get(key) is None:
+                misses += 1
+                cache.set(key, value)
+            else:
+                hits += 1
+        samples.append((operation, time.perf_counter() - started))
+    return samples, hits, misses
+
+
+def cache_contention(config, processes=4, operations=1000, keys=1000,
+                     value_size=1000, seed=0):
+    """Замер бэкенда кеша config из processes процессов."""
+    started = time.perf_counter()
+    with create_executor(processes) as executor:
+        futures = [
+            executor.submit(
+                cache_worker, config, operations, keys, value_size,
+                seed + number)
+            for number in range(processes)
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    samples = [sample for result in results for sample in result[0]]
+    hits = sum(result[1] for result in results)
+    misses = sum(result[2] for result in results)
+    report = {
+        'operations': len(samples),
+        'per_second': len(samples) / elapsed,
+        'hit_rate': hits / (hits + misses) if hits + misses else None,
+    }
+    for operation in ('get', 'get_many', 'incr'):
+        latencies = sorted(
+            sample[1] * 1000 for sample in samples
+            if sample[0] == operation)
+        for percent in (50, 99):
+            report['%s_p%s_ms' % (operation, percent)] = percentile(
+                latencies, percent)
+    return report
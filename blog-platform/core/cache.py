@@ -0,0 +1,297 @@
+"""Кеш в файле SQLite, общий для всех процессов сервера.
+
+Каждый процесс и поток открывает своё соединение к одному файлу в
+режиме WAL: читатели не ждут писателей, а запись с ``BEGIN IMMEDIATE``
+ждёт ``busy_timeout``. Целые числа хранятся как INTEGER, остальные
+значения — в pickle; ``incr`` читает и пишет значение в одной
+транзакции записи, поэтому параллельные увеличения не теряются.
+
+Число записей и их общий размер ведут триггеры в отдельной строке, так
+что проверка пределов ``MAX_ENTRIES`` и ``MAX_SIZE`` не сканирует
+таблицу. При превышении сначала удаляются просроченные записи, затем
+давно не читанные: время чтения обновляется не чаще раза в
+``ACCESS_RESOLUTION`` секунд, чтобы чтения почти не писали в файл.
+
+Подключение::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': '/var/cache/blog/cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 100000, 'MAX_SIZE': 256 * 2 ** 20},
+        },
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL,
+        size INTEGER NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    '''CREATE TABLE IF NOT EXISTS cache_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        entries INTEGER NOT NULL,
+        size INTEGER NOT NULL
+    )''',
+    'INSERT OR IGNORE INTO cache_stats VALUES (1, 0, 0)',
+    '''CREATE TRIGGER IF NOT EXISTS cache_inserted AFTER INSERT ON cache
+    BEGIN
+        UPDATE cache_stats
+        SET entries = entries + 1, size = size + new.size;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS cache_updated
+    AFTER UPDATE OF size ON cache
+    BEGIN
+        UPDATE cache_stats SET size = size - old.size + new.size;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS cache_deleted AFTER DELETE ON cache
+    BEGIN
+        UPDATE cache_stats
+        SET entries = entries - 1, size = size - old.size;
+    END''',
+)
+
+PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+}
+
+# Пределы INTEGER в SQLite: большие числа хранятся в pickle.
+INTEGER_RANGE = range(-2 ** 63, 2 ** 63)
+
+# Условие «запись не просрочена»; параметр — текущее время.
+FRESH = '(expires IS NULL OR expires > ?)'
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.location = location
+        self.max_size = int(options.get('MAX_SIZE', 64 * 2 ** 20))
+        self.busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self.access_resolution = float(options.get('ACCESS_RESOLUTION', 1))
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение, унаследованное при fork, дочернему процессу не годится.
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            self._local.pid = pid
+            self._local.connection = self._connect()
+        return self._local.connection
+
+    def _connect(self):
+        directory = os.path.dirname(self.location)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self.location,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        for name, value in PRAGMAS.items():
+            connection.execute('PRAGMA %s = %s' % (name, value))
+        with _write(connection):
+            for statement in SCHEMA:
+                connection.execute(statement)
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _dump(value):
+        if type(value) is int and value in INTEGER_RANGE:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    @staticmethod
+    def _size(key, value):
+        return len(key) + (8 if isinstance(value, int) else len(value))
+
+    def _rows(self, keys, now):
+        rows = self._connection().execute(
+            'SELECT key, value, accessed FROM cache WHERE key IN (%s) AND %s'
+            % (', '.join('?' * len(keys)), FRESH),
+            [*keys, now],
+        ).fetchall()
+        stale = [
+            key for key, _, accessed in rows
+            if accessed < now - self.access_resolution]
+        if stale:
+            self._mark_accessed(stale, now)
+        return {key: value for key, value, _ in rows}
+
+    def _mark_accessed(self, keys, now):
+        try:
+            self._connection().execute(
+                'UPDATE cache SET accessed = ? WHERE key IN (%s)'
+                % ', '.join('?' * len(keys)),
+                [now, *keys],
+            )
+        except sqlite3.OperationalError:
+            # Отметка чтения нужна только вытеснению, ждать её незачем.
+            pass
+
+    def _store(self, connection, key, value, timeout, now, replace=True):
+        value = self._dump(value)
+        cursor = connection.execute(
+            'INSERT INTO cache (key, value, expires, accessed, size) '
+            'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, expires = excluded.expires, '
+            'accessed = excluded.accessed, size = excluded.size'
+            + ('' if replace else ' WHERE NOT %s' % FRESH.replace(
+                'expires', 'cache.expires')),
+            [key, value, self.get_backend_timeout(timeout), now,
+             self._size(key, value)] + ([] if replace else [now]),
+        )
+        return cursor.rowcount > 0
+
+    def _cull(self, connection, now):
+        entries, size = connection.execute(
+            'SELECT entries, size FROM cache_stats').fetchone()
+        if entries <= self._max_entries and size <= self.max_size:
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', [now])
+        step = max(entries // max(self._cull_frequency, 1), 1)
+        while True:
+            entries, size = connection.execute(
+                'SELECT entries, size FROM cache_stats').fetchone()
+            if entries <= self._max_entries and size <= self.max_size:
+                return
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)', [step])
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        now = time.time()
+        with _write(connection):
+            added = self._store(
+                connection, key, value, timeout, now, replace=False)
+            if added:
+                self._cull(connection, now)
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        rows = self._rows([key], time.time())
+        if key not in rows:
+            return default
+        return self._load(rows[key])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with _write(self._connection()) as connection:
+            cursor = connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? AND ' + FRESH,
+                [self.get_backend_timeout(timeout), key, now])
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with _write(self._connection()) as connection:
+            cursor = connection.execute(
+                'DELETE FROM cache WHERE key = ?', [key])
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND ' + FRESH,
+            [key, time.time()],
+        ).fetchone() is not None
+
+    def get_many(self, keys, version=None):
+        names = {self._key(key, version): key for key in keys}
+        if not names:
+            return {}
+        rows = self._rows(list(names), time.time())
+        return {
+            names[key]: self._load(value) for key, value in rows.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [
+            (self._key(key, version), value) for key, value in data.items()]
+        connection = self._connection()
+        now = time.time()
+        with _write(connection):
+            for key, value in items:
+                self._store(connection, key, value, timeout, now)
+            self._cull(connection, now)
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if not keys:
+            return
+        with _write(self._connection()) as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (%s)'
+                % ', '.join('?' * len(keys)), keys)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with _write(self._connection()) as connection:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? AND ' + FRESH,
+                [key, now]).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = self._load(row[0]) + delta
+            stored = self._dump(value)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                [stored, self._size(key, stored), key])
+        return value
+
+    def clear(self):
+        with _write(self._connection()) as connection:
+            connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединения живут всё время процесса, как у LocMemCache.
+        pass
+
+
+class _write:
+    """Транзакция ``BEGIN IMMEDIATE``: блокировка записи берётся сразу."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
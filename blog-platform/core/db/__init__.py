@@ -0,0 +1,34 @@
+"""Запись в базу с повтором, пока она занята другим процессом.
+
+``write`` выполняет функцию в ``transaction.atomic`` и, если начать
+транзакцию не удалось из-за блокировки, повторяет попытку после паузы
+со случайной добавкой. Ошибка внутри уже начатой транзакции не
+повторяется: функция могла успеть изменить объекты в памяти.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+LOCKED_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def is_locked(error):
+    return any(message in str(error) for message in LOCKED_MESSAGES)
+
+
+def write(func, *args, **kwargs):
+    """Выполняет func(*args, **kwargs) в транзакции с повторами."""
+    attempts = settings.DATABASE_WRITE_ATTEMPTS
+    delay = settings.DATABASE_WRITE_BACKOFF
+    for attempt in range(1, attempts + 1):
+        started = False
+        try:
+            with transaction.atomic():
+                started = True
+                return func(*args, **kwargs)
+        except OperationalError as error:
+            if started or not is_locked(error) or attempt == attempts:
+                raise
+        time.sleep(delay * 2 ** (attempt - 1) * (1 + random.random()))
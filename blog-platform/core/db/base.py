@@ -0,0 +1,38 @@
+"""Бэкенд SQLite с настройкой соединений из ``DATABASES``.
+
+В ``OPTIONS`` помимо параметров ``sqlite3.connect`` понимаются:
+
+* ``pragmas`` — словарь PRAGMA, которые выполняются на каждом новом
+  соединении: ``journal_mode``, ``synchronous``, ``busy_timeout``,
+  ``mmap_size``, ``cache_size`` и другие;
+* ``transaction_mode`` — режим ``BEGIN`` для ``transaction.atomic``.
+  В режиме ``IMMEDIATE`` транзакция берёт блокировку записи сразу и
+  ждёт её ``busy_timeout``, а не падает с «database is locked» на
+  первой записи после чтения.
+"""
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pragmas = {}
+    transaction_mode = 'DEFERRED'
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        mode = params.pop('transaction_mode', 'DEFERRED').upper()
+        if mode not in TRANSACTION_MODES:
+            raise ValueError('Неизвестный transaction_mode: %s' % mode)
+        self.transaction_mode = mode
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute('PRAGMA %s = %s' % (name, value))
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN %s' % self.transaction_mode)
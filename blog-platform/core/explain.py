@@ -0,0 +1,57 @@
+"""Разбор планов SQLite для запросов, выполненных участком кода.
+
+``capture`` собирает SQL вместе с параметрами через ``execute_wrapper``
+(для ``executemany`` — с первой строкой параметров), ``explain``
+выполняет для каждого запроса ``EXPLAIN QUERY PLAN``, а ``problems``
+отмечает полный просмотр таблицы и сортировку во временном B-дереве.
+"""
+import re
+import sqlite3
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+EXPLAINED = ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH')
+
+FULL_SCAN = re.compile(
+    r'^SCAN (?!CONSTANT ROW)(?!.*\b(USING|VIRTUAL TABLE)\b)')
+TEMP_BTREE = 'USE TEMP B-TREE'
+
+
+@contextmanager
+def capture(using=DEFAULT_DB_ALIAS):
+    """Список пар (sql, params), выполненных внутри блока."""
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        if not many:
+            queries.append((sql, params))
+        elif isinstance(params, (list, tuple)) and params:
+            # План не зависит от строки, а все строки сразу EXPLAIN не
+            # принимает.
+            queries.append((sql, params[0]))
+        return execute(sql, params, many, context)
+
+    with connections[using].execute_wrapper(record):
+        yield queries
+
+
+def explain(sql, params, using=DEFAULT_DB_ALIAS):
+    """Строки плана запроса или None, если план получить нельзя."""
+    if not sql.lstrip().upper().startswith(EXPLAINED):
+        return None
+    try:
+        with connections[using].cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+    except (DatabaseError, sqlite3.Error):
+        # Под DEBUG ошибки драйвера выходят из отладочного курсора как есть.
+        return None
+
+
+def problems(plan):
+    """Шаги плана с полным просмотром таблицы или временной сортировкой."""
+    return [
+        step for step in plan
+        if FULL_SCAN.match(step) or step.startswith(TEMP_BTREE)
+    ]
@@ -0,0 +1,59 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает бэкенды кеша LocMem, файловый и SQLite: скорость '
+        'операций из нескольких процессов и долю попаданий.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument(
+            '--operations', type=int, default=2000,
+            help='Операций на процесс.')
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--value-size', type=int, default=1000)
+        parser.add_argument(
+            '--output', help='Куда сохранить результаты в JSON.')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            reports = {
+                name: benchmark.cache_contention(
+                    config,
+                    processes=options['processes'],
+                    operations=options['operations'],
+                    keys=options['keys'],
+                    value_size=options['value_size'],
+                )
+                for name, config in benchmark.cache_backends(
+                    directory).items()
+            }
+        self.stdout.write('%-10s %10s %9s %9s %9s %9s %9s' % (
+            'бэкенд', 'операций/с', 'попадания', 'get p50', 'get p99',
+            'incr p99', 'many p99'))
+        for name, report in reports.items():
+            self.stdout.write('%-10s %10.0f %9s %9s %9s %9s %9s' % (
+                name, report['per_second'],
+                _percent(report['hit_rate']),
+                _milliseconds(report['get_p50_ms']),
+                _milliseconds(report['get_p99_ms']),
+                _milliseconds(report['incr_p99_ms']),
+                _milliseconds(report['get_many_p99_ms'])))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(reports, output, indent=2)
+
+
+def _percent(value):
+    return '-' if value is None else '%.0f%%' % (value * 100)
+
+
+def _milliseconds(value):
+    return '-' if value is None else '%.2f' % value
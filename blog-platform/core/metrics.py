@@ -0,0 +1,336 @@
+"""Метрики запросов в текстовом формате Prometheus.
+
+``RequestMetricsMiddleware`` для каждого представления (по
+``view_name``) складывает в гистограммы процесса время ответа, число и
+время SQL-запросов, время отрисовки шаблонов и размер ответа. Если
+задан ``METRICS_DIR``, каждый процесс не чаще раза в
+``METRICS_FLUSH_INTERVAL`` секунд сохраняет свои гистограммы в
+отдельный файл, а ``/metrics/`` суммирует файлы живых процессов и
+удаляет файлы завершившихся.
+Там же считаются решения ``core.throttle`` по областям.
+
+Заголовок ``X-Profile`` со значением ``PROFILE_TOKEN`` или случайная
+выборка с долей ``PROFILE_SAMPLE_RATE`` включают cProfile для запроса;
+профиль сохраняется в ``PROFILE_DIR``.
+"""
+import cProfile
+import glob
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+from django.utils.crypto import constant_time_compare
+
+PREFIX = 'blog_'
+UNRESOLVED = '<unresolved>'
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        'Время ответа представления.', DURATION_BUCKETS),
+    'db_queries': ('SQL-запросов на запрос.', QUERY_BUCKETS),
+    'db_duration_seconds': (
+        'Время SQL-запросов на запрос.', DURATION_BUCKETS),
+    'template_duration_seconds': (
+        'Время отрисовки шаблонов на запрос.', DURATION_BUCKETS),
+    'response_size_bytes': ('Размер ответа.', SIZE_BUCKETS),
+}
+
+_local = threading.local()
+
+
+class Registry:
+    """Гистограммы и счётчики ответов одного процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.histograms = {}
+        self.responses = {}
+        self.throttled = {}
+        self.flushed = time.monotonic()
+
+    def _check_pid(self):
+        if self.pid != os.getpid():
+            # Процесс создан fork: данные родителя уже учтены им.
+            self.reset()
+
+    def observe(self, view, status, values):
+        with self.lock:
+            self._check_pid()
+            for metric, value in values.items():
+                buckets = HISTOGRAMS[metric][1]
+                counts, total = self.histograms.get(
+                    (metric, view), ([0] * (len(buckets) + 1), 0))
+                counts[bisect_left(buckets, value)] += 1
+                self.histograms[metric, view] = counts, total + value
+            key = view, str(status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def count_throttle(self, scope, allowed):
+        with self.lock:
+            self._check_pid()
+            key = scope, 'allowed' if allowed else 'rejected'
+            self.throttled[key] = self.throttled.get(key, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'histograms': [
+                    [metric, view, counts[:], total]
+                    for (metric, view), (counts, total)
+                    in self.histograms.items()
+                ],
+                'responses': [
+                    [view, status, count]
+                    for (view, status), count in self.responses.items()
+                ],
+                'throttled': [
+                    [scope, result, count]
+                    for (scope, result), count in self.throttled.items()
+                ],
+            }
+
+    def flush(self, force=False):
+        """Сохраняет снимок процесса в METRICS_DIR."""
+        directory = getattr(settings, 'METRICS_DIR', None)
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self.flushed < interval:
+            return
+        self.flushed = now
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory)
+        with os.fdopen(descriptor, 'w') as output:
+            json.dump(self.snapshot(), output)
+        os.replace(
+            temporary,
+            os.path.join(directory, 'metrics-%s.json' % os.getpid()))
+
+
+registry = Registry()
+
+
+def merge(snapshots):
+    histograms = {}
+    responses = {}
+    throttled = {}
+    for snapshot in snapshots:
+        for metric, view, counts, total in snapshot['histograms']:
+            merged, merged_total = histograms.get(
+                (metric, view), ([0] * len(counts), 0))
+            histograms[metric, view] = (
+                [a + b for a, b in zip(merged, counts)],
+                merged_total + total)
+        for view, status, count in snapshot['responses']:
+            responses[view, status] = responses.get((view, status), 0) + count
+        for scope, result, count in snapshot.get('throttled', ()):
+            key = scope, result
+            throttled[key] = throttled.get(key, 0) + count
+    return histograms, responses, throttled
+
+
+def _alive(pid):
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """Снимки всех процессов или только текущего без METRICS_DIR."""
+    directory = getattr(settings, 'METRICS_DIR', None)
+    if not directory:
+        return [registry.snapshot()]
+    registry.flush(force=True)
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+        pid = os.path.basename(path)[len('metrics-'):-len('.json')]
+        if not pid.isdigit() or not _alive(int(pid)):
+            # После перезапуска воркера его файл больше не обновится.
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path) as source:
+                snapshots.append(json.load(source))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def _escape(value):
+    return (
+        value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+
+
+def render(snapshots):
+    """Текст в формате Prometheus 0.0.4."""
+    histograms, responses, throttled = merge(snapshots)
+    lines = [
+        '# HELP %sresponses_total Ответов по представлениям и статусам.'
+        % PREFIX,
+        '# TYPE %sresponses_total counter' % PREFIX,
+    ]
+    for (view, status), count in sorted(responses.items()):
+        lines.append('%sresponses_total{view="%s",status="%s"} %s' % (
+            PREFIX, _escape(view), status, count))
+    lines.append(
+        '# HELP %sthrottle_requests_total Решения ограничителя записи.'
+        % PREFIX)
+    lines.append('# TYPE %sthrottle_requests_total counter' % PREFIX)
+    for (scope, result), count in sorted(throttled.items()):
+        lines.append(
+            '%sthrottle_requests_total{scope="%s",result="%s"} %s' % (
+                PREFIX, _escape(scope), result, count))
+    for metric, (help_text, buckets) in HISTOGRAMS.items():
+        name = PREFIX + metric
+        lines.append('# HELP %s %s' % (name, help_text))
+        lines.append('# TYPE %s histogram' % name)
+        for (observed, view), (counts, total) in sorted(histograms.items()):
+            if observed != metric:
+                continue
+            label = 'view="%s"' % _escape(view)
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append('%s_bucket{%s,le="%s"} %s' % (
+                    name, label, bound, cumulative))
+            lines.append('%s_sum{%s} %r' % (name, label, float(total)))
+            lines.append('%s_count{%s} %s' % (name, label, cumulative))
+    return '\n'.join(lines) + '\n'
+
+
+class RequestRecorder:
+    """Время SQL и шаблонов в пределах одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_duration = 0.0
+        self.template_duration = 0.0
+        self.template_depth = 0
+        self._stack = ExitStack()
+
+    def _execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_duration += time.perf_counter() - started
+
+    def __enter__(self):
+        for connection in connections.all():
+            self._stack.enter_context(
+                connection.execute_wrapper(self._execute))
+        _local.recorder = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.recorder = None
+        return self._stack.__exit__(exc_type, exc_value, traceback)
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        recorder = getattr(_local, 'recorder', None)
+        if recorder is None:
+            return render(self, *args, **kwargs)
+        # Вложенные render_to_string уже входят во время внешнего шаблона.
+        recorder.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            recorder.template_depth -= 1
+            if not recorder.template_depth:
+                recorder.template_duration += time.perf_counter() - started
+    wrapper.timed = True
+    return wrapper
+
+
+def instrument_templates():
+    if not getattr(Template.render, 'timed', False):
+        Template.render = _timed_render(Template.render)
+
+
+def _profile_requested(request):
+    token = getattr(settings, 'PROFILE_TOKEN', None)
+    header = request.META.get('HTTP_X_PROFILE')
+    if token and header and constant_time_compare(header, token):
+        return True
+    rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+
+def _save_profile(profiler, view):
+    directory = settings.PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    name = '%s-%s-%s.prof' % (
+        view.replace(':', '.'), int(time.time() * 1000), os.getpid())
+    profiler.dump_stats(os.path.join(directory, name))
+    return name
+
+
+def _response_size(response):
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiler = cProfile.Profile() if _profile_requested(request) else None
+        with RequestRecorder() as recorder:
+            started = time.perf_counter()
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+            duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match is not None else UNRESOLVED
+        values = {
+            'request_duration_seconds': duration,
+            'db_queries': recorder.queries,
+            'db_duration_seconds': recorder.db_duration,
+            'template_duration_seconds': recorder.template_duration,
+        }
+        size = _response_size(response)
+        if size is not None:
+            values['response_size_bytes'] = size
+        registry.observe(view, response.status_code, values)
+        registry.flush()
+        if profiler is not None:
+            response['X-Profile'] = _save_profile(profiler, view)
+        return response
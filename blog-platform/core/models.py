@@ -10,3 +10,49 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Task(CreatedModel):
+    """Задача фоновой очереди: вызов функции по пути импорта."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField('Функция', max_length=200)
+    args = models.TextField('Аргументы', default='[]')
+    key = models.CharField(
+        'Ключ', max_length=200, null=True, blank=True,
+        help_text='Пока задача с ключом ждёт в очереди, такие же '
+                  'задачи не добавляются')
+    status = models.CharField(
+        'Состояние', max_length=16, choices=STATUSES, default=PENDING)
+    run_at = models.DateTimeField('Запустить не раньше')
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Предел попыток')
+    started = models.DateTimeField('Начата', null=True, blank=True)
+    finished = models.DateTimeField('Закончена', null=True, blank=True)
+    error = models.TextField('Ошибка', blank=True)
+
+    class Meta(CreatedModel.Meta):
+        verbose_name = 'задача'
+        verbose_name_plural = 'задачи'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_task_key'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at', 'id'], name='task_queue_idx'),
+        ]
+
+    def __str__(self):
+        return '%s %s' % (self.name, self.status)
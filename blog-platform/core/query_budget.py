@@ -0,0 +1,81 @@
+"""Ограничение числа SQL-запросов на участок кода.
+
+``query_budget`` работает и как контекстный менеджер, и как декоратор
+представления. При превышении бюджета в режиме ``QUERY_BUDGET_RAISE``
+поднимается ``QueryBudgetExceeded``, иначе пишется предупреждение в лог.
+"""
+import logging
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    def __init__(self, max_queries, using=DEFAULT_DB_ALIAS, label=None,
+                 raise_exception=None):
+        self.max_queries = max_queries
+        self.using = using
+        self.label = label
+        self.raise_exception = raise_exception
+        self.queries = []
+
+    def __call__(self, func):
+        if self.label is None:
+            self.label = func.__qualname__
+        return super().__call__(func)
+
+    def _recreate_cm(self):
+        return type(self)(
+            self.max_queries, self.using, self.label, self.raise_exception)
+
+    def _record(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.queries = []
+        self._wrapper = connections[self.using].execute_wrapper(self._record)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._wrapper.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None or len(self) <= self.max_queries:
+            return False
+        message = '%s: %s queries executed, budget is %s\n%s' % (
+            self.label or 'query budget',
+            len(self),
+            self.max_queries,
+            '\n'.join(
+                '%s. %s' % (number, sql)
+                for number, sql in enumerate(self.queries, start=1)),
+        )
+        raise_exception = self.raise_exception
+        if raise_exception is None:
+            raise_exception = getattr(
+                settings, 'QUERY_BUDGET_RAISE', settings.DEBUG)
+        if raise_exception:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+        return False
+
+    def __len__(self):
+        return len(self.queries)
+
+
+class QueryBudgetTestMixin:
+    """Проверки бюджета запросов для TestCase."""
+
+    def assertMaxQueries(self, max_queries, func=None, *args, **kwargs):
+        budget = query_budget(max_queries, raise_exception=True)
+        if func is None:
+            return budget
+        with budget:
+            return func(*args, **kwargs)
@@ -0,0 +1,184 @@
+"""Фоновая очередь задач в таблице SQLite, без брокера.
+
+``enqueue`` добавляет строку ``Task`` в текущей транзакции, поэтому
+задача видна исполнителю только после фиксации данных, которые она
+обрабатывает, и не теряется при перезапуске сервера. Функция задачи
+записывается путём импорта, аргументы — в JSON.
+
+Команда ``run_tasks`` забирает готовые задачи одной транзакцией
+``core.db.write`` и выполняет их в пуле потоков или процессов. Упавшая
+задача повторяется через ``TASK_BACKOFF * 2 ** (попытка - 1)`` секунд,
+пока не исчерпает ``max_attempts``. Задача, зависшая в состоянии
+«выполняется» дольше ``TASK_TIMEOUT`` секунд, возвращается в очередь.
+Пока в очереди ждёт задача с ключом ``key``, такие же задачи не
+добавляются. Аргументы выполненной задачи стираются, а сама она
+хранится ``TASK_RETENTION_DAYS`` дней.
+"""
+import json
+import logging
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import db
+from .background import create_executor
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+SUPERSEDED = 'Заменена задачей с тем же ключом'
+NO_ARGS = '[]'
+PRUNE_INTERVAL = 60 * 60
+
+
+def task_name(func):
+    return '%s.%s' % (func.__module__, func.__qualname__)
+
+
+def enqueue(func, *args, key=None, delay=0, attempts=None):
+    """Ставит func(*args) в очередь; args должны сериализоваться в JSON.
+
+    Если в очереди уже ждёт задача с тем же key, новая не добавляется.
+    """
+    Task.objects.bulk_create([Task(
+        name=task_name(func),
+        args=json.dumps(args),
+        key=key,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=attempts or settings.TASK_MAX_ATTEMPTS,
+    )], ignore_conflicts=True)
+
+
+def claim(limit):
+    """Переводит до limit готовых задач в «выполняется», возвращает id."""
+    return db.write(_claim, limit)
+
+
+def _claim(limit):
+    now = timezone.now()
+    _requeue_stale(now)
+    ids = list(
+        Task.objects.filter(status=Task.PENDING, run_at__lte=now)
+        .order_by('run_at', 'pk')
+        .values_list('pk', flat=True)[:limit])
+    Task.objects.filter(pk__in=ids).update(
+        status=Task.RUNNING, started=now, attempts=F('attempts') + 1)
+    return ids
+
+
+def _requeue_stale(now):
+    stale = list(
+        Task.objects.filter(
+            status=Task.RUNNING,
+            started__lt=now - timedelta(seconds=settings.TASK_TIMEOUT))
+        .order_by('-pk').values_list('pk', 'key'))
+    if not stale:
+        return
+    # Из зависших задач с одним ключом в очередь возвращается только
+    # последняя, и только если такая же задача ещё не ждёт.
+    keys = set(
+        Task.objects.filter(
+            status=Task.PENDING, key__in=[key for _, key in stale if key])
+        .values_list('key', flat=True))
+    requeued, superseded = [], []
+    for pk, key in stale:
+        if key in keys:
+            superseded.append(pk)
+        else:
+            requeued.append(pk)
+            if key:
+                keys.add(key)
+    Task.objects.filter(pk__in=superseded).update(
+        status=Task.DONE, finished=now, error=SUPERSEDED, args=NO_ARGS)
+    Task.objects.filter(pk__in=requeued).update(status=Task.PENDING)
+
+
+def execute(task_id):
+    """Выполняет захваченную задачу и записывает результат."""
+    task = Task.objects.get(pk=task_id)
+    try:
+        import_string(task.name)(*json.loads(task.args))
+    except Exception:
+        logger.exception('Task %s (%s) failed', task_id, task.name)
+        db.write(_failed, task_id, traceback.format_exc())
+        return False
+    Task.objects.filter(pk=task_id).update(
+        status=Task.DONE, finished=timezone.now(), error='', args=NO_ARGS)
+    return True
+
+
+def _run(task_id):
+    # Исполнитель пула живёт долго: соединение закрывается по тем же
+    # правилам, что и после запроса.
+    close_old_connections()
+    try:
+        return execute(task_id)
+    finally:
+        close_old_connections()
+
+
+def _failed(task_id, error):
+    task = Task.objects.get(pk=task_id)
+    task.error = error
+    if task.attempts >= task.max_attempts:
+        task.status = Task.FAILED
+        task.finished = timezone.now()
+    elif task.key and Task.objects.filter(
+            key=task.key, status=Task.PENDING).exists():
+        task.status = Task.DONE
+        task.finished = timezone.now()
+        task.error = SUPERSEDED
+        task.args = NO_ARGS
+    else:
+        task.status = Task.PENDING
+        task.run_at = timezone.now() + timedelta(
+            seconds=settings.TASK_BACKOFF * 2 ** (task.attempts - 1))
+    task.save(
+        update_fields=['error', 'status', 'finished', 'run_at', 'args'])
+
+
+def prune(days):
+    """Удаляет выполненные задачи старше days дней."""
+    return Task.objects.filter(
+        status=Task.DONE,
+        finished__lt=timezone.now() - timedelta(days=days),
+    ).delete()[0]
+
+
+def work(workers, processes=False, poll_interval=1.0, once=False):
+    """Выполняет задачи, держа занятыми все workers исполнителей.
+
+    При once возвращается, когда очередь пуста и все задачи закончены.
+    Возвращает число выполненных задач.
+    """
+    if processes:
+        executor = create_executor(workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    running = set()
+    executed = 0
+    pruned = None
+    with executor:
+        while True:
+            if pruned is None or time.monotonic() - pruned > PRUNE_INTERVAL:
+                prune(settings.TASK_RETENTION_DAYS)
+                pruned = time.monotonic()
+            free = workers - len(running)
+            claimed = claim(free) if free else []
+            for task_id in claimed:
+                running.add(executor.submit(_run, task_id))
+            if not running:
+                if once:
+                    return executed
+                time.sleep(poll_interval)
+                continue
+            done, running = wait(
+                running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            executed += len(done)
@@ -0,0 +1,37 @@
+"""Запуск тестов с кешем во временном файле.
+
+Тесты очищают кеш, поэтому общий файл ``CACHE_LOCATION`` работающего
+сервера им не отдаётся: на время прогона кеш того же бэкенда лежит во
+временном каталоге, который удаляется после тестов. События
+популярного, оставленные тестами в памяти процесса, сбрасываются до
+удаления тестовой базы, чтобы запись при выходе не шла в пустую базу.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp()
+        default = dict(
+            settings.CACHES['default'],
+            LOCATION=os.path.join(self.cache_dir, 'cache.sqlite3'))
+        self.cache_override = override_settings(
+            CACHES=dict(settings.CACHES, default=default))
+        self.cache_override.enable()
+
+    def teardown_databases(self, old_config, **kwargs):
+        from posts import trending
+        trending._buffer.reset()
+        super().teardown_databases(old_config, **kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_override.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+User = get_user_model()
+
+PASSWORD = 'old-Passw0rd'
+NEW_PASSWORD = 'new-Passw0rd'
+
+
+class CachedAuthTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='test-user', password=PASSWORD)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.login(username='test-user', password=PASSWORD)
+        self.other_client = Client()
+        self.other_client.login(username='test-user', password=PASSWORD)
+        self.url = reverse('about:author')
+
+    def assertLoggedIn(self, client, logged_in=True):
+        response = client.get(self.url)
+        self.assertIs(
+            response.wsgi_request.user.is_authenticated, logged_in)
+
+    def test_page_needs_no_auth_queries(self):
+        """Повторный запрос вошедшего пользователя не обращается к базе"""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Пользователь: test-user')
+
+    def test_rename_is_visible_at_once(self):
+        """Правка пользователя сбрасывает его запись в кеше"""
+        self.client.get(self.url)
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'renamed'
+        user.save()
+        self.assertContains(
+            self.client.get(self.url), 'Пользователь: renamed')
+
+    def test_logout_ends_session(self):
+        """Выход удаляет сессию и из кеша"""
+        self.assertLoggedIn(self.client)
+        self.client.post(reverse('users:logout'))
+        self.assertLoggedIn(self.client, False)
+        self.assertLoggedIn(self.other_client)
+
+    def test_password_change_logs_out_other_sessions(self):
+        """Смена пароля оставляет вход только в текущей сессии"""
+        self.assertLoggedIn(self.other_client)
+        self.client.post(reverse('users:password_change'), {
+            'old_password': PASSWORD,
+            'new_password1': NEW_PASSWORD,
+            'new_password2': NEW_PASSWORD,
+        })
+        self.assertLoggedIn(self.client)
+        self.assertLoggedIn(self.other_client, False)
+
+    def test_password_reset_logs_out_sessions(self):
+        """Сброс пароля по ссылке из письма завершает все сессии"""
+        self.assertLoggedIn(self.client)
+        user = User.objects.get(pk=self.user.pk)
+        link = reverse('users:password_reset_confirm', kwargs={
+            'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+            'token': default_token_generator.make_token(user),
+        })
+        reset_client = Client()
+        form_url = reset_client.get(link)['Location']
+        reset_client.post(form_url, {
+            'new_password1': NEW_PASSWORD,
+            'new_password2': NEW_PASSWORD,
+        })
+        self.assertLoggedIn(self.client, False)
+        self.assertLoggedIn(self.other_client, False)
+
+    def test_deactivated_user_is_logged_out(self):
+        """Отключённый пользователь теряет вход"""
+        self.assertLoggedIn(self.client)
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        self.assertLoggedIn(self.client, False)
@@ -0,0 +1,142 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from core.cache import SQLiteCache
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = self.backend()
+
+    def backend(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_tests_use_temporary_cache(self):
+        """Тесты работают с временным кешем, а не с общим файлом сервера"""
+        self.assertFalse(cache.location.startswith(settings.BASE_DIR))
+
+    def test_basic_operations(self):
+        """get, set, add, delete и has_key ведут себя как у Django"""
+        cache = self.cache
+        self.assertIsNone(cache.get('missing'))
+        self.assertEqual(cache.get('missing', 'default'), 'default')
+        cache.set('key', {'text': 'значение'})
+        self.assertEqual(cache.get('key'), {'text': 'значение'})
+        self.assertTrue(cache.has_key('key'))
+        self.assertFalse(cache.add('key', 'другое'))
+        self.assertTrue(cache.add('new', 'новое'))
+        self.assertEqual(cache.get('new'), 'новое')
+        self.assertTrue(cache.delete('key'))
+        self.assertFalse(cache.delete('key'))
+        cache.clear()
+        self.assertIsNone(cache.get('new'))
+
+    def test_many(self):
+        """get_many, set_many и delete_many работают пачкой"""
+        cache = self.cache
+        self.assertEqual(cache.set_many({'a': 1, 'b': 'два', 'c': [3]}), [])
+        self.assertEqual(
+            cache.get_many(['a', 'b', 'c', 'd']),
+            {'a': 1, 'b': 'два', 'c': [3]})
+        cache.delete_many(['a', 'b'])
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'c': [3]})
+
+    def test_expiry(self):
+        """Просроченные записи не читаются, touch продлевает запись"""
+        cache = self.cache
+        cache.set('expired', 1, timeout=0)
+        self.assertIsNone(cache.get('expired'))
+        self.assertTrue(cache.add('expired', 2))
+        cache.set('forever', 1, timeout=None)
+        cache.set('short', 1, timeout=-1)
+        self.assertFalse(cache.touch('short'))
+        self.assertTrue(cache.touch('forever', timeout=60))
+        self.assertEqual(cache.get('forever'), 1)
+
+    def test_incr(self):
+        """incr и decr меняют числа и не находят пропавших ключей"""
+        cache = self.cache
+        cache.set('counter', 1)
+        self.assertEqual(cache.incr('counter'), 2)
+        self.assertEqual(cache.decr('counter', 5), -3)
+        cache.set('big', 2 ** 64)
+        self.assertEqual(cache.incr('big'), 2 ** 64 + 1)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+
+    def test_incr_is_atomic_across_connections(self):
+        """Параллельные incr из разных соединений не теряются"""
+        self.cache.set('counter', 0)
+
+        def work(_):
+            cache = self.backend()
+            for _ in range(50):
+                cache.incr('counter')
+
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(work, range(4)))
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_shared_between_instances(self):
+        """Запись и удаление видны другим процессам с тем же файлом"""
+        other = self.backend()
+        self.cache.set('shared', 'значение')
+        self.assertEqual(other.get('shared'), 'значение')
+        other.delete('shared')
+        self.assertIsNone(self.cache.get('shared'))
+
+    def test_evicts_least_recently_read(self):
+        """Сверх MAX_ENTRIES вытесняются давно не читанные записи"""
+        cache = self.backend(
+            MAX_ENTRIES=3, CULL_FREQUENCY=3, ACCESS_RESOLUTION=0)
+        for key in 'abc':
+            cache.set(key, key)
+            time.sleep(0.01)
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertEqual(set(cache.get_many('abcd')), {'a', 'c', 'd'})
+
+    def test_evicts_by_size(self):
+        """Сверх MAX_SIZE вытесняются записи, пока размер не уложится"""
+        cache = self.backend(MAX_SIZE=3000, ACCESS_RESOLUTION=0)
+        for number in range(5):
+            cache.set('key%s' % number, b'x' * 1000)
+            time.sleep(0.01)
+        stored = cache.get_many(['key%s' % number for number in range(5)])
+        self.assertLessEqual(len(stored), 2)
+        self.assertIn('key4', stored)
+
+    def test_template_cache_tag(self):
+        """Тег {% cache %} хранит фрагменты в этом кеше"""
+        template = Template(
+            '{% load cache %}{% cache 60 fragment %}{{ value }}'
+            '{% endcache %}')
+        caches = {'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': self.location,
+        }}
+        with override_settings(CACHES=caches):
+            self.assertEqual(template.render(Context({'value': 1})), '1')
+            self.assertEqual(template.render(Context({'value': 2})), '1')
+
+
+class CacheBenchmarkTests(SimpleTestCase):
+    def test_benchmark_covers_every_backend(self):
+        """benchmark_cache сравнивает все бэкенды"""
+        output = StringIO()
+        call_command(
+            'benchmark_cache', processes=2, operations=50, stdout=output)
+        for name in ('locmem', 'filebased', 'sqlite'):
+            with self.subTest(name=name):
+                self.assertIn(name, output.getvalue())
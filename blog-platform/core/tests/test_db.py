@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+
+from core import db
+from core.db.base import DatabaseWrapper
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+
+class SqliteBackendTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+        self.wrapper = DatabaseWrapper(
+            dict(connection.settings_dict, NAME=self.path), 'contention')
+        self.addCleanup(self.wrapper.close)
+
+    def pragma(self, name):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA %s' % name)
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_new_connections(self):
+        """Новое соединение получает PRAGMA из OPTIONS"""
+        expected = {
+            'journal_mode': 'wal',
+            'synchronous': 1,
+            'busy_timeout': 5000,
+            'mmap_size': 256 * 2 ** 20,
+            'cache_size': -64 * 2 ** 10,
+        }
+        for name, value in expected.items():
+            with self.subTest(name=name):
+                self.assertEqual(self.pragma(name), value)
+
+    def test_transaction_takes_write_lock_at_begin(self):
+        """BEGIN IMMEDIATE сразу не пускает другого писателя"""
+        self.wrapper.ensure_connection()
+        self.wrapper._start_transaction_under_autocommit()
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        with self.assertRaisesMessage(
+                sqlite3.OperationalError, 'database is locked'):
+            other.execute('BEGIN IMMEDIATE')
+        self.wrapper.connection.rollback()
+
+
+@override_settings(DATABASE_WRITE_ATTEMPTS=3, DATABASE_WRITE_BACKOFF=0)
+class WriteRetryTests(SimpleTestCase):
+    def locked_atomic(self, failures):
+        """atomic, который failures раз не может начать транзакцию."""
+        @contextmanager
+        def atomic():
+            if failures:
+                failures.pop()
+                raise OperationalError('database is locked')
+            yield
+        return mock.patch('core.db.transaction.atomic', atomic)
+
+    def test_retries_locked_begin(self):
+        """Занятая база при BEGIN даёт повтор, а не ошибку"""
+        with self.locked_atomic([1, 1]):
+            self.assertEqual(db.write(lambda: 'готово'), 'готово')
+
+    def test_gives_up_after_attempts(self):
+        """После DATABASE_WRITE_ATTEMPTS попыток ошибка пробрасывается"""
+        with self.locked_atomic([1, 1, 1]):
+            with self.assertRaises(OperationalError):
+                db.write(lambda: 'готово')
+
+    def test_does_not_retry_started_transaction(self):
+        """Ошибка внутри начатой транзакции не повторяется"""
+        calls = []
+
+        def func():
+            calls.append(1)
+            raise OperationalError('database is locked')
+
+        with self.locked_atomic([]):
+            with self.assertRaises(OperationalError):
+                db.write(func)
+        self.assertEqual(len(calls), 1)
@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from http import HTTPStatus
+
+from core import metrics
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test-user')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.guest_client = Client()
+
+    def scrape(self):
+        response = self.guest_client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.content.decode()
+
+    def test_view_metrics_are_exported(self):
+        """Метрики представления попадают в /metrics/"""
+        self.guest_client.get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertIn(
+            'blog_responses_total{view="posts:index",status="200"} 1', text)
+        for metric in metrics.HISTOGRAMS:
+            with self.subTest(metric=metric):
+                self.assertIn(
+                    'blog_%s_count{view="posts:index"} 1' % metric, text)
+        self.assertIn(
+            'blog_db_queries_bucket{view="posts:index",le="+Inf"} 1', text)
+        template_sum = (
+            'blog_template_duration_seconds_sum{view="posts:index"} ')
+        for line in text.splitlines():
+            if line.startswith(template_sum):
+                self.assertGreater(float(line[len(template_sum):]), 0)
+
+    @override_settings(METRICS_DIR=TEMP_DIR, METRICS_FLUSH_INTERVAL=0)
+    def test_processes_are_aggregated(self):
+        """Метрики всех процессов из METRICS_DIR суммируются"""
+        other = metrics.Registry()
+        other.observe('posts:index', 200, {'db_queries': 3})
+        path = os.path.join(TEMP_DIR, 'metrics-%s.json' % os.getppid())
+        with open(path, 'w') as output:
+            json.dump(other.snapshot(), output)
+        self.addCleanup(os.remove, path)
+        self.guest_client.get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertIn(
+            'blog_responses_total{view="posts:index",status="200"} 2', text)
+        self.assertIn('blog_db_queries_count{view="posts:index"} 2', text)
+
+    @override_settings(METRICS_DIR=TEMP_DIR, METRICS_FLUSH_INTERVAL=0)
+    def test_finished_processes_are_dropped(self):
+        """Файл завершившегося процесса не считается и удаляется"""
+        finished = subprocess.Popen([sys.executable, '-c', ''])
+        finished.wait()
+        other = metrics.Registry()
+        other.observe('posts:index', 200, {'db_queries': 3})
+        path = os.path.join(TEMP_DIR, 'metrics-%s.json' % finished.pid)
+        with open(path, 'w') as output:
+            json.dump(other.snapshot(), output)
+        self.guest_client.get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertIn(
+            'blog_responses_total{view="posts:index",status="200"} 1', text)
+        self.assertFalse(os.path.exists(path))
+
+    @override_settings(PROFILE_TOKEN='secret', PROFILE_DIR=TEMP_DIR)
+    def test_profile_header_saves_profile(self):
+        """Заголовок X-Profile с верным токеном сохраняет профиль"""
+        response = self.guest_client.get(
+            reverse('posts:index'), HTTP_X_PROFILE='wrong')
+        self.assertFalse(response.has_header('X-Profile'))
+        response = self.guest_client.get(
+            reverse('posts:index'), HTTP_X_PROFILE='secret')
+        self.assertTrue(
+            os.path.exists(os.path.join(TEMP_DIR, response['X-Profile'])))
+
+    def test_metrics_are_hidden_from_outside(self):
+        """/metrics/ недоступен с адресов вне METRICS_ALLOWED_IPS"""
+        response = self.guest_client.get(
+            reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
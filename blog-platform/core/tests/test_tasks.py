@@ -0,0 +1,118 @@
+from concurrent.futures import Future
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from core import tasks
+from core.background import run_in_background
+from core.models import Task
+from django.core import mail
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+User = get_user_model()
+
+calls = []
+
+
+def remember(value):
+    calls.append(value)
+
+
+def fail():
+    raise ValueError('Не вышло')
+
+
+class InlineExecutor:
+    """Пул, выполняющий задачу сразу, в соединении теста."""
+
+    def __init__(self, max_workers):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+@override_settings(
+    BACKGROUND_WORKERS=2, TASK_MAX_ATTEMPTS=2, TASK_BACKOFF=10)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_tasks(self):
+        output = StringIO()
+        with mock.patch('core.tasks.ThreadPoolExecutor', InlineExecutor), \
+                mock.patch('core.tasks.close_old_connections'):
+            call_command('run_tasks', once=True, stdout=output)
+        return output.getvalue()
+
+    def test_pending_key_deduplicates(self):
+        """Пока задача с ключом ждёт, такая же не ставится"""
+        for value in range(3):
+            run_in_background(remember, value, key='same')
+        run_in_background(remember, 'другая')
+        self.assertIn('Выполнено задач: 2', self.run_tasks())
+        self.assertEqual(sorted(calls, key=str), [0, 'другая'])
+        run_in_background(remember, 'снова', key='same')
+        self.assertEqual(Task.objects.filter(status=Task.PENDING).count(), 1)
+
+    def test_delayed_task_waits(self):
+        """Отложенная задача не выполняется раньше срока"""
+        tasks.enqueue(remember, 'позже', delay=60)
+        self.assertEqual(tasks.claim(10), [])
+        Task.objects.update(run_at=timezone.now())
+        self.run_tasks()
+        self.assertEqual(calls, ['позже'])
+
+    def test_failure_retries_with_backoff(self):
+        """Упавшая задача повторяется с паузой, затем помечается упавшей"""
+        tasks.enqueue(fail)
+        started = timezone.now()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.run_tasks()
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts), (Task.PENDING, 1))
+        self.assertGreaterEqual(task.run_at, started + timedelta(seconds=10))
+        self.assertIn('Не вышло', task.error)
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.run_tasks()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+
+    def test_stale_task_is_requeued(self):
+        """Задача, зависшая у упавшего исполнителя, возвращается в очередь"""
+        for _ in range(2):
+            tasks.enqueue(remember, 'снова', key='stale')
+            tasks.claim(1)
+        Task.objects.update(started=timezone.now() - timedelta(days=1))
+        self.run_tasks()
+        self.assertEqual(calls, ['снова'])
+        self.assertEqual(
+            list(Task.objects.order_by('pk').values_list('error', flat=True)),
+            [tasks.SUPERSEDED, ''])
+
+    def test_password_reset_mail_is_queued(self):
+        """Письмо сброса пароля уходит из очереди, а не из запроса"""
+        User.objects.create_user(
+            username='reader', email='reader@test.ru', password='secret-1')
+        response = Client().post(
+            '/auth/password_reset/', {'email': 'reader@test.ru'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        self.assertNotIn('/reset/', Task.objects.get().args)
+        self.run_tasks()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@test.ru'])
+        self.assertIn('/reset/', mail.outbox[0].body)
+        self.assertEqual(Task.objects.get().args, tasks.NO_ARGS)
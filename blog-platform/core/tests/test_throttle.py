@@ -0,0 +1,100 @@
+from http import HTTPStatus
+from unittest import mock
+
+from core import metrics, throttle
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def take_at(self, seconds):
+        # Часы общие для ведра и срока жизни ключа в кеше.
+        with mock.patch('time.time', return_value=seconds):
+            return throttle.take('bucket', 3, 30)
+
+    def test_burst_then_refill(self):
+        """Ведро отдаёт запас сразу, а дальше по токену за интервал"""
+        self.assertEqual([self.take_at(1000) for _ in range(3)], [0, 0, 0])
+        self.assertEqual(self.take_at(1000), 10)
+        self.assertEqual(self.take_at(1005), 5)
+        self.assertEqual(self.take_at(1010), 0)
+        self.assertEqual(self.take_at(1010), 10)
+
+    def test_busy_bucket_outlives_key_timeout(self):
+        """Ключ опустевшего ведра живёт, пока по нему идут запросы"""
+        for _ in range(3):
+            self.take_at(1000)
+        for second in range(1010, 1210, 10):
+            self.assertEqual(self.take_at(second), 0)
+        self.assertEqual(self.take_at(1200), 10)
+
+    def test_idle_bucket_is_full(self):
+        """После простоя ведро снова полное, а не копит долг"""
+        for _ in range(3):
+            self.take_at(1000)
+        self.assertEqual([self.take_at(2000) for _ in range(4)], [0, 0, 0, 10])
+
+
+@override_settings(THROTTLE_RATES={
+    'post': (10, 60), 'comment': (2, 60), 'follow': (10, 60)})
+class ThrottledViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test-user')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_rejects_before_database(self):
+        """Сверх лимита отвечает 429 без запросов к базе"""
+        url = reverse('posts:add_comment', args=(self.post.pk,))
+        for _ in range(2):
+            self.client.post(url, {'text': 'Комментарий'})
+        request = RequestFactory().post(url)
+        request.user = self.user
+        view = mock.Mock()
+        with self.assertNumQueries(0):
+            response = throttle.throttle('comment')(view)(request)
+        view.assert_not_called()
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+        response = self.client.post(url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_limits_are_per_user_and_method(self):
+        """Лимит у каждого пользователя свой, а GET формы не тратит токены"""
+        url = reverse('posts:add_comment', args=(self.post.pk,))
+        for _ in range(3):
+            self.client.get(url)
+        other = Client()
+        other.force_login(User.objects.create_user(username='other'))
+        for client in (self.client, other):
+            for _ in range(2):
+                response = client.post(url, {'text': 'Комментарий'})
+                self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_decisions_are_exported(self):
+        """Решения ограничителя видны в /metrics/"""
+        url = reverse('posts:add_comment', args=(self.post.pk,))
+        for _ in range(3):
+            self.client.post(url, {'text': 'Комментарий'})
+        text = Client().get(reverse('metrics')).content.decode()
+        for result, count in (('allowed', 2), ('rejected', 1)):
+            self.assertIn(
+                'blog_throttle_requests_total{scope="comment",result="%s"} %s'
+                % (result, count), text)
@@ -0,0 +1,81 @@
+"""Ограничение частоты записи для пользователя или адреса.
+
+Ведро токенов по алгоритму GCRA: у каждой пары «область, пользователь»
+(для анонимов — IP) в кеше одно целое число — момент в миллисекундах,
+когда ведро снова станет полным. Запрос сдвигает его на стоимость
+токена атомарным ``incr`` и проходит, если ведро не переполнилось;
+отказ возвращает сдвиг обратно. Размер ведра и время его полного
+наполнения задаёт ``THROTTLE_RATES[scope]`` как пара (токенов, секунд).
+
+Отказ — ответ 429 с ``Retry-After`` до работы представления и базы.
+Решения по областям считает ``core.metrics``.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from . import metrics
+
+KEY = 'throttle:%s:%s'
+# Запас к сроку жизни ключа сверх времени наполнения ведра.
+KEY_MARGIN = 60
+
+
+def client_id(request):
+    if request.user.is_authenticated:
+        return 'user:%s' % request.user.pk
+    return 'ip:%s' % request.META.get('REMOTE_ADDR')
+
+
+def take(key, tokens, period):
+    """Забирает токен; возвращает 0 или через сколько секунд повторить."""
+    now = int(time.time() * 1000)
+    interval = period * 1000 // tokens
+    # Момент полного ведра не дальше period от текущего, поэтому ключ,
+    # продлеваемый при каждом сдвиге, не пропадает раньше него.
+    timeout = period + KEY_MARGIN
+    try:
+        full = cache.incr(key, interval)
+    except ValueError:
+        if cache.add(key, now + interval, timeout):
+            return 0
+        full = cache.incr(key, interval)
+    if full - interval < now:
+        # Ведро простояло полным: отсчёт начинается с текущего момента.
+        # Одновременные запросы здесь могут получить по лишнему токену.
+        cache.set(key, now + interval, timeout)
+        return 0
+    if full - now <= tokens * interval:
+        cache.touch(key, timeout)
+        return 0
+    cache.decr(key, interval)
+    return math.ceil((full - tokens * interval - now) / 1000)
+
+
+def throttle(scope, methods=('POST',)):
+    """Отвечает 429, если клиент исчерпал ведро области scope.
+
+    Запросы с методами не из methods не ограничиваются.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return view(request, *args, **kwargs)
+            tokens, period = settings.THROTTLE_RATES[scope]
+            retry_after = take(
+                KEY % (scope, client_id(request)), tokens, period)
+            metrics.registry.count_throttle(scope, not retry_after)
+            if not retry_after:
+                return view(request, *args, **kwargs)
+            response = HttpResponse(
+                'Слишком много запросов, попробуйте позже.',
+                content_type='text/plain; charset=utf-8', status=429)
+            response['Retry-After'] = retry_after
+            return response
+        return wrapper
+    return decorator
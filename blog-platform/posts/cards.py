@@ -0,0 +1,67 @@
+"""Кеш отрендеренных карточек постов.
+
+Ключ карточки содержит время последнего изменения поста и отметку
+``freshness.NAMES``, поэтому правка поста, смена картинки или
+переименование автора и группы сразу дают новый ключ. Все карточки
+страницы читаются из кеша одним ``get_many``. Карточка с заглушкой
+вместо ещё не готовой миниатюры в кеш не попадает, а страница с ней
+не получает валидаторов ``posts.freshness``.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import freshness
+
+CARD_TEMPLATE = 'posts/includes/post_list.html'
+CARD_TEMPLATES = (
+    CARD_TEMPLATE,
+    'posts/includes/profile_card.html',
+)
+
+
+def names_version():
+    return freshness.changed_at(freshness.NAMES).timestamp()
+
+
+def card_key(post, template_name=CARD_TEMPLATE, names=None):
+    if names is None:
+        names = names_version()
+    return 'post_card:%s:%s:%s:%s' % (
+        CARD_TEMPLATES.index(template_name),
+        post.pk,
+        post.modified.timestamp(),
+        names,
+    )
+
+
+def render_cards(posts, template_name=CARD_TEMPLATE, request=None):
+    """Возвращает пары (пост, html карточки) в порядке posts."""
+    names = names_version()
+    keys = [card_key(post, template_name, names) for post in posts]
+    cached = cache.get_many(keys)
+    rendered = {}
+    cards = []
+    for post, key in zip(posts, keys):
+        html = cached.get(key)
+        if html is None:
+            pending = []
+            html = render_to_string(
+                template_name, {'post': post, 'pending_thumbnails': pending})
+            if not pending:
+                rendered[key] = html
+            elif request is not None:
+                freshness.mark_incomplete(request)
+        cards.append((post, mark_safe(html)))
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_TIMEOUT)
+    return cards
+
+
+def invalidate(post):
+    """Удаляет карточки текущей версии поста."""
+    names = names_version()
+    cache.delete_many([
+        card_key(post, template_name, names)
+        for template_name in CARD_TEMPLATES])
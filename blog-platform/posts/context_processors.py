@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import notifications
+
+
+def inbox(request):
+    """Число непрочитанных во входящих; считается, только если нужно."""
+    def unread():
+        user = request.user
+        if not user.is_authenticated:
+            return 0
+        return notifications.unread_count(user)
+
+    return {'unread_notifications': SimpleLazyObject(unread)}
@@ -0,0 +1,140 @@
+"""Денормализованные счётчики постов, комментариев, подписок и входящих.
+
+Счётчики меняются атомарным ``UPDATE ... SET n = n + 1`` из сигналов
+моделей, а расхождения исправляет команда ``recount_counters``.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Notification, Post, User, UserCounter
+
+USER_COUNTERS = (
+    'posts_count', 'followers_count', 'following_count',
+    'unread_notifications',
+)
+
+
+def _actual_user_counts(user_ids):
+    counts = {
+        user_id: dict.fromkeys(USER_COUNTERS, 0) for user_id in user_ids}
+    sources = (
+        ('posts_count', Post.objects, 'author_id'),
+        ('followers_count', Follow.objects, 'author_id'),
+        ('following_count', Follow.objects, 'user_id'),
+        ('unread_notifications', Notification.objects.filter(unread=True),
+         'recipient_id'),
+    )
+    for counter, manager, column in sources:
+        rows = (
+            manager.filter(**{column + '__in': user_ids})
+            .order_by()
+            .values(column)
+            .annotate(total=Count('pk'))
+            .values_list(column, 'total')
+        )
+        for user_id, total in rows:
+            counts[user_id][counter] = total
+    return counts
+
+
+def create_user_counter(user_id):
+    """Создаёт строку счётчиков, посчитав её по данным."""
+    values = _actual_user_counts([user_id])[user_id]
+    try:
+        with transaction.atomic():
+            return UserCounter.objects.create(user_id=user_id, **values)
+    except IntegrityError:
+        return UserCounter.objects.get(user_id=user_id)
+
+
+def get_user_counter(user):
+    try:
+        return user.counters
+    except UserCounter.DoesNotExist:
+        return create_user_counter(user.pk)
+
+
+def increment_user(user_id, counter):
+    updated = UserCounter.objects.filter(user_id=user_id).update(
+        **{counter: F(counter) + 1})
+    if not updated:
+        create_user_counter(user_id)
+
+
+def decrement_user(user_id, counter):
+    UserCounter.objects.filter(
+        user_id=user_id, **{counter + '__gt': 0}).update(
+        **{counter: F(counter) - 1})
+
+
+def increment_comments(post_id):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + 1)
+
+
+def decrement_comments(post_id):
+    Post.objects.filter(pk=post_id, comments_count__gt=0).update(
+        comments_count=F('comments_count') - 1)
+
+
+def _batches(queryset, batch_size):
+    last_pk = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+def recount_users(batch_size=1000):
+    """Сверяет счётчики пользователей с данными, возвращает число правок."""
+    fixed = 0
+    for user_ids in _batches(User.objects.all(), batch_size):
+        actual = _actual_user_counts(user_ids)
+        stored = UserCounter.objects.in_bulk(user_ids)
+        missing = [
+            UserCounter(user_id=user_id, **actual[user_id])
+            for user_id in user_ids if user_id not in stored
+        ]
+        drifted = []
+        for user_id, counter in stored.items():
+            values = actual[user_id]
+            if any(getattr(counter, name) != values[name]
+                   for name in USER_COUNTERS):
+                for name in USER_COUNTERS:
+                    setattr(counter, name, values[name])
+                drifted.append(counter)
+        with transaction.atomic():
+            UserCounter.objects.bulk_create(missing, ignore_conflicts=True)
+            UserCounter.objects.bulk_update(drifted, USER_COUNTERS)
+        fixed += len(missing) + len(drifted)
+    return fixed
+
+
+def recount_comments(batch_size=1000):
+    """Сверяет счётчики комментариев постов, возвращает число правок."""
+    fixed = 0
+    for post_ids in _batches(Post.objects.all(), batch_size):
+        actual = dict(
+            Comment.objects.filter(post_id__in=post_ids)
+            .order_by()
+            .values('post_id')
+            .annotate(total=Count('pk'))
+            .values_list('post_id', 'total')
+        )
+        drifted = []
+        for post in Post.objects.filter(pk__in=post_ids).only(
+                'pk', 'comments_count'):
+            total = actual.get(post.pk, 0)
+            if post.comments_count != total:
+                post.comments_count = total
+                drifted.append(post)
+        with transaction.atomic():
+            Post.objects.bulk_update(drifted, ['comments_count'])
+        fixed += len(drifted)
+    return fixed
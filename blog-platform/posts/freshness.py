@@ -0,0 +1,104 @@
+"""Отметки свежести страниц для условных GET.
+
+Каждая область — все посты, имена, группа, автор, пост — хранит в кеше
+время своего последнего изменения. Сигналы моделей обновляют отметки
+при записи, а ``conditional`` сравнивает их с ``If-None-Match`` и
+``If-Modified-Since`` и отвечает 304 до работы представления и
+шаблона. Отметки страницы читаются одним ``get_many``; пропавшая из
+кеша отметка считается изменённой сейчас. Кеш должен быть общим для
+всех процессов сервера.
+"""
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+KEY = 'freshness:%s'
+
+# Любой пост: главная страница и ленты.
+SITE = 'site'
+# Имена авторов и названия групп, которые видны на всех страницах.
+NAMES = 'names'
+
+
+def group(slug):
+    return 'group:%s' % slug
+
+
+def author(username):
+    return 'author:%s' % username
+
+
+def post(post_id):
+    return 'post:%s' % post_id
+
+
+def touch(*scopes):
+    now = timezone.now()
+    cache.set_many({KEY % scope: now for scope in scopes}, None)
+
+
+def changed_at(*scopes):
+    """Время последнего изменения любой из областей."""
+    keys = [KEY % scope for scope in scopes]
+    changed = cache.get_many(keys)
+    missing = [key for key in keys if key not in changed]
+    if missing:
+        now = timezone.now()
+        for key in missing:
+            cache.add(key, now, None)
+        changed.update(dict.fromkeys(missing, now))
+    return max(changed.values())
+
+
+def state(*scopes, vary=()):
+    """Пара (время изменения, версия) для ``conditional``.
+
+    Версия различает изменения в пределах одной секунды, в отличие от
+    ``Last-Modified``; vary добавляет к ней то, от чего ещё зависит
+    ответ.
+    """
+    changed = changed_at(*scopes)
+    return changed, '|'.join(
+        ['%.6f' % changed.timestamp()] + [str(value) for value in vary])
+
+
+def mark_incomplete(request):
+    """Ответ скоро изменится без записи в базу: валидаторы не нужны."""
+    request.freshness_incomplete = True
+
+
+def conditional(freshness):
+    """Отвечает 304, если клиент уже видел текущую версию страницы.
+
+    freshness(request, **kwargs) возвращает пару из ``state`` или None,
+    если проверять нечего. ETag зависит от версии и адреса с
+    параметрами, поэтому совпадает только у одинаковых ответов.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, **kwargs):
+            current = freshness(request, **kwargs)
+            if current is None:
+                return view(request, **kwargs)
+            changed, version = current
+            etag = quote_etag(hashlib.md5(
+                ('%s|%s' % (request.get_full_path(), version)).encode()
+            ).hexdigest())
+            last_modified = int(changed.timestamp())
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, **kwargs)
+            if getattr(request, 'freshness_incomplete', False):
+                return response
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(last_modified)
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,137 @@
+"""Обработка загруженных картинок постов.
+
+Загрузка сохраняет файл как есть, а тяжёлая работа уходит в фоновую
+очередь: оригинал поворачивается по EXIF, уменьшается до
+``IMAGE_MAX_SIZE`` и перекодируется в JPEG без метаданных, затем
+создаются варианты шириной ``IMAGE_WIDTHS`` в WebP и JPEG и миниатюры
+``posts.thumbnails``. Размеры и пути вариантов записываются в пост,
+чтобы шаблоны строили ``srcset`` без чтения файлов.
+"""
+import io
+import json
+import os
+
+from core.background import run_in_background
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import thumbnails
+from .models import Post
+
+# Порядок важен: браузер берёт первый поддерживаемый формат.
+FORMATS = (
+    ('image/webp', 'WEBP', 'webp'),
+    ('image/jpeg', 'JPEG', 'jpg'),
+)
+
+VARIANTS_DIR = 'posts/variants/'
+
+
+def schedule(post):
+    if post.image:
+        run_in_background(
+            process, post.pk, post.image.name,
+            key='image:%s:%s' % (post.pk, post.image.name))
+
+
+def process(post_id, name):
+    ingest(post_id, name)
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is not None and post.image:
+        thumbnails.generate(post.image.name)
+
+
+def _open(name):
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.split()[-1])
+        return background
+    return image.convert('RGB')
+
+
+def _save(image, image_format, name):
+    buffer = io.BytesIO()
+    # Метаданные не передаются, поэтому EXIF в новый файл не попадает.
+    image.save(
+        buffer, image_format, quality=settings.IMAGE_QUALITY, optimize=True)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def _resized(image, width):
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def encode(name):
+    """Перекодирует картинку name и создаёт варианты.
+
+    Возвращает имя нового оригинала, его размеры и словарь
+    {MIME-тип: [[ширина, имя файла], ...]}.
+    """
+    image = _open(name)
+    limit = settings.IMAGE_MAX_SIZE
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    stem = os.path.splitext(os.path.basename(name))[0]
+    original = _save(image, 'JPEG', os.path.join(
+        os.path.dirname(name), stem + '.jpg'))
+    widths = [width for width in settings.IMAGE_WIDTHS if width < image.width]
+    widths.append(image.width)
+    variants = {}
+    for mime, image_format, extension in FORMATS:
+        variants[mime] = [
+            [width, _save(
+                image if width == image.width else _resized(image, width),
+                image_format,
+                '%s%s-%s.%s' % (VARIANTS_DIR, stem, width, extension),
+            )]
+            for width in widths
+        ]
+    return original, image.size, variants
+
+
+def _delete(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def ingest(post_id, name):
+    """Обрабатывает картинку поста, если пост всё ещё ссылается на name."""
+    original, (width, height), variants = encode(name)
+    created = [original] + [
+        variant for sources in variants.values()
+        for _, variant in sources
+    ]
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id, image=name).first()
+    if post is None:
+        # Картинку успели заменить или удалить вместе с постом.
+        _delete(created)
+        return False
+    post.image = original
+    post.image_width = width
+    post.image_height = height
+    post.image_variants = json.dumps(variants)
+    post.save(update_fields=[
+        'image', 'image_width', 'image_height', 'image_variants',
+        'modified'])
+    default_storage.delete(name)
+    return True
+
+
+def sources(post):
+    """Пары (MIME-тип, srcset) готовых вариантов картинки поста."""
+    if not post.image_variants:
+        return []
+    return [
+        (mime, ', '.join(
+            '%s %sw' % (default_storage.url(name), width)
+            for width, name in variants))
+        for mime, variants in json.loads(post.image_variants).items()
+    ]
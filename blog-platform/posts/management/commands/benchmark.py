@@ -0,0 +1,71 @@
+import json
+
+from core import benchmark
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seed import sample_objects
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает именованные адреса posts, users и about параллельными '
+        'клиентами и выводит p50/p95/p99, число запросов к базе и RSS. '
+        'Запросы выполняет django.test.Client в потоках этого процесса, '
+        'без HTTP-сервера и WSGI-воркеров, поэтому цифры годятся для '
+        'сравнения прогонов, но не для оценки развёрнутого сайта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument(
+            '--namespace', action='append', dest='namespaces',
+            help='Пространство имён адресов; можно указать несколько раз.')
+        parser.add_argument(
+            '--output', help='Куда сохранить результаты в JSON.')
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения.')
+
+    def handle(self, *args, **options):
+        user, kwargs = sample_objects()
+        if user is None:
+            raise CommandError(
+                'В базе нет постов: сначала выполните seed_data.')
+        routes = benchmark.named_routes(
+            options['namespaces'] or benchmark.NAMESPACES)
+        urls, skipped = benchmark.route_urls(routes, kwargs)
+        for name in skipped:
+            self.stderr.write('Пропущен %s: нет данных для адреса' % name)
+        report = benchmark.run(
+            urls,
+            user,
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            warmup=options['warmup'],
+        )
+        self.write_report(report)
+        if options['compare']:
+            with open(options['compare']) as previous:
+                self.write_changes(
+                    benchmark.compare(json.load(previous), report))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+
+    def write_report(self, report):
+        self.stdout.write('%-32s %8s %8s %8s %8s %7s %8s' % (
+            'адрес', 'p50 мс', 'p95 мс', 'p99 мс', 'запросы', 'ошибки',
+            'RSS МБ'))
+        for name, result in report['routes'].items():
+            self.stdout.write(
+                '%-32s %8.1f %8.1f %8.1f %8.1f %7d %8.1f' % (
+                    name, result['p50_ms'], result['p95_ms'],
+                    result['p99_ms'], result['queries'], result['errors'],
+                    result['rss_mb']))
+
+    def write_changes(self, changes):
+        self.stdout.write('Изменения относительно прошлого прогона:')
+        for name, delta in changes.items():
+            self.stdout.write('%-32s %s' % (name, ', '.join(
+                '%s %+.1f' % item for item in delta.items())))
@@ -0,0 +1,81 @@
+import json
+
+from core import benchmark
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from posts.seed import sample_objects
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает базу из нескольких процессов чтениями поста и главной '
+        'и записями комментариев и постов и выводит пропускную '
+        'способность до и после настройки SQLite. Записи остаются в базе: '
+        'запускайте на копии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Секунд на каждый режим.')
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Доля записей среди запросов.')
+        parser.add_argument(
+            '--mode', action='append', dest='modes',
+            choices=list(benchmark.DATABASE_MODES),
+            help='Режим базы; по умолчанию все по очереди.')
+        parser.add_argument(
+            '--output', help='Куда сохранить результаты в JSON.')
+
+    def handle(self, *args, **options):
+        user, kwargs = sample_objects()
+        if user is None:
+            raise CommandError(
+                'В базе нет постов: сначала выполните seed_data.')
+        post_id = kwargs['post_id']
+        reads = [
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=(post_id,)),
+        ]
+        writes = [
+            (reverse('posts:add_comment', args=(post_id,)),
+             {'text': 'Комментарий под нагрузкой'}),
+            (reverse('posts:post_create'), {'text': 'Пост под нагрузкой'}),
+        ]
+        reports = [
+            benchmark.contention(
+                reads,
+                writes,
+                user,
+                mode=mode,
+                processes=options['processes'],
+                duration=options['duration'],
+                write_ratio=options['write_ratio'],
+            )
+            for mode in options['modes'] or benchmark.DATABASE_MODES
+        ]
+        self.write_reports(reports)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(reports, output, indent=2, ensure_ascii=False)
+
+    def write_reports(self, reports):
+        self.stdout.write('%-10s %-7s %9s %9s %8s %8s %8s' % (
+            'режим', 'запросы', 'операций', 'в сек.', 'p95 мс', 'p99 мс',
+            'ошибки'))
+        for report in reports:
+            for kind in ('read', 'write', 'total'):
+                result = report[kind]
+                self.stdout.write('%-10s %-7s %9d %9.1f %8s %8s %8d' % (
+                    report['mode'], kind, result['operations'],
+                    result['per_second'],
+                    _milliseconds(result['p95_ms']),
+                    _milliseconds(result['p99_ms']),
+                    result['errors']))
+
+
+def _milliseconds(value):
+    return '-' if value is None else '%.1f' % value
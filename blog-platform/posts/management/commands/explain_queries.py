@@ -0,0 +1,94 @@
+from core import benchmark, explain
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+
+from posts.seed import sample_objects
+
+# Формы, которые отправляются на адреса помимо GET.
+POST_DATA = {
+    'posts:post_create': {'text': 'Проверка планов запросов'},
+    'posts:post_edit': {'text': 'Проверка планов запросов'},
+    'posts:add_comment': {'text': 'Проверка планов запросов'},
+}
+
+QUERY_STRINGS = {
+    'posts:search': 'q=пост',
+}
+
+# Шаги планов, которые допустимы: (адрес, начало шага) -> причина.
+ALLOWED_STEPS = {
+    ('posts:search', 'USE TEMP B-TREE FOR ORDER BY'):
+        'FTS5 упорядочивает найденные строки по рангу только сортировкой',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет адреса posts.urls на текущей базе, получает '
+        'EXPLAIN QUERY PLAN каждого запроса и отмечает полный просмотр '
+        'таблиц и сортировку во временном B-дереве. Изменения данных '
+        'откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Печатать планы всех запросов, а не только проблемных.')
+
+    def handle(self, *args, verbose_plans=False, **options):
+        user, kwargs = sample_objects()
+        if user is None:
+            raise CommandError(
+                'В базе нет постов: сначала выполните seed_data.')
+        urls, skipped = benchmark.route_urls(
+            benchmark.named_routes(('posts',)), kwargs)
+        for name in skipped:
+            self.stderr.write('Пропущен %s: нет данных для адреса' % name)
+        client = Client(REMOTE_ADDR=benchmark.REMOTE_ADDR)
+        client.force_login(user)
+        found = 0
+        with transaction.atomic():
+            for name, url in urls.items():
+                found += self.check_route(client, name, url, verbose_plans)
+            transaction.set_rollback(True)
+        if found:
+            raise CommandError('Проблемных шагов в планах: %s' % found)
+        self.stdout.write(self.style.SUCCESS(
+            'Планы запросов %s адресов без полных просмотров и '
+            'временных сортировок' % len(urls)))
+
+    def request(self, client, name, url):
+        if name in QUERY_STRINGS:
+            url += '?' + QUERY_STRINGS[name]
+        with explain.capture() as queries:
+            if name in POST_DATA:
+                client.post(url, POST_DATA[name])
+            else:
+                client.get(url)
+        return queries
+
+    def check_route(self, client, name, url, verbose_plans):
+        found = 0
+        seen = set()
+        for sql, params in self.request(client, name, url):
+            if sql in seen:
+                continue
+            seen.add(sql)
+            plan = explain.explain(sql, params)
+            if plan is None:
+                continue
+            bad = [
+                step for step in explain.problems(plan)
+                if not any(
+                    step.startswith(prefix)
+                    for route, prefix in ALLOWED_STEPS if route == name)
+            ]
+            found += len(bad)
+            if bad or verbose_plans:
+                style = self.style.ERROR if bad else self.style.SUCCESS
+                self.stdout.write(style('%s: %s' % (name, sql)))
+                for step in plan:
+                    self.stdout.write('    %s%s' % (
+                        '!! ' if step in bad else '', step))
+        return found
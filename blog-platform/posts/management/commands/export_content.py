@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, пользователей, посты, комментарии и подписки '
+        'в файл JSON Lines, картинки постов — в tar-архив. Прерванная '
+        'выгрузка продолжается с сохранённой точки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--images', default=None,
+            help='Файл tar-архива для картинок постов.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать заново, не продолжая с сохранённой точки.')
+
+    def report(self, kind, count, rate):
+        self.stdout.write('%s: %s, %.0f строк/с' % (kind, count, rate))
+
+    def handle(self, *args, **options):
+        if options['restart']:
+            transfer.remove_checkpoint(options['path'])
+        counts = transfer.export(
+            options['path'],
+            images=options['images'],
+            batch_size=options['batch_size'],
+            report=self.report,
+        )
+        self.stdout.write(self.style.SUCCESS('Выгружено: %s' % ', '.join(
+            '%s %s' % item for item in counts.items())))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_content пачками и пересчитывает '
+        'счётчики, ленты подписок и поисковый индекс. Прерванная '
+        'загрузка продолжается с сохранённой точки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--images', default=None,
+            help='tar-архив картинок из export_content.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать заново, не продолжая с сохранённой точки.')
+
+    def report(self, kind, count, rate):
+        self.stdout.write('%s: %s, %.0f строк/с' % (kind, count, rate))
+
+    def handle(self, *args, **options):
+        if options['restart']:
+            transfer.remove_checkpoint(options['path'])
+        counts = transfer.load(
+            options['path'],
+            images=options['images'],
+            batch_size=options['batch_size'],
+            report=self.report,
+        )
+        self.stdout.write(self.style.SUCCESS('Загружено: %s' % ', '.join(
+            '%s %s' % item for item in counts.items())))
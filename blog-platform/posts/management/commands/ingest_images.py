@@ -0,0 +1,50 @@
+import logging
+import time
+
+from core.background import create_executor
+from django.core.management.base import BaseCommand
+
+from posts import images
+from posts.models import Post
+from posts.utils import batches
+
+logger = logging.getLogger(__name__)
+
+
+def process_safely(post_id, name):
+    try:
+        images.process(post_id, name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+        return False
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        'Перекодирует картинки постов, загруженные до обработки, и создаёт '
+        'их варианты и миниатюры в пуле процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=256)
+
+    def handle(self, *args, workers, batch_size, **options):
+        rows = (
+            Post.objects.exclude(image='')
+            .filter(image_variants='')
+            .order_by('pk')
+            .values_list('pk', 'image')
+        )
+        started = time.monotonic()
+        done = failed = 0
+        with create_executor(workers) as executor:
+            for batch in batches(
+                    rows.iterator(chunk_size=batch_size), batch_size):
+                results = list(executor.map(process_safely, *zip(*batch)))
+                done += results.count(True)
+                failed += results.count(False)
+        self.stdout.write(self.style.SUCCESS(
+            'Обработано картинок: %s, ошибок: %s, за %.1f с'
+            % (done, failed, time.monotonic() - started)))
@@ -0,0 +1,46 @@
+import logging
+import time
+
+from core.background import create_executor
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+from posts.utils import batches
+
+logger = logging.getLogger(__name__)
+
+
+def generate_safely(name):
+    try:
+        thumbnails.generate(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+        return False
+    return True
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры всех картинок постов в пуле процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=256)
+
+    def handle(self, *args, workers, batch_size, **options):
+        names = (
+            Post.objects.exclude(image='')
+            .order_by('pk')
+            .values_list('image', flat=True)
+        )
+        started = time.monotonic()
+        done = failed = 0
+        with create_executor(workers) as executor:
+            for batch in batches(
+                    names.iterator(chunk_size=batch_size), batch_size):
+                results = list(executor.map(generate_safely, batch))
+                done += results.count(True)
+                failed += results.count(False)
+        self.stdout.write(self.style.SUCCESS(
+            'Обработано картинок: %s, ошибок: %s, за %.1f с'
+            % (done, failed, time.monotonic() - started)))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id пользователя; по умолчанию пересобираются все ленты.',
+        )
+
+    def handle(self, *args, user_ids=None, **options):
+        rebuilt = timeline.rebuild(user_ids)
+        self.stdout.write(
+            self.style.SUCCESS('Пересобрано лент: %s' % rebuilt))
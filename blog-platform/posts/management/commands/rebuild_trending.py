@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинги популярных постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        rebuilt = trending.rebuild(batch_size)
+        self.stdout.write(
+            self.style.SUCCESS('Пересчитано рейтингов: %s' % rebuilt))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        users = counters.recount_users(batch_size)
+        posts = counters.recount_comments(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            'Исправлено счётчиков: пользователей %s, постов %s'
+            % (users, posts)))
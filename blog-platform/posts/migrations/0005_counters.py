@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0004_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('followers_count', models.PositiveIntegerField(db_index=True, default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunSQL(
+            'INSERT INTO posts_usercounter '
+            '(user_id, posts_count, followers_count, following_count) '
+            'SELECT u.id, '
+            '(SELECT COUNT(*) FROM posts_post p WHERE p.author_id = u.id), '
+            '(SELECT COUNT(*) FROM posts_follow f WHERE f.author_id = u.id), '
+            '(SELECT COUNT(*) FROM posts_follow f WHERE f.user_id = u.id) '
+            'FROM auth_user u',
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            'UPDATE posts_post SET comments_count = '
+            '(SELECT COUNT(*) FROM posts_comment c '
+            'WHERE c.post_id = posts_post.id)',
+            migrations.RunSQL.noop,
+        ),
+    ]
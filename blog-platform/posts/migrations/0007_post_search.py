@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_modified'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE VIRTUAL TABLE posts_post_fts USING fts5('
+            'text, author, group_title, '
+            "tokenize = 'unicode61 remove_diacritics 2', "
+            "prefix = '2 3')",
+            'DROP TABLE posts_post_fts',
+        ),
+        migrations.RunSQL(
+            'INSERT INTO posts_post_fts (posts_post_fts, rank) '
+            "VALUES ('rank', 'bm25(1.0, 0.5, 0.5)')",
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            'INSERT INTO posts_post_fts (rowid, text, author, group_title) '
+            'SELECT p.id, p.text, '
+            "u.first_name || ' ' || u.last_name || ' ' || u.username, "
+            "COALESCE(g.title, '') "
+            'FROM posts_post p '
+            'JOIN auth_user u ON u.id = p.author_id '
+            'LEFT JOIN posts_group g ON g.id = p.group_id',
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -26,11 +26,16 @@ class Post(models.Model):
         'Дата и время публикации',
         auto_now_add=True
     )
+    modified = models.DateTimeField(
+        'Дата и время изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='posts',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False
     )
     group = models.ForeignKey(
         Group,
@@ -39,20 +44,61 @@ class Post(models.Model):
         blank=True,
         null=True,
         verbose_name='Группа',
-        help_text='Группа, к которой будет относиться пост'
+        help_text='Группа, к которой будет относиться пост',
+        db_index=False
     )
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', null=True, editable=False)
+    image_variants = models.TextField(
+        'Варианты картинки', blank=True, editable=False)
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['pub_date', 'id'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', 'pub_date', 'id'],
+                name='post_group_pub_date_idx'),
+        ]
+
+    # Счётчики меняются только атомарными UPDATE из posts.counters.
+    COUNTER_FIELDS = ('comments_count',)
 
     def __str__(self):
         return self.text
 
+    def save(self, *args, update_fields=None, **kwargs):
+        # Полное сохранение уже существующего поста не перезаписывает
+        # счётчики значениями, прочитанными до правки.
+        if update_fields is None and not self._state.adding:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Группа на момент чтения: при переносе поста меняются обе.
+        post.loaded_group_id = post.__dict__.get('group_id')
+        return post
+
 
 class Comment(CreatedModel):
     post = models.ForeignKey(
@@ -60,7 +106,8 @@ class Comment(CreatedModel):
         on_delete=models.CASCADE,
         related_name='comments',
         verbose_name='Пост',
-        help_text='Пост, к которому будет относиться комментарий'
+        help_text='Пост, к которому будет относиться комментарий',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
@@ -72,6 +119,13 @@ class Comment(CreatedModel):
         help_text='Текст нового комментария'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'),
+        ]
+
     def __str__(self):
         return self.text
 
@@ -85,13 +139,146 @@ class Follow(models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='following'
+        related_name='following',
+        db_index=False
     )
 
     class Meta:
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'author'], name='unique_follow')]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'),
+            models.Index(
+                fields=['author', 'id'], name='follow_author_id_idx'),
+            models.Index(
+                fields=['user', 'id'], name='follow_user_id_idx'),
+        ]
 
     def __str__(self):
         return self.user, self.author
+
+
+class UserCounter(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0, db_index=True)
+    following_count = models.PositiveIntegerField(default=0)
+    unread_notifications = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: пост автора у подписчика."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry')]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_pub_date_idx'),
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author_idx'),
+        ]
+
+
+class PostScore(models.Model):
+    """Рейтинг поста для популярного: log2 суммы затухающих весов."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        db_index=False,
+    )
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['score', 'post'], name='post_score_idx'),
+            models.Index(
+                fields=['group', 'score', 'post'],
+                name='post_score_group_idx'),
+        ]
+
+    def __str__(self):
+        return '%s: %s' % (self.post_id, self.score)
+
+
+class Notification(models.Model):
+    """Событие во входящих: однотипные события собираются в одну строку."""
+    POST = 'post'
+    COMMENT = 'comment'
+    KINDS = (
+        (POST, 'Новый пост автора'),
+        (COMMENT, 'Новый комментарий к посту'),
+    )
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        db_index=False,
+    )
+    key = models.CharField(max_length=32)
+    kind = models.CharField(max_length=16, choices=KINDS)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    count = models.PositiveIntegerField(default=1)
+    unread = models.BooleanField(default=True)
+    updated = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipient', 'key'], name='unique_notification')]
+        indexes = [
+            models.Index(
+                fields=['recipient', 'updated', 'id'],
+                name='notification_recipient_idx'),
+        ]
+
+    def __str__(self):
+        return '%s: %s' % (self.recipient_id, self.key)
@@ -0,0 +1,175 @@
+"""Входящие: новые посты авторов из подписок и комментарии к своим постам.
+
+События раскладываются по получателям фоновой задачей, пачками по
+``NOTIFICATION_BATCH_SIZE`` строк за транзакцию, а не в запросе
+``post_create`` или ``add_comment``. Однотипные события собираются в одну
+строку на получателя с ключом ``KEY``: новые посты одного автора и новые
+комментарии к одному посту увеличивают ``count`` непрочитанной строки.
+
+Число непрочитанных строк ведёт ``UserCounter.unread_notifications`` в
+той же транзакции, что и сами строки, а страницы читают его из кеша,
+где оно живёт ``NOTIFICATION_UNREAD_TIMEOUT`` секунд; при промахе кеша
+это один запрос по первичному ключу. Кеш меняется внутри пишущей
+транзакции, поэтому одновременные доставка и прочтение оставляют его в
+том же порядке, что и базу. Строки, удалённые вместе с постом или
+пользователем, пересчитываются через ``recount_unread``. Старые строки
+удаляет команда ``prune_notifications``.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from core import db
+from core.background import run_in_background
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Follow, Notification, UserCounter
+from .utils import batches
+
+NOTIFICATION_ORDERING = ('-updated', '-pk')
+
+UNREAD_KEY = 'inbox:unread:%s'
+
+KEY = {
+    Notification.POST: 'post:%s',
+    Notification.COMMENT: 'comment:%s',
+}
+
+UPSERT_SQL = (
+    'INSERT INTO {table} '
+    '(recipient_id, key, kind, post_id, actor_id, count, unread, updated) '
+    'VALUES (%s, %s, %s, %s, %s, 1, 1, %s) '
+    'ON CONFLICT (recipient_id, key) DO UPDATE SET '
+    'count = CASE WHEN unread THEN count + 1 ELSE 1 END, '
+    'unread = 1, post_id = excluded.post_id, '
+    'actor_id = excluded.actor_id, updated = excluded.updated'
+)
+
+
+def post_published(post):
+    run_in_background(
+        fan_out_post, post.pk, post.author_id, key='notify:%s' % post.pk)
+
+
+def comment_added(comment, post_author_id):
+    if comment.author_id != post_author_id:
+        run_in_background(
+            deliver, Notification.COMMENT, comment.post_id,
+            comment.post_id, comment.author_id, [post_author_id])
+
+
+def fan_out_post(post_id, author_id):
+    """Раскладывает новый пост подписчикам автора пачками."""
+    followers = (
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=settings.NOTIFICATION_BATCH_SIZE)
+    )
+    for recipients in batches(followers, settings.NOTIFICATION_BATCH_SIZE):
+        deliver(Notification.POST, author_id, post_id, author_id, recipients)
+
+
+def deliver(kind, subject_id, post_id, actor_id, recipients):
+    """Добавляет событие получателям одной транзакцией."""
+    updated = connection.ops.adapt_datetimefield_value(timezone.now())
+    key = KEY[kind] % subject_id
+    rows = [
+        (recipient, key, kind, post_id, actor_id, updated)
+        for recipient in recipients]
+    db.write(_upsert, key, recipients, rows)
+
+
+def _upsert(key, recipients, rows):
+    # Счётчик растёт только у тех, у кого строка ещё не была непрочитанной.
+    unread = set(
+        Notification.objects.filter(
+            recipient_id__in=recipients, key=key, unread=True)
+        .values_list('recipient_id', flat=True))
+    UserCounter.objects.filter(
+        user_id__in=[
+            recipient for recipient in recipients
+            if recipient not in unread]
+    ).update(unread_notifications=F('unread_notifications') + 1)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            UPSERT_SQL.format(table=Notification._meta.db_table), rows)
+    cache.delete_many([UNREAD_KEY % recipient for recipient in recipients])
+
+
+def inbox(user):
+    return Notification.objects.filter(recipient=user).select_related(
+        'post', 'actor')
+
+
+def unread_count(user):
+    key = UNREAD_KEY % user.pk
+    count = cache.get(key)
+    if count is None:
+        count = UserCounter.objects.filter(user=user).values_list(
+            'unread_notifications', flat=True).first() or 0
+        cache.set(key, count, settings.NOTIFICATION_UNREAD_TIMEOUT)
+    return count
+
+
+def mark_read(user):
+    if cache.get(UNREAD_KEY % user.pk) == 0:
+        return
+    db.write(_mark_read, user)
+
+
+def _mark_read(user):
+    Notification.objects.filter(recipient=user, unread=True).update(
+        unread=False)
+    UserCounter.objects.filter(user=user).update(unread_notifications=0)
+    cache.set(
+        UNREAD_KEY % user.pk, 0, settings.NOTIFICATION_UNREAD_TIMEOUT)
+
+
+def unread_recipients(**lookups):
+    """Получатели непрочитанных строк, отобранных lookups."""
+    return list(
+        Notification.objects.filter(unread=True, **lookups)
+        .order_by().values_list('recipient_id', flat=True).distinct())
+
+
+def recount_unread(recipients):
+    """Пересчитывает непрочитанные получателей по оставшимся строкам."""
+    if not recipients:
+        return
+    unread = (
+        Notification.objects.filter(
+            recipient_id=OuterRef('user_id'), unread=True)
+        .order_by().values('recipient_id')
+        .annotate(total=Count('pk')).values('total'))
+    UserCounter.objects.filter(user_id__in=recipients).update(
+        unread_notifications=Coalesce(Subquery(unread), 0))
+    cache.delete_many([UNREAD_KEY % recipient for recipient in recipients])
+
+
+def prune(days, batch_size=1000):
+    """Удаляет строки старше days дней и возвращает их число."""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = 0
+    while True:
+        rows = list(
+            Notification.objects.filter(updated__lt=cutoff)
+            .values_list('pk', 'recipient_id', 'unread')[:batch_size])
+        if not rows:
+            return deleted
+        db.write(_delete, rows)
+        deleted += len(rows)
+
+
+def _delete(rows):
+    Notification.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+    unread = Counter(
+        recipient for _, recipient, is_unread in rows if is_unread)
+    for recipient, count in unread.items():
+        UserCounter.objects.filter(
+            user_id=recipient, unread_notifications__gte=count,
+        ).update(unread_notifications=F('unread_notifications') - count)
+    cache.delete_many([UNREAD_KEY % recipient for recipient in unread])
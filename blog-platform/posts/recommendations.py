@@ -0,0 +1,305 @@
+"""Рекомендации «кого почитать» по графу подписок.
+
+Граф подписок хранится в памяти процесса в виде CSR: для каждого
+пользователя срез массива ``array`` с id авторов, отсортированных по
+возрастанию, и такой же обратный граф подписчиков. Загружается он
+одним запросом, а дальше догоняет базу по журналу изменений в кеше:
+каждая подписка и отписка увеличивают ``VERSION_KEY`` и записывают
+изменение под ключом своей версии. Если записи журнала не хватает или
+граф старше ``FOLLOW_GRAPH_MAX_AGE`` секунд, он загружается заново.
+
+Граф читается из базы вне общей блокировки и подменяется целиком:
+пока один поток его загружает, остальные отвечают по прежнему графу.
+
+Кандидаты — авторы, на которых подписаны авторы пользователя (друзья
+друзей, вес ``FRIEND``), и авторы, на которых подписаны другие
+подписчики тех же авторов (совместные подписки, вес ``COFOLLOW``).
+Обход ограничен случайной выборкой из ``SUGGESTIONS_SAMPLE`` подписчиков
+на автора и
+``SUGGESTIONS_MAX_VISITS`` рёбрами на оба вида кандидатов, а готовый
+список хранится в кеше ``SUGGESTIONS_TIMEOUT`` секунд.
+"""
+import heapq
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow, User
+
+VERSION_KEY = 'follow_graph:version'
+CHANGE_KEY = 'follow_graph:change:%s'
+CHANGE_TIMEOUT = 60 * 60 * 24
+# Больше изменений дешевле перечитать из базы, чем догонять по журналу.
+CHANGE_LIMIT = 1000
+SUGGESTIONS_KEY = 'suggestions:%s'
+
+FRIEND = 2
+COFOLLOW = 1
+
+
+class Adjacency:
+    """Списки смежности CSR с небольшим словарём поправок поверх.
+
+    Соседи узла node — ``targets[offsets[node]:offsets[node + 1]]``,
+    отсортированные по возрастанию.
+    """
+
+    def __init__(self, offsets=None, targets=None):
+        self.offsets = offsets or array('q', [0])
+        self.targets = targets or array('q')
+        self.added = {}
+        self.removed = {}
+        self.changes = 0
+
+    @classmethod
+    def from_sorted(cls, sources, targets):
+        """Строит списки по рёбрам, упорядоченным по (source, target)."""
+        counts = Counter(sources)
+        size = max(counts, default=-1) + 1
+        offsets = array('q', bytes(8 * (size + 1)))
+        for node in range(size):
+            offsets[node + 1] = offsets[node] + counts[node]
+        return cls(offsets, array('q', targets))
+
+    def transposed(self):
+        """Обратные списки: сортировка подсчётом без сортировки пар."""
+        counts = Counter(self.targets)
+        size = max(counts, default=-1) + 1
+        offsets = array('q', bytes(8 * (size + 1)))
+        for node in range(size):
+            offsets[node + 1] = offsets[node] + counts[node]
+        position = array('q', offsets)
+        targets = array('q', bytes(8 * len(self.targets)))
+        for node in range(len(self.offsets) - 1):
+            for target in self.targets[
+                    self.offsets[node]:self.offsets[node + 1]]:
+                targets[position[target]] = node
+                position[target] += 1
+        return Adjacency(offsets, targets)
+
+    def _bounds(self, node):
+        if node + 1 >= len(self.offsets):
+            return 0, 0
+        return self.offsets[node], self.offsets[node + 1]
+
+    def _stored(self, node, target):
+        low, high = self._bounds(node)
+        index = bisect_left(self.targets, target, low, high)
+        return index < high and self.targets[index] == target
+
+    def get(self, node):
+        low, high = self._bounds(node)
+        stored = self.targets[low:high]
+        if node not in self.added and node not in self.removed:
+            return stored
+        removed = self.removed.get(node, ())
+        return sorted(
+            [target for target in stored if target not in removed]
+            + list(self.added.get(node, ())))
+
+    def add(self, node, target):
+        if self._stored(node, target):
+            self.removed.get(node, set()).discard(target)
+        else:
+            self.added.setdefault(node, set()).add(target)
+        self.changes += 1
+
+    def remove(self, node, target):
+        if self._stored(node, target):
+            self.removed.setdefault(node, set()).add(target)
+        else:
+            self.added.get(node, set()).discard(target)
+        self.changes += 1
+
+    def nodes(self):
+        return range(max(
+            [len(self.offsets) - 1]
+            + [node + 1 for node in self.added]))
+
+    def compact(self):
+        """Переносит поправки в массивы, когда их стало много."""
+        if self.changes <= max(1000, len(self.targets) // 10):
+            return self
+        sources, targets = array('q'), array('q')
+        for node in self.nodes():
+            for target in self.get(node):
+                sources.append(node)
+                targets.append(target)
+        return Adjacency.from_sorted(sources, targets)
+
+
+class FollowGraph:
+    def __init__(self, users, authors, version=0):
+        """users и authors — рёбра подписок по возрастанию (user, author)."""
+        self.following = Adjacency.from_sorted(users, authors)
+        self.followers = self.following.transposed()
+        self.version = version
+        self.loaded = time.monotonic()
+
+    @classmethod
+    def from_pairs(cls, pairs, version=0):
+        """Граф по парам (user, author), упорядоченным по возрастанию."""
+        users, authors = array('q'), array('q')
+        previous = None
+        for pair in pairs:
+            if previous is not None and pair <= previous:
+                raise ValueError('Follow pairs must be sorted and unique')
+            users.append(pair[0])
+            authors.append(pair[1])
+            previous = pair
+        return cls(users, authors, version)
+
+    @classmethod
+    def load(cls, version):
+        return cls.from_pairs(
+            Follow.objects.order_by('user_id', 'author_id').values_list(
+                'user_id', 'author_id').iterator(
+                chunk_size=settings.TIMELINE_BATCH_SIZE),
+            version)
+
+    def apply(self, user_id, author_id, followed):
+        if followed:
+            self.following.add(user_id, author_id)
+            self.followers.add(author_id, user_id)
+        else:
+            self.following.remove(user_id, author_id)
+            self.followers.remove(author_id, user_id)
+        self.following = self.following.compact()
+        self.followers = self.followers.compact()
+
+    def suggest(self, user_id, limit):
+        """Id авторов для user_id по убыванию веса."""
+        following = self.following.get(user_id)
+        friends, cofollows = Counter(), Counter()
+        visits = 0
+        for author_id in following:
+            authors = self.following.get(author_id)
+            friends.update(authors)
+            visits += len(authors)
+            if visits >= settings.SUGGESTIONS_MAX_VISITS:
+                break
+        for author_id in following:
+            if visits >= settings.SUGGESTIONS_MAX_VISITS:
+                break
+            followers = self.followers.get(author_id)
+            if len(followers) > settings.SUGGESTIONS_SAMPLE:
+                followers = random.sample(
+                    list(followers), settings.SUGGESTIONS_SAMPLE)
+            for follower_id in followers:
+                if follower_id == user_id:
+                    continue
+                authors = self.following.get(follower_id)
+                cofollows.update(authors)
+                visits += len(authors)
+                if visits >= settings.SUGGESTIONS_MAX_VISITS:
+                    break
+        scores = Counter({
+            author_id: count * COFOLLOW
+            for author_id, count in cofollows.items()})
+        for author_id, count in friends.items():
+            scores[author_id] += count * FRIEND
+        excluded = set(following)
+        excluded.add(user_id)
+        return heapq.nsmallest(
+            limit,
+            (author_id for author_id in scores if author_id not in excluded),
+            key=lambda author_id: (-scores[author_id], author_id))
+
+
+_graph = None
+# _lock защищает подмену графа и применение журнала, _loading — загрузку.
+_lock = threading.Lock()
+_loading = threading.Lock()
+
+
+def _remote_version():
+    # Журнал после очистки кеша начинается со случайной версии, чтобы
+    # ни один процесс не принял свой старый граф за актуальный.
+    cache.add(VERSION_KEY, random.randrange(2 ** 48), None)
+    return cache.get(VERSION_KEY, 0)
+
+
+def _catch_up(graph, version):
+    """Применяет журнал к графу; False, если граф нужно перечитать."""
+    if (not 0 <= version - graph.version <= CHANGE_LIMIT
+            or time.monotonic() - graph.loaded
+            > settings.FOLLOW_GRAPH_MAX_AGE):
+        return False
+    if version > graph.version:
+        keys = [
+            CHANGE_KEY % number
+            for number in range(graph.version + 1, version + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return False
+        for key in keys:
+            graph.apply(*changes[key])
+        graph.version = version
+    return True
+
+
+def _reload(version, stale):
+    global _graph
+    # Без графа ждём того, кто его уже загружает, а со старым графом
+    # отвечаем по нему, пока загрузка идёт в другом потоке.
+    if not _loading.acquire(blocking=stale is None):
+        return stale
+    try:
+        if _graph is not stale:
+            return _graph
+        graph = FollowGraph.load(version)
+        with _lock:
+            _graph = graph
+        return graph
+    finally:
+        _loading.release()
+
+
+def get_graph():
+    """Граф процесса, догнавший журнал изменений."""
+    version = _remote_version()
+    with _lock:
+        graph = _graph
+        if graph is not None and _catch_up(graph, version):
+            return graph
+    return _reload(version, graph)
+
+
+def _bump():
+    _remote_version()
+    return cache.incr(VERSION_KEY)
+
+
+def follow_changed(user_id, author_id, followed):
+    """Записывает подписку или отписку в журнал графа."""
+    cache.set(
+        CHANGE_KEY % _bump(), (user_id, author_id, followed),
+        CHANGE_TIMEOUT)
+    cache.delete(SUGGESTIONS_KEY % user_id)
+
+
+def reset():
+    """Заставляет процессы перечитать граф после вставки в обход сигналов."""
+    _bump()
+
+
+def suggestions_for(user):
+    """Пары (username, полное имя) рекомендованных авторов."""
+    if not user.is_authenticated:
+        return []
+    key = SUGGESTIONS_KEY % user.pk
+    suggestions = cache.get(key)
+    if suggestions is None:
+        ids = get_graph().suggest(user.pk, settings.SUGGESTIONS_COUNT)
+        users = User.objects.in_bulk(ids) if ids else {}
+        suggestions = [
+            (users[pk].username, users[pk].get_full_name())
+            for pk in ids if pk in users]
+        cache.set(key, suggestions, settings.SUGGESTIONS_TIMEOUT)
+    return suggestions
@@ -0,0 +1,144 @@
+"""Полнотекстовый поиск по постам на индексе SQLite FTS5.
+
+Таблица ``posts_post_fts`` хранит текст поста, имя автора и название
+группы; rowid строки совпадает с id поста. Индекс обновляется сигналами
+моделей, а целиком пересобирается командой ``rebuild_search_index``.
+Результаты ранжируются по BM25 и листаются той же keyset-пагинацией,
+что и ленты: курсор содержит пару (rank, id).
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post, User
+
+SEARCH_TABLE = 'posts_post_fts'
+SEARCH_ORDERING = ('rank', 'pk')
+SEARCH_USER_FIELDS = {'first_name', 'last_name', 'username'}
+
+MAX_TERMS = 16
+SNIPPET_TOKENS = 32
+
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+INDEX_SQL = (
+    'INSERT OR REPLACE INTO {table} (rowid, text, author, group_title) '
+    'SELECT p.id, p.text, '
+    "u.first_name || ' ' || u.last_name || ' ' || u.username, "
+    "COALESCE(g.title, '') "
+    'FROM posts_post p '
+    'JOIN {users} u ON u.id = p.author_id '
+    'LEFT JOIN posts_group g ON g.id = p.group_id'
+)
+
+
+def match_expression(query):
+    """Запрос FTS5 из слов пользователя: все слова, каждое как префикс."""
+    terms = re.findall(r'\w+', query.lower())[:MAX_TERMS]
+    return ' '.join('"%s"*' % term for term in terms)
+
+
+def _execute(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql.format(table=SEARCH_TABLE, users=User._meta.db_table),
+            params)
+
+
+def _reindex(where, params):
+    _execute(INDEX_SQL + ' WHERE ' + where, params)
+
+
+def index_post(post_id):
+    _reindex('p.id = %s', [post_id])
+
+
+def reindex_author(author_id):
+    _reindex('p.author_id = %s', [author_id])
+
+
+def reindex_group(group_id):
+    _reindex('p.group_id = %s', [group_id])
+
+
+def remove_post(post_id):
+    _execute('DELETE FROM {table} WHERE rowid = %s', [post_id])
+
+
+def remove_group(group_id):
+    _execute(
+        "UPDATE {table} SET group_title = '' WHERE rowid IN "
+        '(SELECT id FROM posts_post WHERE group_id = %s)', [group_id])
+
+
+def rebuild():
+    """Пересобирает индекс по таблице постов."""
+    _execute('DELETE FROM {table}')
+    _execute(INDEX_SQL)
+    _execute("INSERT INTO {table} ({table}) VALUES ('optimize')")
+    return Post.objects.count()
+
+
+def matching_ids(query):
+    """Подзапрос id постов, подходящих под query, для filter(pk__in=...)."""
+    return RawSQL(
+        'SELECT rowid FROM %s WHERE %s MATCH %%s'
+        % (SEARCH_TABLE, SEARCH_TABLE),
+        [match_expression(query) or '""'],
+    )
+
+
+def highlight(snippet):
+    """Экранирует фрагмент и выделяет найденные слова тегом <mark>."""
+    html = escape(snippet)
+    html = html.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+    return mark_safe(html)
+
+
+class PostSearch:
+    """Источник для ``paginate``: посты, найденные по запросу."""
+
+    def __init__(self, query):
+        self.match = match_expression(query)
+
+    def to_python(self, ordering, values):
+        rank, pk = values
+        return [float(rank), int(pk)]
+
+    def _rows(self, values, reverse, offset, limit):
+        sql = (
+            'SELECT rowid, rank, snippet(%s, 0, %%s, %%s, %%s, %s) '
+            'FROM %s WHERE %s MATCH %%s'
+            % (SEARCH_TABLE, SNIPPET_TOKENS, SEARCH_TABLE, SEARCH_TABLE)
+        )
+        params = [MARK_START, MARK_END, '…', self.match]
+        if values:
+            sql += ' AND (rank {0} %s OR (rank = %s AND rowid {0} %s))'
+            sql = sql.format('<' if reverse else '>')
+            params += [values[0], values[0], values[1]]
+        sql += ' ORDER BY rank {0}, rowid {0} LIMIT %s OFFSET %s'.format(
+            'DESC' if reverse else 'ASC')
+        params += [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def keyset_slice(self, ordering, values, reverse, offset, limit):
+        if not self.match:
+            return []
+        rows = self._rows(values, reverse, offset, limit)
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [row[0] for row in rows])
+        result = []
+        for pk, rank, snippet in rows:
+            post = posts.get(pk)
+            if post is None:
+                continue
+            post.rank = rank
+            post.snippet = highlight(snippet)
+            result.append(post)
+        return result
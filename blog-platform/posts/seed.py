@@ -0,0 +1,225 @@
+"""Синтетические данные для нагрузочных замеров.
+
+Строки вставляются ``bulk_create`` пачками в обход сигналов, поэтому
+после вставки счётчики, ленты подписок и поисковый индекс
+пересчитываются целиком, а отметки свежести страниц сбрасываются.
+Популярность авторов и постов подчиняется закону Ципфа: у немногих
+авторов тысячи подписчиков, у большинства — единицы, и комментарии так
+же собираются под немногими постами.
+"""
+import io
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from . import (counters, freshness, recommendations, search, timeline,
+               trending)
+from .models import Comment, Follow, Group, Post, User
+from .utils import batches, explicit_dates
+
+PASSWORD = 'seed-password'
+ZIPF_EXPONENT = 1.1
+IMAGE_SIZE = (960, 640)
+
+WORDS = (
+    'блог', 'пост', 'кот', 'лес', 'город', 'утро', 'вечер', 'дорога',
+    'книга', 'музыка', 'море', 'горы', 'зима', 'лето', 'работа', 'друг',
+    'история', 'вопрос', 'ответ', 'идея', 'проект', 'код', 'чай', 'кофе',
+    'новый', 'старый', 'быстрый', 'тихий', 'яркий', 'далёкий', 'простой',
+    'читать', 'писать', 'думать', 'гулять', 'смотреть', 'ждать', 'знать',
+    'очень', 'снова', 'всегда', 'сегодня', 'вчера', 'почти', 'просто',
+)
+
+
+def zipf_weights(size, exponent=ZIPF_EXPONENT):
+    """Накопленные веса для random.choices: вес i-го — 1 / (i + 1) ** s."""
+    return list(accumulate(
+        1 / (rank + 1) ** exponent for rank in range(size)))
+
+
+def _last_pk(model):
+    return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+def _new_pks(model, last_pk):
+    return list(
+        model.objects.filter(pk__gt=last_pk)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+
+def _insert(model, objects, batch_size, **options):
+    """Вставляет объекты пачками и возвращает pk новых строк."""
+    last_pk = _last_pk(model)
+    for batch in batches(objects, batch_size):
+        model.objects.bulk_create(batch, **options)
+    return _new_pks(model, last_pk)
+
+
+class Seeder:
+    def __init__(self, batch_size=1000, days=365, seed=None):
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.now = timezone.now()
+        self.days = days
+
+    def sentence(self, low, high):
+        words = self.random.choices(WORDS, k=self.random.randint(low, high))
+        return ' '.join(words).capitalize() + '.'
+
+    def date(self):
+        return self.now - timedelta(
+            seconds=self.random.randint(0, self.days * 24 * 60 * 60))
+
+    def image(self, number):
+        color = tuple(self.random.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new('RGB', IMAGE_SIZE, color).save(buffer, 'JPEG')
+        return default_storage.save(
+            'posts/seed-%s.jpg' % number, ContentFile(buffer.getvalue()))
+
+    def users(self, count):
+        start = _last_pk(User) + 1
+        password = make_password(PASSWORD)
+        return _insert(User, (
+            User(
+                username='seed-%s' % number,
+                first_name=self.random.choice(WORDS).capitalize(),
+                last_name=self.random.choice(WORDS).capitalize(),
+                password=password,
+            )
+            for number in range(start, start + count)
+        ), self.batch_size)
+
+    def groups(self, count):
+        start = _last_pk(Group) + 1
+        return _insert(Group, (
+            Group(
+                title=self.sentence(1, 3),
+                slug='seed-%s' % number,
+                description=self.sentence(5, 20),
+            )
+            for number in range(start, start + count)
+        ), self.batch_size)
+
+    def posts(self, count, author_ids, group_ids, images=0):
+        if not author_ids:
+            return []
+        with_images = set(
+            self.random.sample(range(count), min(images, count)))
+        posts = (
+            Post(
+                text=self.sentence(5, 120),
+                author_id=self.random.choice(author_ids),
+                group_id=(
+                    self.random.choice(group_ids)
+                    if group_ids and self.random.random() < 0.5 else None),
+                image=self.image(number) if number in with_images else '',
+                pub_date=date,
+                modified=date,
+            )
+            for number, date in (
+                (number, self.date()) for number in range(count))
+        )
+        with explicit_dates(Post, 'pub_date', 'modified'):
+            return _insert(Post, posts, self.batch_size)
+
+    def comments(self, count, author_ids, post_ids):
+        if not post_ids:
+            return []
+        popular = post_ids[:]
+        self.random.shuffle(popular)
+        weights = zipf_weights(len(popular))
+        comments = (
+            Comment(
+                text=self.sentence(2, 30),
+                author_id=self.random.choice(author_ids),
+                post_id=post_id,
+                created=self.date(),
+            )
+            for post_id in self.random.choices(
+                popular, cum_weights=weights, k=count)
+        )
+        with explicit_dates(Comment, 'created'):
+            return _insert(Comment, comments, self.batch_size)
+
+    def follows(self, user_ids, mean):
+        """Подписки со степенным распределением числа подписчиков."""
+        authors = user_ids[:]
+        self.random.shuffle(authors)
+        weights = zipf_weights(len(authors))
+        return _insert(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in self._followed(user_id, authors, weights, mean)
+        ), self.batch_size, ignore_conflicts=True)
+
+    def _followed(self, user_id, authors, weights, mean):
+        # Парето с показателем 1.5 даёт среднее 3, отсюда деление на 3.
+        wanted = int(self.random.paretovariate(1.5) * mean / 3)
+        wanted = min(wanted, len(authors) - 1)
+        picked = set()
+        for _ in range(wanted * 3):
+            if len(picked) >= wanted:
+                break
+            author_id = self.random.choices(authors, cum_weights=weights)[0]
+            if author_id != user_id:
+                picked.add(author_id)
+        return picked
+
+
+def sample_objects():
+    """Пользователь для входа и аргументы адресов из текущей базы."""
+    post = Post.objects.select_related('author').order_by('-pk').first()
+    if post is None:
+        return None, {}
+    author = (
+        User.objects.exclude(pk=post.author_id)
+        .order_by('-counters__followers_count')
+        .first()
+    ) or post.author
+    group = Group.objects.order_by('pk').first()
+    kwargs = {
+        'post_id': post.pk,
+        'username': author.username,
+        'uidb64': 'MQ',
+        'token': 'set-password',
+        'feed_format': 'rss',
+    }
+    if group is not None:
+        kwargs['slug'] = group.slug
+    return post.author, kwargs
+
+
+def seed(users, groups, posts, comments, follows, images=0,
+         batch_size=1000, days=365, random_seed=None):
+    """Наполняет базу и возвращает число созданных строк по моделям."""
+    seeder = Seeder(batch_size, days, random_seed)
+    user_ids = seeder.users(users)
+    group_ids = seeder.groups(groups)
+    author_ids = user_ids or list(User.objects.values_list('pk', flat=True))
+    post_ids = seeder.posts(posts, author_ids, group_ids, images)
+    comment_ids = seeder.comments(comments, author_ids, post_ids)
+    follow_ids = seeder.follows(user_ids, follows)
+    counters.recount_users(batch_size)
+    counters.recount_comments(batch_size)
+    timeline.rebuild(user_ids)
+    trending.rebuild(batch_size)
+    search.rebuild()
+    recommendations.reset()
+    freshness.touch(freshness.SITE, freshness.NAMES)
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(post_ids),
+        'comments': len(comment_ids),
+        'follows': len(follow_ids),
+    }
@@ -0,0 +1,150 @@
+from django.core.signals import request_finished
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import (cards, counters, freshness, notifications, recommendations,
+               search, timeline, trending)
+from .models import Comment, Follow, Group, Post, User, UserCounter
+
+
+@receiver(request_finished)
+def request_done(**kwargs):
+    # Копившиеся события популярного записываются, даже если новых нет.
+    trending.flush()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    if created:
+        UserCounter.objects.get_or_create(user=instance)
+    elif update_fields is None or search.SEARCH_USER_FIELDS & update_fields:
+        search.reindex_author(instance.pk)
+        freshness.touch(freshness.NAMES)
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and instance.modified and not raw:
+        cards.invalidate(instance)
+
+
+def _touch_post(post):
+    """Отмечает изменение страниц, на которых виден пост."""
+    scopes = [
+        freshness.SITE,
+        freshness.post(post.pk),
+        freshness.author(post.author.username),
+    ]
+    if post.group_id is not None:
+        scopes.append(freshness.group(post.group.slug))
+    moved_from = getattr(post, 'loaded_group_id', None)
+    if moved_from not in (None, post.group_id):
+        scopes += [
+            freshness.group(slug) for slug in Group.objects.filter(
+                pk=moved_from).values_list('slug', flat=True)
+        ]
+    freshness.touch(*scopes)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_post(instance.pk)
+    _touch_post(instance)
+    if created:
+        counters.increment_user(instance.author_id, 'posts_count')
+        timeline.fan_out_post(instance)
+        trending.record(instance.pk, trending.PUBLISH)
+        notifications.post_published(instance)
+    elif getattr(instance, 'loaded_group_id', instance.group_id) != (
+            instance.group_id):
+        trending.move(instance.pk, instance.group_id)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # Входящие с этим постом удалятся каскадом раньше самого поста.
+    instance.unread_recipients = notifications.unread_recipients(
+        post_id=instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    cards.invalidate(instance)
+    search.remove_post(instance.pk)
+    _touch_post(instance)
+    counters.decrement_user(instance.author_id, 'posts_count')
+    notifications.recount_unread(
+        getattr(instance, 'unread_recipients', ()))
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    instance.unread_recipients = notifications.unread_recipients(
+        actor_id=instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    notifications.recount_unread(
+        getattr(instance, 'unread_recipients', ()))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        search.reindex_group(instance.pk)
+        freshness.touch(freshness.NAMES)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    search.remove_group(instance.pk)
+    freshness.touch(freshness.NAMES, freshness.group(instance.slug))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.increment_comments(instance.post_id)
+        freshness.touch(freshness.post(instance.post_id))
+        trending.record(instance.post_id, trending.COMMENT)
+        notifications.comment_added(instance, instance.post.author_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.decrement_comments(instance.post_id)
+    freshness.touch(freshness.post(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.increment_user(instance.author_id, 'followers_count')
+        counters.increment_user(instance.user_id, 'following_count')
+        timeline.add_author(instance.user_id, instance.author_id)
+        # Профиль автора показывает подписчиков, профиль читателя — подписки.
+        freshness.touch(
+            freshness.author(instance.author.username),
+            freshness.author(instance.user.username))
+        trending.record_follow(instance.author_id)
+        recommendations.follow_changed(
+            instance.user_id, instance.author_id, True)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.decrement_user(instance.author_id, 'followers_count')
+    counters.decrement_user(instance.user_id, 'following_count')
+    timeline.remove_author(instance.user_id, instance.author_id)
+    freshness.touch(
+        freshness.author(instance.author.username),
+        freshness.author(instance.user.username))
+    recommendations.follow_changed(
+        instance.user_id, instance.author_id, False)
@@ -0,0 +1,269 @@
+"""Ленты RSS, Atom и JSON Feed для главной, групп и профилей.
+
+Лента отдаётся потоком: генератор читает последние ``FEED_ITEMS``
+постов через ``.iterator()`` и сразу пишет каждую запись, поэтому
+память не растёт с числом постов. Готовый текст ленты кешируется до
+следующего изменения постов, авторов или групп. ``Last-Modified`` и
+``ETag`` берутся из отметок ``posts.freshness``, так что опрос без
+изменений получает 304 или ленту из кеша без обращения к базе.
+"""
+import json
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+from django.utils.text import Truncator
+
+from . import freshness
+from .models import Group, Post, User
+from .utils import POST_ORDERING
+
+BODY_KEY = 'feeds:%s:%s:%s:%s'
+TITLE_WORDS = 10
+
+
+FEED_SCOPES = (freshness.SITE, freshness.NAMES)
+
+
+def state(request, **kwargs):
+    return freshness.state(*FEED_SCOPES)
+
+
+class FeedSource:
+    def __init__(self, title, link, description, posts):
+        self.title = title
+        self.link = link
+        self.description = description
+        self.posts = posts
+
+
+def site_source():
+    return FeedSource(
+        'Последние обновления на сайте',
+        reverse('posts:index'),
+        'Новые записи всех авторов',
+        Post.objects.select_related('author', 'group'),
+    )
+
+
+def group_source(slug):
+    group = get_object_or_404(Group, slug=slug)
+    return FeedSource(
+        'Записи сообщества %s' % group.title,
+        reverse('posts:group_list', kwargs={'slug': slug}),
+        group.description,
+        Post.objects.filter(group=group).select_related('author', 'group'),
+    )
+
+
+def profile_source(username):
+    author = get_object_or_404(User, username=username)
+    return FeedSource(
+        'Все посты пользователя %s' % (
+            author.get_full_name() or author.username),
+        reverse('posts:profile', kwargs={'username': username}),
+        '',
+        Post.objects.filter(author=author).select_related('author', 'group'),
+    )
+
+
+class Feed:
+    """Пишет ленту по частям: заголовок, записи по одной, окончание."""
+    content_type = None
+
+    def __init__(self, request, source, updated):
+        self.request = request
+        self.source = source
+        self.updated = updated
+
+    def url(self, path):
+        return self.request.build_absolute_uri(path)
+
+    def post_url(self, post):
+        return self.url(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+
+    def write(self, posts):
+        yield self.header()
+        for number, post in enumerate(posts):
+            yield self.item(post, number)
+        yield self.footer()
+
+    def header(self):
+        raise NotImplementedError
+
+    def item(self, post, number):
+        raise NotImplementedError
+
+    def footer(self):
+        raise NotImplementedError
+
+
+def _title(post):
+    return Truncator(post.text).words(TITLE_WORDS)
+
+
+def _author(post):
+    return post.author.get_full_name() or post.author.username
+
+
+class RssFeed(Feed):
+    content_type = 'application/rss+xml; charset=utf-8'
+
+    def header(self):
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<rss version="2.0" '
+            'xmlns:atom="http://www.w3.org/2005/Atom" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>'
+            '<title>%s</title><link>%s</link>'
+            '<description>%s</description>'
+            '<atom:link href=%s rel="self"/>'
+            '<language>ru</language><lastBuildDate>%s</lastBuildDate>' % (
+                escape(self.source.title),
+                escape(self.url(self.source.link)),
+                escape(self.source.description),
+                quoteattr(self.request.build_absolute_uri()),
+                rfc2822_date(self.updated),
+            )
+        )
+
+    def item(self, post, number):
+        category = ''
+        if post.group is not None:
+            category = '<category>%s</category>' % escape(post.group.title)
+        return (
+            '<item><title>%s</title><link>%s</link>'
+            '<description>%s</description><dc:creator>%s</dc:creator>'
+            '<pubDate>%s</pubDate><guid isPermaLink="true">%s</guid>'
+            '%s</item>' % (
+                escape(_title(post)),
+                escape(self.post_url(post)),
+                escape(post.text),
+                escape(_author(post)),
+                rfc2822_date(post.pub_date),
+                escape(self.post_url(post)),
+                category,
+            )
+        )
+
+    def footer(self):
+        return '</channel></rss>'
+
+
+class AtomFeed(Feed):
+    content_type = 'application/atom+xml; charset=utf-8'
+
+    def header(self):
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="ru">'
+            '<title>%s</title><subtitle>%s</subtitle>'
+            '<link href=%s rel="alternate"/><link href=%s rel="self"/>'
+            '<id>%s</id><updated>%s</updated>' % (
+                escape(self.source.title),
+                escape(self.source.description),
+                quoteattr(self.url(self.source.link)),
+                quoteattr(self.request.build_absolute_uri()),
+                escape(self.url(self.source.link)),
+                rfc3339_date(self.updated),
+            )
+        )
+
+    def item(self, post, number):
+        category = ''
+        if post.group is not None:
+            category = '<category term=%s/>' % quoteattr(post.group.title)
+        return (
+            '<entry><title>%s</title><link href=%s rel="alternate"/>'
+            '<id>%s</id><published>%s</published><updated>%s</updated>'
+            '<author><name>%s</name></author>'
+            '<summary type="text">%s</summary>%s</entry>' % (
+                escape(_title(post)),
+                quoteattr(self.post_url(post)),
+                escape(self.post_url(post)),
+                rfc3339_date(post.pub_date),
+                rfc3339_date(post.modified),
+                escape(_author(post)),
+                escape(post.text),
+                category,
+            )
+        )
+
+    def footer(self):
+        return '</feed>'
+
+
+class JsonFeed(Feed):
+    content_type = 'application/feed+json; charset=utf-8'
+
+    def header(self):
+        header = json.dumps({
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': self.source.title,
+            'home_page_url': self.url(self.source.link),
+            'feed_url': self.request.build_absolute_uri(),
+            'description': self.source.description,
+            'language': 'ru',
+        }, ensure_ascii=False)
+        return header[:-1] + ', "items": ['
+
+    def item(self, post, number):
+        item = {
+            'id': self.post_url(post),
+            'url': self.post_url(post),
+            'title': _title(post),
+            'content_text': post.text,
+            'date_published': rfc3339_date(post.pub_date),
+            'date_modified': rfc3339_date(post.modified),
+            'authors': [{'name': _author(post)}],
+        }
+        if post.group is not None:
+            item['tags'] = [post.group.title]
+        return (', ' if number else '') + json.dumps(item, ensure_ascii=False)
+
+    def footer(self):
+        return ']}'
+
+
+FEED_FORMATS = {
+    'rss': RssFeed,
+    'atom': AtomFeed,
+    'json': JsonFeed,
+}
+
+
+def _stream(feed, posts, key):
+    chunks = []
+    for chunk in feed.write(posts):
+        chunks.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(chunks), settings.FEED_TIMEOUT)
+
+
+def feed_response(request, feed_format, scope, get_source):
+    """Лента scope из кеша или потоком из базы.
+
+    get_source вызывается только без кеша и возвращает ``FeedSource``.
+    """
+    feed_class = FEED_FORMATS.get(feed_format)
+    if feed_class is None:
+        raise Http404
+    updated = freshness.changed_at(*FEED_SCOPES)
+    key = BODY_KEY % (
+        request.get_host(), scope, feed_format, '%.6f' % updated.timestamp())
+    body = cache.get(key)
+    if body is not None:
+        return HttpResponse(body, content_type=feed_class.content_type)
+    source = get_source()
+    posts = (
+        source.posts.order_by(*POST_ORDERING)[:settings.FEED_ITEMS]
+        .iterator(chunk_size=settings.FEED_ITEMS)
+    )
+    feed = feed_class(request, source, updated)
+    return StreamingHttpResponse(
+        _stream(feed, posts, key), content_type=feed_class.content_type)
@@ -0,0 +1,11 @@
+from django import template
+
+from posts import cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, template_name=cards.CARD_TEMPLATE):
+    return cards.render_cards(
+        list(posts), template_name, getattr(context, 'request', None))
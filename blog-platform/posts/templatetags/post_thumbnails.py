@@ -0,0 +1,30 @@
+from django import template
+
+from posts import freshness, images, thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def ready_thumbnail(context, file_, geometry):
+    """Готовая миниатюра или None; генерацию не запускает.
+
+    Если миниатюра ещё не готова, отмечает это в списке
+    ``pending_thumbnails`` контекста, чтобы карточку не кешировали
+    с заглушкой, и в запросе, чтобы страница не получила ETag.
+    """
+    thumbnail = thumbnails.ready_thumbnail(file_, geometry)
+    if file_ and thumbnail is None:
+        pending = context.get('pending_thumbnails')
+        if pending is not None:
+            pending.append(geometry)
+        request = getattr(context, 'request', None)
+        if request is not None:
+            freshness.mark_incomplete(request)
+    return thumbnail
+
+
+@register.simple_tag
+def image_sources(post):
+    """Пары (MIME-тип, srcset) для <picture>; пусто до обработки картинки."""
+    return images.sources(post)
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.cards import CARD_TEMPLATE, card_key
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test-user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='cats',
+            description='Тестовое описание',
+        )
+        for i in range(12):
+            Post.objects.create(
+                text='Пост номер %s' % i, author=cls.user, group=cls.group)
+        cls.post = Post.objects.create(
+            text='Исходный текст', author=cls.user, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_cards_are_rendered_once(self):
+        """Повторный показ страницы берёт карточки из кеша"""
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertTemplateUsed(response, CARD_TEMPLATE)
+        self.assertIsNotNone(cache.get(card_key(self.post)))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertTemplateNotUsed(response, CARD_TEMPLATE)
+        self.assertContains(response, 'Исходный текст')
+
+    def test_pages_are_not_shared(self):
+        """Разные страницы списка не подменяют друг друга"""
+        first = self.authorized_client.get(reverse('posts:index'))
+        second = self.authorized_client.get(
+            reverse('posts:index') + '?page=2')
+        self.assertContains(first, 'Исходный текст')
+        self.assertNotContains(second, 'Исходный текст')
+
+    def test_edit_replaces_cached_card(self):
+        """Правка поста сбрасывает его карточку"""
+        self.authorized_client.get(reverse('posts:index'))
+        old_key = card_key(self.post)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Новый текст', 'group': self.group.pk})
+        self.assertIsNone(cache.get(old_key))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый текст')
+        self.assertNotContains(response, 'Исходный текст')
+
+    def test_rename_replaces_cached_cards(self):
+        """Новое имя автора сразу видно в карточках"""
+        self.authorized_client.get(reverse('posts:index'))
+        self.user.first_name = 'Лев'
+        self.user.last_name = 'Толстой'
+        self.user.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Лев Толстой')
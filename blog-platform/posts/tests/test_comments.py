@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(NUMBER_OF_COMMENTS=5)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.quiet_post = Post.objects.create(text='Тихий', author=cls.author)
+        cls.commenters = [
+            User.objects.create_user(username='reader-%s' % i)
+            for i in range(12)
+        ]
+        cls.comments = [
+            Comment.objects.create(
+                text='Комментарий %s' % i, author=commenter, post=cls.post)
+            for i, commenter in enumerate(cls.commenters)
+        ]
+        Comment.objects.create(
+            text='Единственный', author=cls.author, post=cls.quiet_post)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def detail(self, post):
+        return self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+
+    def test_first_page_inline(self):
+        """На странице поста первая страница комментариев по порядку"""
+        response = self.detail(self.post)
+        self.assertEqual(
+            list(response.context['comments']), self.comments[:5])
+        self.assertContains(response, 'data-comments=')
+
+    def test_fragment_loads_following_pages(self):
+        """Фрагмент по ссылке отдаёт следующие страницы до конца"""
+        page = self.detail(self.post).context['comments']
+        loaded = list(page)
+        while page.has_next():
+            url = reverse('posts:post_comments', args=(self.post.pk,))
+            response = self.guest_client.get(
+                '%s?%s' % (url, page.next_querystring))
+            self.assertTemplateUsed(
+                response, 'posts/includes/comments.html')
+            self.assertTemplateNotUsed(response, 'base.html')
+            page = response.context['comments']
+            loaded += list(page)
+        self.assertEqual(loaded, self.comments)
+
+    def test_detail_cost_does_not_depend_on_comments(self):
+        """Число запросов страницы поста не зависит от комментариев"""
+        counts = []
+        for post in (self.quiet_post, self.post):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.detail(post)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_unknown_post_fragment_returns_404(self):
+        """Фрагмент комментариев несуществующего поста даёт 404"""
+        response = self.guest_client.get(
+            reverse('posts:post_comments', args=(0,)))
+        self.assertEqual(response.status_code, 404)
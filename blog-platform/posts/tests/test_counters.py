@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Post, UserCounter
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test-user')
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def counter(self, user):
+        return UserCounter.objects.get(user=user)
+
+    def test_post_counter_follows_create_and_delete(self):
+        """Счётчик постов автора меняется при создании и удалении"""
+        self.authorized_client.post(
+            reverse('posts:post_create'), data={'text': 'Новый пост'})
+        self.assertEqual(self.counter(self.user).posts_count, 1)
+        Post.objects.filter(author=self.user).delete()
+        self.assertEqual(self.counter(self.user).posts_count, 0)
+
+    def test_comment_counter_follows_create_and_cascade(self):
+        """Счётчик комментариев меняется при добавлении и каскаде"""
+        commenter = User.objects.create_user(username='commenter')
+        self.authorized_client.force_login(commenter)
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Комментарий'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        commenter.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_edit_keeps_concurrent_comments(self):
+        """Правка поста не затирает комментарии, добавленные после чтения"""
+        post = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(text='Комментарий', author=self.user, post=post)
+        post.text = 'Правка'
+        post.save()
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.text, self.post.comments_count), ('Правка', 1))
+
+    def test_follow_counters_follow_views(self):
+        """Счётчики подписок меняются в profile_follow/profile_unfollow"""
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=('author',)))
+        self.assertEqual(self.counter(self.author).followers_count, 1)
+        self.assertEqual(self.counter(self.user).following_count, 1)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=('author',)))
+        self.assertEqual(self.counter(self.author).followers_count, 0)
+        self.assertEqual(self.counter(self.user).following_count, 0)
+
+    def test_profile_reads_stored_counter(self):
+        """Профиль берёт число постов из счётчика без COUNT(*)"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(
+                reverse('posts:profile', kwargs={'username': 'author'}))
+        self.assertEqual(response.context['posts_count'], 1)
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_recount_command_fixes_drift(self):
+        """Команда recount_counters исправляет расхождения"""
+        Post.objects.bulk_create(
+            Post(text='Пост', author=self.author) for _ in range(3))
+        Comment.objects.bulk_create(
+            Comment(text='Комментарий', author=self.user, post=self.post)
+            for _ in range(2))
+        Follow.objects.bulk_create(
+            [Follow(user=self.user, author=self.author)])
+        UserCounter.objects.filter(user=self.user).delete()
+        call_command('recount_counters', batch_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        self.assertEqual(self.counter(self.author).posts_count, 4)
+        self.assertEqual(self.counter(self.author).followers_count, 1)
+        self.assertEqual(self.counter(self.user).following_count, 1)
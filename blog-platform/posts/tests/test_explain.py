@@ -0,0 +1,55 @@
+from io import StringIO
+
+from core import explain
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from posts import seed
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ExplainQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        seed.seed(
+            users=60, groups=5, posts=600, comments=1200, follows=10,
+            random_seed=1)
+
+    @override_settings(DEBUG=True, BACKGROUND_WORKERS=0)
+    def test_posts_views_avoid_scans_and_sorts(self):
+        """Запросы представлений posts на синтетических данных идут по
+        индексам без сортировок"""
+        stdout = StringIO()
+        call_command('explain_queries', stdout=stdout, stderr=StringIO())
+        self.assertIn('без полных просмотров', stdout.getvalue())
+        self.assertEqual(Post.objects.count(), 600)
+
+    def test_executemany_is_explained_by_first_row(self):
+        """executemany разбирается по первой строке параметров"""
+        with explain.capture() as queries:
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    'UPDATE posts_post SET text = %s WHERE id = %s',
+                    [('Новый текст', 0), ('Другой текст', -1)])
+        sql, params = queries[0]
+        self.assertEqual(params, ('Новый текст', 0))
+        self.assertTrue(explain.explain(sql, params))
+
+    @override_settings(DEBUG=True)
+    def test_driver_error_returns_no_plan(self):
+        """Ошибка драйвера под DEBUG не прерывает разбор"""
+        self.assertIsNone(explain.explain(
+            'SELECT id FROM posts_post WHERE id = %s', [(1, 2)]))
+
+    def test_problems_flag_full_scan_and_sort(self):
+        """Полный просмотр и временная сортировка отмечаются"""
+        with explain.capture() as queries:
+            list(Post.objects.filter(text='Пост 1').order_by('comments_count'))
+        sql, params = queries[0]
+        self.assertEqual(
+            explain.problems(explain.explain(sql, params)),
+            ['SCAN posts_post', 'USE TEMP B-TREE FOR ORDER BY'])
@@ -0,0 +1,171 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ConditionalPageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='cats',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='dogs',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.user)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=('cats',)),
+            'other_group': reverse('posts:group_list', args=('dogs',)),
+            'profile': reverse('posts:profile', args=('author',)),
+            'detail': reverse('posts:post_detail', args=(self.post.pk,)),
+        }
+        # Форма комментария выставляет CSRF-cookie, от которой зависит ETag.
+        self.reader_client.get(self.urls['detail'])
+
+    def etags(self, client):
+        return {
+            name: client.get(url)['ETag'] for name, url in self.urls.items()}
+
+    def assertChanged(self, before, after, names):
+        for name in self.urls:
+            with self.subTest(name=name):
+                if name in names:
+                    self.assertNotEqual(before[name], after[name])
+                else:
+                    self.assertEqual(before[name], after[name])
+
+    def test_unchanged_pages_return_304(self):
+        """Повторный запрос без изменений получает 304 без работы вида"""
+        for name, url in self.urls.items():
+            response = self.guest_client.get(url)
+            cases = {
+                'HTTP_IF_NONE_MATCH': response['ETag'],
+                'HTTP_IF_MODIFIED_SINCE': response['Last-Modified'],
+            }
+            for header, value in cases.items():
+                with self.subTest(name=name, header=header):
+                    with self.assertNumQueries(
+                            1 if name == 'detail' else 0):
+                        repeated = self.guest_client.get(
+                            url, **{header: value})
+                    self.assertEqual(repeated.status_code, 304)
+
+    def test_pages_differ_per_user(self):
+        """ETag страницы зависит от вошедшего пользователя"""
+        guest = self.etags(self.guest_client)
+        reader = self.etags(self.reader_client)
+        for name in self.urls:
+            with self.subTest(name=name):
+                self.assertNotEqual(guest[name], reader[name])
+
+    def test_post_create_invalidates_pages(self):
+        """Новый пост меняет главную, группу, профиль и пост автора"""
+        before = self.etags(self.guest_client)
+        self.author_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Новый пост', 'group': self.group.pk})
+        self.assertChanged(
+            before, self.etags(self.guest_client),
+            {'index', 'group', 'profile', 'detail'})
+
+    def test_post_edit_invalidates_old_and_new_group(self):
+        """Перенос поста меняет страницы обеих групп"""
+        before = self.etags(self.guest_client)
+        self.author_client.post(
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            {'text': 'Правка', 'group': self.other_group.pk})
+        self.assertChanged(
+            before, self.etags(self.guest_client), set(self.urls))
+
+    def test_add_comment_invalidates_post(self):
+        """Комментарий меняет только страницу поста"""
+        before = self.etags(self.guest_client)
+        self.reader_client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'Комментарий'})
+        self.assertChanged(
+            before, self.etags(self.guest_client), {'detail'})
+
+    def test_follow_invalidates_profile(self):
+        """Подписка меняет профиль автора и страницы его постов"""
+        before = self.etags(self.reader_client)
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=('author',)))
+        self.assertChanged(
+            before, self.etags(self.reader_client), {'profile', 'detail'})
+
+    def test_follow_invalidates_follower_profile(self):
+        """Подписка и отписка меняют профиль подписчика"""
+        url = reverse('posts:profile', args=('reader',))
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                etag = self.reader_client.get(url)['ETag']
+                self.reader_client.get(reverse(name, args=('author',)))
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_author_rename_invalidates_pages(self):
+        """Смена имени автора меняет все страницы"""
+        before = self.etags(self.guest_client)
+        self.author.first_name = 'Алексей'
+        self.author.save()
+        self.assertChanged(
+            before, self.etags(self.guest_client), set(self.urls))
+
+    @override_settings(BACKGROUND_WORKERS=0)
+    def test_pending_thumbnail_disables_validators(self):
+        """Страница с заглушкой миниатюры не получает ETag"""
+        Post.objects.create(
+            text='Пост с картинкой',
+            author=self.author,
+            image=SimpleUploadedFile(
+                name='a.gif', content=SMALL_GIF, content_type='image/gif'),
+        )
+        response = self.guest_client.get(self.urls['index'])
+        self.assertContains(response, 'aspect-ratio: 960 / 339')
+        self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,136 @@
+import io
+import json
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from posts import images, thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+ORIENTATION = 0x0112
+
+
+def photo(name, size=(600, 300), rotated=True):
+    """JPEG с EXIF: при rotated камера записала поворот на 90°."""
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6 if rotated else 1
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(
+        buffer, 'JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    BACKGROUND_WORKERS=0,
+    IMAGE_MAX_SIZE=200,
+    IMAGE_WIDTHS=(50, 100, 400),
+)
+class ImageIngestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test-user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_upload_is_reencoded_with_variants(self):
+        """Загрузка уменьшает оригинал, убирает EXIF и создаёт варианты"""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с фото', 'image': photo('a.jpg')})
+        post = Post.objects.get(text='Пост с фото')
+        self.assertEqual((post.image_width, post.image_height), (100, 200))
+        with default_storage.open(post.image.name) as source:
+            original = Image.open(source)
+            self.assertEqual(original.size, (100, 200))
+            self.assertNotIn(ORIENTATION, original.getexif())
+        variants = json.loads(post.image_variants)
+        self.assertEqual(list(variants), ['image/webp', 'image/jpeg'])
+        for mime, sources in variants.items():
+            with self.subTest(mime=mime):
+                self.assertEqual(
+                    [width for width, _ in sources], [50, 100])
+                for width, name in sources:
+                    with default_storage.open(name) as source:
+                        self.assertEqual(Image.open(source).width, width)
+        for geometry in thumbnails.VARIANTS:
+            with self.subTest(geometry=geometry):
+                self.assertIsNotNone(
+                    thumbnails.ready_thumbnail(post.image, geometry))
+
+    def test_detail_emits_srcset(self):
+        """Страница поста строит srcset и размеры без чтения файла"""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с фото', 'image': photo('b.jpg')})
+        post = Post.objects.get(text='Пост с фото')
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=(post.pk,)))
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, ' 50w, ')
+        self.assertContains(response, 'width="100" height="200"')
+
+    def test_small_image_keeps_size(self):
+        """Картинка меньше предела не увеличивается"""
+        post = Post.objects.create(
+            text='Маленькая картинка',
+            author=self.user,
+            image=photo('c.jpg', size=(80, 40), rotated=False),
+        )
+        images.process(post.pk, post.image.name)
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (80, 40))
+        self.assertEqual(
+            [width for width, _ in
+             json.loads(post.image_variants)['image/jpeg']],
+            [50, 80])
+
+    def test_replaced_image_is_not_overwritten(self):
+        """Устаревшая задача не трогает пост и удаляет свои файлы"""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=photo('d.jpg'))
+        stale = post.image.name
+        post.image = photo('e.jpg')
+        post.save()
+        self.assertFalse(images.ingest(post.pk, stale))
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, '')
+        self.assertFalse([
+            name for name in default_storage.listdir(images.VARIANTS_DIR)[1]
+            if name.startswith('d-')])
+
+    def test_edit_resets_and_reprocesses_image(self):
+        """Замена картинки при правке обрабатывает новую картинку"""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=photo('f.jpg'))
+        images.process(post.pk, post.image.name)
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            data={
+                'text': 'Пост',
+                'image': photo('g.jpg', size=(60, 60), rotated=False),
+            })
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (60, 60))
+        self.assertTrue(post.image.name.startswith('posts/g'))
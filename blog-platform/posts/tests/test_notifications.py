@@ -0,0 +1,115 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts import notifications
+from posts.models import Comment, Follow, Notification, Post
+
+User = get_user_model()
+
+
+@override_settings(BACKGROUND_WORKERS=0, NOTIFICATION_BATCH_SIZE=2)
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [
+            User.objects.create_user(username='reader-%s' % number)
+            for number in range(3)]
+        for reader in cls.readers:
+            Follow.objects.create(user=reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader = self.readers[0]
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_posts_are_coalesced_per_author(self):
+        """Новые посты автора собираются в одну строку у каждого читателя"""
+        for number in range(2):
+            post = Post.objects.create(
+                text='Пост %s' % number, author=self.author)
+        self.assertEqual(Notification.objects.count(), 3)
+        notification = Notification.objects.get(recipient=self.reader)
+        self.assertEqual(
+            (notification.count, notification.post_id), (2, post.pk))
+
+    def test_comment_notifies_post_author(self):
+        """Комментарий попадает во входящие автора поста, но не свой"""
+        post = Post.objects.create(text='Пост', author=self.reader)
+        Comment.objects.create(text='Свой', author=self.reader, post=post)
+        self.assertFalse(Notification.objects.exists())
+        for commenter in self.readers[1:]:
+            Comment.objects.create(
+                text='Комментарий', author=commenter, post=post)
+        notification = Notification.objects.get(recipient=self.reader)
+        self.assertEqual(notification.kind, Notification.COMMENT)
+        self.assertEqual(notification.count, 2)
+        self.assertEqual(notification.actor, self.readers[2])
+
+    def test_inbox_marks_read(self):
+        """Кнопка во входящих сбрасывает счётчик, а просмотр — нет"""
+        Post.objects.create(text='Пост', author=self.author)
+        self.assertContains(
+            self.client.get(reverse('posts:index')),
+            '<span class="badge badge-danger">1</span>', html=True)
+        response = self.client.get(reverse('posts:inbox'))
+        self.assertContains(response, 'опубликовал пост')
+        self.assertEqual(notifications.unread_count(self.reader), 1)
+        self.client.post(reverse('posts:inbox_read'))
+        self.assertEqual(notifications.unread_count(self.reader), 0)
+        Post.objects.create(text='Ещё пост', author=self.author)
+        notification = Notification.objects.get(recipient=self.reader)
+        self.assertEqual((notification.count, notification.unread), (1, True))
+        self.assertEqual(notifications.unread_count(self.reader), 1)
+
+    def test_new_notification_changes_etag(self):
+        """Новое событие меняет версию страниц со значком в шапке"""
+        url = reverse('posts:profile', args=(self.reader.username,))
+        response = self.client.get(url)
+        Post.objects.create(text='Пост', author=self.author)
+        repeated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeated.status_code, 200)
+
+    def test_inbox_reads_with_one_query(self):
+        """Страница входящих и значок читают базу одним запросом каждый"""
+        Post.objects.create(text='Пост', author=self.author)
+        with self.assertNumQueries(1):
+            list(notifications.inbox(self.reader)[:10])
+        cache.clear()
+        with self.assertNumQueries(1):
+            notifications.unread_count(self.reader)
+
+    def test_cascade_delete_updates_unread_count(self):
+        """Удаление поста или автора события уменьшает счётчик
+        непрочитанных"""
+        post = Post.objects.create(text='Пост', author=self.reader)
+        commenter = User.objects.create_user(username='commenter')
+        Comment.objects.create(
+            text='Комментарий', author=commenter, post=post)
+        Post.objects.create(text='Пост автора', author=self.author)
+        self.assertEqual(notifications.unread_count(self.reader), 2)
+        commenter.delete()
+        self.assertEqual(notifications.unread_count(self.reader), 1)
+        Post.objects.filter(author=self.author).delete()
+        self.assertEqual(notifications.unread_count(self.reader), 0)
+        cache.clear()
+        self.assertEqual(notifications.unread_count(self.reader), 0)
+
+    def test_prune_removes_old_entries(self):
+        """prune_notifications удаляет записи старше срока хранения"""
+        Post.objects.create(text='Пост', author=self.author)
+        Notification.objects.filter(recipient=self.reader).update(
+            updated=timezone.now() - timedelta(days=40))
+        output = StringIO()
+        call_command(
+            'prune_notifications', days=30, batch_size=1, stdout=output)
+        self.assertIn('Удалено записей: 1', output.getvalue())
+        self.assertEqual(Notification.objects.count(), 2)
@@ -0,0 +1,181 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Group, Post
+from posts.utils import (MAX_PAGE, NEXT, PREVIOUS, decode_cursor,
+                         encode_cursor)
+
+User = get_user_model()
+
+POSTS_COUNT = 35
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test-user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='cats',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(text='Пост %s' % i, author=cls.user, group=cls.group)
+            for i in range(POSTS_COUNT)
+        )
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True))
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def walk(self, url):
+        """Проходит ленту по ссылкам «Следующая» до конца."""
+        pages = []
+        querystring = ''
+        while True:
+            response = self.guest_client.get(url + '?' + querystring)
+            page_obj = response.context['page_obj']
+            pages.append([post.pk for post in page_obj])
+            if not page_obj.has_next():
+                return pages
+            querystring = page_obj.next_querystring
+
+    def test_cursor_walk_returns_every_post_once(self):
+        """Курсорные страницы покрывают ленту без пропусков и повторов"""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'cats'}),
+            reverse('posts:profile', kwargs={'username': 'test-user'}),
+        ):
+            with self.subTest(url=url):
+                pages = self.walk(url)
+                self.assertEqual(sum(pages, []), self.expected)
+                self.assertTrue(
+                    all(len(page) == settings.NUMBER_OF_POSTS
+                        for page in pages[:-1]))
+
+    def test_legacy_page_number_matches_cursor_page(self):
+        """Старые ссылки ?page=N открывают ту же страницу"""
+        pages = self.walk(reverse('posts:index'))
+        response = self.guest_client.get(reverse('posts:index') + '?page=3')
+        page_obj = response.context['page_obj']
+        self.assertEqual([post.pk for post in page_obj], pages[2])
+        self.assertTrue(page_obj.has_previous())
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Ссылка «Предыдущая» возвращает на предыдущую страницу"""
+        pages = self.walk(reverse('posts:index'))
+        response = self.guest_client.get(reverse('posts:index') + '?page=3')
+        response = self.guest_client.get(
+            reverse('posts:index') + '?'
+            + response.context['page_obj'].previous_querystring)
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']], pages[1])
+
+    def test_last_page_link(self):
+        """Ссылка «Последняя» открывает конец ленты без COUNT(*)"""
+        response = self.guest_client.get(
+            reverse('posts:index') + '?cursor=' + encode_cursor(PREVIOUS))
+        page_obj = response.context['page_obj']
+        self.assertEqual(
+            [post.pk for post in page_obj],
+            self.expected[-settings.NUMBER_OF_POSTS:])
+        self.assertFalse(page_obj.has_next())
+        self.assertTrue(page_obj.has_previous())
+
+    def test_new_posts_do_not_shift_next_page(self):
+        """Новые посты не сдвигают следующую страницу"""
+        response = self.guest_client.get(reverse('posts:index'))
+        next_querystring = response.context['page_obj'].next_querystring
+        Post.objects.bulk_create(
+            Post(text='Новый пост', author=self.user) for _ in range(3))
+        response = self.guest_client.get(
+            reverse('posts:index') + '?' + next_querystring)
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            self.expected[
+                settings.NUMBER_OF_POSTS:settings.NUMBER_OF_POSTS * 2])
+
+    def test_invalid_cursor_opens_first_page(self):
+        """Испорченный курсор открывает первую страницу"""
+        self.assertIsNone(decode_cursor(encode_cursor('x', [1])))
+        self.assertIsNone(decode_cursor('!!!'))
+        for cursor in (
+            '!!!',
+            encode_cursor('x', [1]),
+            encode_cursor(PREVIOUS, ['не дата', 'не число']),
+        ):
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(
+                    reverse('posts:index') + '?cursor=' + cursor)
+                self.assertEqual(
+                    [post.pk for post in response.context['page_obj']],
+                    self.expected[:settings.NUMBER_OF_POSTS])
+
+    def test_huge_page_number_is_capped(self):
+        """Огромный номер страницы не ломает запрос"""
+        for page in ('99999999999999999999999', str(MAX_PAGE + 1)):
+            with self.subTest(page=page):
+                response = self.guest_client.get(
+                    reverse('posts:index'), {'page': page})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_malformed_cursor_values_open_first_page(self):
+        """Курсор с None, лишними значениями или огромными числами
+        открывает первую страницу"""
+        post = Post.objects.create(text='Пост с ответом', author=self.user)
+        post.comments.create(text='Комментарий', author=self.user)
+        comments_url = reverse(
+            'posts:post_comments', kwargs={'post_id': post.pk})
+        index_url = reverse('posts:index')
+        search_url = reverse('posts:search')
+        cases = (
+            (index_url, 'page_obj', [None, None]),
+            (comments_url, 'comments', [None, None]),
+            (index_url, 'page_obj', ['2020-01-01T00:00:00+00:00']),
+            (index_url, 'page_obj', ['2020-01-01T00:00:00+00:00', 1, 2]),
+            (index_url, 'page_obj',
+             ['2020-01-01T00:00:00+00:00', 10 ** 30]),
+            (comments_url, 'comments',
+             ['2020-01-01T00:00:00+00:00', -10 ** 30]),
+            (search_url, 'page_obj', [1e308, 10 ** 30]),
+        )
+        for url, name, values in cases:
+            for direction in (NEXT, PREVIOUS):
+                with self.subTest(url=url, values=values,
+                                  direction=direction):
+                    response = self.guest_client.get(url, {
+                        'q': 'Пост',
+                        'cursor': encode_cursor(direction, values),
+                    })
+                    self.assertEqual(response.status_code, 200)
+                    self.assertFalse(response.context[name].has_previous())
+
+    def test_deep_page_costs_the_same_as_first(self):
+        """Глубокая страница стоит столько же запросов, сколько первая,
+        без OFFSET и COUNT(*)"""
+        pages_sql = []
+        querystring = ''
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.guest_client.get(
+                    reverse('posts:index') + '?' + querystring)
+            pages_sql.append([
+                query['sql'] for query in queries
+                if 'FROM "posts_post"' in query['sql']
+            ])
+            page_obj = response.context['page_obj']
+            if not page_obj.has_next():
+                break
+            querystring = page_obj.next_querystring
+        self.assertEqual(len({len(sql) for sql in pages_sql}), 1)
+        for sql in sum(pages_sql, []):
+            self.assertNotIn('OFFSET', sql.upper())
+            self.assertNotIn('COUNT(', sql.upper())
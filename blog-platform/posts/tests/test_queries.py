@@ -0,0 +1,169 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from core.query_budget import (QueryBudgetExceeded, QueryBudgetTestMixin,
+                               query_budget)
+from posts import urls
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Предельное число запросов авторизованного пользователя на каждый
+# адрес posts.urls. Рост числа — регрессия, а не повод поднять предел.
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:feed': 3,
+    'posts:popular': 4,
+    'posts:group_list': 5,
+    'posts:group_popular': 5,
+    'posts:group_feed': 4,
+    'posts:profile': 7,
+    'posts:profile_feed': 4,
+    'posts:followers': 5,
+    'posts:following': 5,
+    'posts:search': 5,
+    'posts:post_detail': 6,
+    'posts:post_comments': 2,
+    'posts:post_create': 12,
+    'posts:post_edit': 10,
+    'posts:add_comment': 8,
+    'posts:follow_index': 6,
+    'posts:inbox': 4,
+    'posts:inbox_read': 6,
+    'posts:profile_follow': 6,
+    'posts:profile_unfollow': 12,
+}
+
+LIST_URLS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:search',
+    'posts:post_detail',
+    'posts:follow_index',
+    'posts:popular',
+    'posts:group_popular',
+)
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test-user')
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='cats',
+            description='Тестовое описание',
+        )
+        for i in range(25):
+            Post.objects.create(
+                text='Пост %s' % i, author=cls.author, group=cls.group)
+        cls.post = Post.objects.create(
+            text='Пост с комментариями', author=cls.author, group=cls.group)
+        for i in range(30):
+            commenter = User.objects.create_user(username='reader-%s' % i)
+            Comment.objects.create(
+                text='Комментарий', author=commenter, post=cls.post)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def requests(self):
+        post_kwargs = {'post_id': self.post.pk}
+        own_post = Post.objects.create(text='Свой пост', author=self.user)
+        return {
+            'posts:index': ('get', reverse('posts:index'), None),
+            'posts:feed': ('get', reverse('posts:feed', args=('rss',)), None),
+            'posts:popular': ('get', reverse('posts:popular'), None),
+            'posts:group_popular': ('get', reverse(
+                'posts:group_popular', args=('cats',)), None),
+            'posts:group_feed': ('get', reverse(
+                'posts:group_feed', args=('cats', 'atom')), None),
+            'posts:followers': ('get', reverse(
+                'posts:followers', args=('author',)), None),
+            'posts:following': ('get', reverse(
+                'posts:following', args=('test-user',)), None),
+            'posts:profile_feed': ('get', reverse(
+                'posts:profile_feed', args=('author', 'json')), None),
+            'posts:group_list': ('get', reverse(
+                'posts:group_list', kwargs={'slug': 'cats'}), None),
+            'posts:profile': ('get', reverse(
+                'posts:profile', kwargs={'username': 'author'}), None),
+            'posts:search': ('get', reverse('posts:search') + '?q=пост',
+                             None),
+            'posts:post_detail': ('get', reverse(
+                'posts:post_detail', kwargs=post_kwargs), None),
+            'posts:post_comments': ('get', reverse(
+                'posts:post_comments', kwargs=post_kwargs), None),
+            'posts:post_create': ('post', reverse('posts:post_create'), {
+                'text': 'Новый пост', 'group': self.group.pk}),
+            'posts:post_edit': ('post', reverse(
+                'posts:post_edit', kwargs={'post_id': own_post.pk}), {
+                'text': 'Правка', 'group': self.group.pk}),
+            'posts:add_comment': ('post', reverse(
+                'posts:add_comment', kwargs=post_kwargs), {
+                'text': 'Комментарий'}),
+            'posts:follow_index': ('get', reverse('posts:follow_index'), None),
+            'posts:inbox': ('get', reverse('posts:inbox'), None),
+            'posts:inbox_read': ('post', reverse('posts:inbox_read'), None),
+            'posts:profile_follow': ('get', reverse(
+                'posts:profile_follow', args=('author',)), None),
+            'posts:profile_unfollow': ('get', reverse(
+                'posts:profile_unfollow', args=('author',)), None),
+        }
+
+    def test_every_url_has_budget(self):
+        """У каждого адреса posts.urls есть бюджет запросов"""
+        names = {
+            '%s:%s' % (urls.app_name, pattern.name)
+            for pattern in urls.urlpatterns
+        }
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_urls_fit_query_budget(self):
+        """Адреса posts.urls укладываются в бюджет запросов"""
+        for name, (method, url, data) in self.requests().items():
+            with self.subTest(name=name):
+                cache.clear()
+                with self.assertMaxQueries(QUERY_BUDGETS[name]):
+                    response = getattr(
+                        self.authorized_client, method)(url, data)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        """Число запросов списков не зависит от размера страницы"""
+        requests = self.requests()
+        for name in LIST_URLS:
+            url = requests[name][1]
+            counts = []
+            for per_page in (1, 20):
+                cache.clear()
+                with override_settings(NUMBER_OF_POSTS=per_page):
+                    with query_budget(1000) as budget:
+                        self.authorized_client.get(url)
+                counts.append(len(budget))
+            with self.subTest(name=name):
+                self.assertEqual(counts[0], counts[1])
+
+    def test_budget_exceeded_raises(self):
+        """Превышение бюджета поднимает QueryBudgetExceeded"""
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(0, raise_exception=True):
+                User.objects.count()
+
+    def test_decorator_counts_each_call_separately(self):
+        """Декоратор считает запросы каждого вызова отдельно"""
+        @query_budget(1, raise_exception=True)
+        def one_query():
+            return User.objects.count()
+
+        one_query()
+        one_query()
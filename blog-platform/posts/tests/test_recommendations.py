@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from posts import recommendations
+from posts.models import Follow
+from posts.recommendations import Adjacency, FollowGraph
+
+User = get_user_model()
+
+
+class FollowGraphTests(SimpleTestCase):
+    def test_friends_of_friends_and_cofollows(self):
+        """Друзья друзей весят больше совместных подписок"""
+        graph = FollowGraph.from_pairs([
+            (1, 2), (1, 3),
+            (2, 4), (2, 5), (3, 4),
+            (6, 2), (6, 7),
+        ])
+        self.assertEqual(graph.suggest(1, 5), [4, 5, 7])
+        self.assertEqual(graph.suggest(1, 1), [4])
+        self.assertEqual(graph.suggest(8, 5), [])
+
+    def test_changes_over_arrays(self):
+        """Поправки поверх массивов видны и переживают сжатие"""
+        adjacency = Adjacency.from_sorted([1, 1, 2], [3, 5, 3])
+        adjacency.add(1, 4)
+        adjacency.remove(1, 5)
+        adjacency.add(9, 1)
+        adjacency.remove(2, 7)
+        self.assertEqual(list(adjacency.get(1)), [3, 4])
+        self.assertEqual(list(adjacency.get(9)), [1])
+        adjacency.changes = 10 ** 6
+        compacted = adjacency.compact()
+        self.assertEqual(compacted.added, {})
+        for node in (1, 2, 9):
+            with self.subTest(node=node):
+                self.assertEqual(
+                    list(compacted.get(node)), list(adjacency.get(node)))
+
+    def test_many_follows(self):
+        """Пять тысяч подписок обходятся в памяти, без запросов к базе"""
+        pairs = [(1, author) for author in range(2, 5002)]
+        pairs += [(author, 6000 + author % 3) for author in range(2, 5002)]
+        graph = FollowGraph.from_pairs(pairs)
+        self.assertEqual(graph.suggest(1, 3), [6000, 6002, 6001])
+
+    def test_unsorted_pairs_are_rejected(self):
+        """Граф строится потоком только из упорядоченных пар"""
+        with self.assertRaises(ValueError):
+            FollowGraph.from_pairs([(1, 3), (1, 2)])
+
+    @override_settings(SUGGESTIONS_SAMPLE=1)
+    def test_cofollowers_are_sampled_at_random(self):
+        """Выборка подписчиков случайна, а не первые по id"""
+        pairs = [(1, 100)]
+        pairs += [
+            pair for follower in range(2, 12)
+            for pair in ((follower, 100), (follower, 200 + follower))]
+        graph = FollowGraph.from_pairs(pairs)
+        suggested = {tuple(graph.suggest(1, 1)) for _ in range(50)}
+        self.assertGreater(len(suggested), 1)
+
+
+class SuggestionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test-user')
+        cls.friend = User.objects.create_user(username='friend')
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        Follow.objects.create(user=cls.friend, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def suggestions(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return response.context['suggestions']
+
+    def test_follow_updates_suggestions(self):
+        """Подписка сразу меняет рекомендации"""
+        self.assertEqual(self.suggestions(), [])
+        self.client.get(reverse('posts:profile_follow', args=('friend',)))
+        self.assertEqual(self.suggestions(), [('author', 'Лев Толстой')])
+        self.client.get(reverse('posts:profile_follow', args=('author',)))
+        self.assertEqual(self.suggestions(), [])
+
+    def test_graph_follows_change_log(self):
+        """Граф догоняет журнал изменений без перезагрузки"""
+        recommendations.get_graph()
+        Follow.objects.create(user=self.user, author=self.friend)
+        with self.assertNumQueries(0):
+            graph = recommendations.get_graph()
+        self.assertEqual(graph.suggest(self.user.pk, 5), [self.author.pk])
+
+    def test_lost_change_reloads_graph(self):
+        """Пропавшая запись журнала приводит к перезагрузке графа"""
+        recommendations.get_graph()
+        recommendations.reset()
+        with self.assertNumQueries(1):
+            recommendations.get_graph()
+
+    def test_stale_graph_answers_while_reloading(self):
+        """Пока граф загружает другой поток, запрос отвечает по старому"""
+        graph = recommendations.get_graph()
+        recommendations.reset()
+        with recommendations._loading:
+            with self.assertNumQueries(0):
+                self.assertIs(recommendations.get_graph(), graph)
+        self.assertIsNot(recommendations.get_graph(), graph)
+
+    def test_new_suggestion_changes_profile_etag(self):
+        """Новые рекомендации меняют ETag профиля"""
+        Follow.objects.create(user=self.user, author=self.friend)
+        url = reverse('posts:profile', args=('test-user',))
+        etag = self.client.get(url)['ETag']
+        # Подписка друга меняет рекомендации, но не профиль читателя.
+        Follow.objects.create(
+            user=self.friend,
+            author=User.objects.create_user(username='poet'))
+        cache.delete(recommendations.SUGGESTIONS_KEY % self.user.pk)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'poet')
+
+    def test_page_shows_suggestions(self):
+        """Профиль показывает блок «Кого почитать»"""
+        Follow.objects.create(user=self.user, author=self.friend)
+        response = self.client.get(
+            reverse('posts:profile', args=('friend',)))
+        self.assertContains(response, 'Кого почитать')
+        self.assertContains(response, 'Лев Толстой')
@@ -0,0 +1,113 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Ежики',
+            slug='hedgehogs',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Кот <b>ел</b> рыбу', author=cls.user)
+        cls.group_post = Post.objects.create(
+            text='Про лес', author=cls.user, group=cls.group)
+        Post.objects.create(text='Про собак', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def found(self, query):
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': query})
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_search_by_text_author_and_group(self):
+        """Поиск находит пост по тексту, автору и группе"""
+        cases = {
+            'кот': [self.post.pk],
+            'ежик': [self.group_post.pk],
+            'толст про лес': [self.group_post.pk],
+            '': [],
+            '"*)(': [],
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.found(query), expected)
+
+    def test_results_are_ranked(self):
+        """Совпадение в тексте важнее совпадения в группе"""
+        in_text = Post.objects.create(
+            text='Ежики в тумане', author=self.user)
+        self.assertEqual(
+            self.found('ежики'), [in_text.pk, self.group_post.pk])
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при правке и удалении поста"""
+        post = Post.objects.create(text='Черновик', author=self.user)
+        post.text = 'Чистовик'
+        post.save()
+        self.assertEqual(self.found('черновик'), [])
+        self.assertEqual(self.found('чистовик'), [post.pk])
+        post.delete()
+        self.assertEqual(self.found('чистовик'), [])
+
+    def test_index_follows_author_and_group(self):
+        """Индекс обновляется при смене имени автора и группы"""
+        self.user.last_name = 'Достоевский'
+        self.user.save()
+        self.assertEqual(len(self.found('достоевский')), 3)
+        self.group.delete()
+        self.assertEqual(self.found('ежики'), [])
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        """Найденные слова выделены, а HTML поста экранирован"""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'рыбу'})
+        self.assertContains(
+            response, 'Кот &lt;b&gt;ел&lt;/b&gt; <mark>рыбу</mark>')
+
+    @override_settings(NUMBER_OF_POSTS=1)
+    def test_results_are_paginated_by_cursor(self):
+        """Результаты листаются курсором в порядке ранга"""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'про'})
+        first = [post.pk for post in response.context['page_obj']]
+        next_querystring = response.context['page_obj'].next_querystring
+        self.assertIn('q=', next_querystring)
+        response = self.guest_client.get(
+            reverse('posts:search') + '?' + next_querystring)
+        second = [post.pk for post in response.context['page_obj']]
+        self.assertEqual(len(first + second), 2)
+        self.assertNotEqual(first, second)
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по полнотекстовому индексу"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='x')
+        self.guest_client.force_login(admin)
+        response = self.guest_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'ежик'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.group_post])
+
+    def test_rebuild_command_restores_index(self):
+        """Команда rebuild_search_index восстанавливает индекс"""
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM posts_post_fts')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.found('кот'), [self.post.pk])
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from core import benchmark
+from django.core.management import call_command
+from django.test import TestCase
+from posts.models import Comment, Follow, Post, TimelineEntry, User
+
+
+class SeedDataTests(TestCase):
+    def test_seed_creates_consistent_data(self):
+        """seed_data создаёт данные и пересчитывает производные таблицы"""
+        call_command(
+            'seed_data', users=30, groups=3, posts=60, comments=90,
+            follows=5, seed=1, batch_size=7, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 90)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        author = User.objects.filter(posts__isnull=False).first()
+        self.assertEqual(
+            author.counters.posts_count, author.posts.count())
+        dates = {post.pub_date.date() for post in Post.objects.all()}
+        self.assertGreater(len(dates), 1)
+
+
+class BenchmarkTests(TestCase):
+    def test_benchmark_covers_every_named_route(self):
+        """benchmark замеряет все именованные адреса и пишет JSON"""
+        call_command(
+            'seed_data', users=5, groups=1, posts=5, comments=5,
+            follows=2, seed=1, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command(
+                'benchmark', requests=2, concurrency=1, output=output,
+                stdout=StringIO(), stderr=StringIO())
+            with open(output) as results:
+                report = json.load(results)
+        names = {name for name, _ in benchmark.named_routes()}
+        self.assertEqual(set(report['routes']), names)
+        for name, result in report['routes'].items():
+            with self.subTest(name=name):
+                self.assertEqual(result['requests'], 2)
+                self.assertEqual(result['errors'], 0)
+                self.assertIsNotNone(result['p99_ms'])
+
+    def test_percentile_uses_nearest_rank(self):
+        """Процентиль считается по ближайшему рангу"""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertIsNone(benchmark.percentile([], 95))
@@ -0,0 +1,128 @@
+import json
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Group, Post
+
+User = get_user_model()
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+def content(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Коты & <собаки>',
+            slug='cats',
+            description='Тестовое описание',
+        )
+        cls.group_post = Post.objects.create(
+            text='Пост <b>в группе</b>', author=cls.author, group=cls.group)
+        cls.post = Post.objects.create(
+            text='Пост без группы', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def get(self, name, *args, **headers):
+        return self.guest_client.get(reverse(name, args=args), **headers)
+
+    def test_formats_are_well_formed(self):
+        """Ленты всех форматов разбираются и содержат посты"""
+        rss = ElementTree.fromstring(content(self.get('posts:feed', 'rss')))
+        self.assertEqual(
+            [item.findtext('description') for item in rss.iter('item')],
+            [self.post.text, self.group_post.text])
+        atom = ElementTree.fromstring(
+            content(self.get('posts:group_feed', 'cats', 'atom')))
+        self.assertEqual(
+            [entry.findtext(ATOM + 'summary')
+             for entry in atom.iter(ATOM + 'entry')],
+            [self.group_post.text])
+        feed = json.loads(
+            content(self.get('posts:profile_feed', 'author', 'json')))
+        self.assertEqual(
+            [item['content_text'] for item in feed['items']],
+            [self.post.text, self.group_post.text])
+        self.assertEqual(feed['items'][1]['tags'], [self.group.title])
+
+    def test_feed_is_streamed_then_cached(self):
+        """Первый ответ идёт потоком, повтор отдаётся из кеша без базы"""
+        first = self.get('posts:feed', 'rss')
+        self.assertTrue(first.streaming)
+        body = content(first)
+        with self.assertNumQueries(0):
+            second = self.get('posts:feed', 'rss')
+        self.assertFalse(second.streaming)
+        self.assertEqual(second.content, body)
+
+    def test_conditional_get(self):
+        """Повтор с If-None-Match или If-Modified-Since получает 304"""
+        response = self.get('posts:feed', 'atom')
+        content(response)
+        cases = {
+            'HTTP_IF_NONE_MATCH': response['ETag'],
+            'HTTP_IF_MODIFIED_SINCE': response['Last-Modified'],
+        }
+        for header, value in cases.items():
+            with self.subTest(header=header):
+                with self.assertNumQueries(0):
+                    repeated = self.get('posts:feed', 'atom', **{
+                        header: value})
+                self.assertEqual(repeated.status_code, 304)
+
+    def test_new_post_invalidates_feed(self):
+        """Новый пост меняет ETag и попадает в ленту"""
+        response = self.get('posts:feed', 'json')
+        content(response)
+        Post.objects.create(text='Свежий пост', author=self.author)
+        repeated = self.get(
+            'posts:feed', 'json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeated.status_code, 200)
+        items = json.loads(content(repeated))['items']
+        self.assertEqual(items[0]['content_text'], 'Свежий пост')
+
+    @override_settings(FEED_ITEMS=1)
+    def test_feed_is_limited(self):
+        """В ленту попадают только FEED_ITEMS последних постов"""
+        feed = json.loads(content(self.get('posts:feed', 'json')))
+        self.assertEqual(len(feed['items']), 1)
+
+    def test_unknown_feed_returns_404(self):
+        """Неизвестный формат, группа или автор дают 404"""
+        cases = (
+            ('posts:feed', 'xml'),
+            ('posts:group_feed', 'dogs', 'rss'),
+            ('posts:profile_feed', 'nobody', 'rss'),
+        )
+        for name, *args in cases:
+            with self.subTest(name=name):
+                self.assertEqual(self.get(name, *args).status_code, 404)
+
+    def test_pages_link_feeds(self):
+        """Главная, группа и профиль ссылаются на свои ленты"""
+        cases = {
+            reverse('posts:index'): reverse('posts:feed', args=('rss',)),
+            reverse('posts:group_list', args=('cats',)): reverse(
+                'posts:group_feed', args=('cats', 'atom')),
+            reverse('posts:profile', args=('author',)): reverse(
+                'posts:profile_feed', args=('author', 'json')),
+        }
+        for page, feed in cases.items():
+            with self.subTest(page=page):
+                self.assertContains(
+                    self.guest_client.get(page), 'href="%s"' % feed)
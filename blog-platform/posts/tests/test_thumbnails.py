@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import thumbnails
+from posts.cards import card_key
+from posts.models import Post
+from sorl.thumbnail import get_thumbnail
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class ThumbnailPregenerationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test-user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, name):
+        return SimpleUploadedFile(
+            name=name, content=SMALL_GIF, content_type='image/gif')
+
+    def test_upload_generates_all_variants(self):
+        """Загрузка картинки сразу готовит все варианты миниатюр"""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': self.upload('a.gif')})
+        post = Post.objects.get(text='Пост с картинкой')
+        for geometry in thumbnails.VARIANTS:
+            with self.subTest(geometry=geometry):
+                self.assertIsNotNone(
+                    thumbnails.ready_thumbnail(post.image, geometry))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, '<img class="card-img my-2"')
+
+    def test_template_shows_placeholder_without_generating(self):
+        """Шаблон показывает заглушку и не создаёт миниатюру сам"""
+        post = Post.objects.create(
+            text='Пост без миниатюр',
+            author=self.user,
+            image=self.upload('b.gif'),
+        )
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'aspect-ratio: 960 / 339')
+        self.assertIsNone(thumbnails.ready_thumbnail(post.image, '960x339'))
+        self.assertIsNone(cache.get(card_key(post)))
+        thumbnails.generate(post.image.name)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'aspect-ratio: 960 / 339')
+
+    def test_ready_thumbnail_matches_sorl_name(self):
+        """Имя готовой миниатюры совпадает с тем, что выдаёт sorl"""
+        post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.user,
+            image=self.upload('c.gif'),
+        )
+        for preserve_format in (False, True):
+            with override_settings(
+                    THUMBNAIL_PRESERVE_FORMAT=preserve_format,
+                    THUMBNAIL_PROGRESSIVE=False):
+                for geometry, options in thumbnails.VARIANTS.items():
+                    with self.subTest(geometry=geometry,
+                                      preserve_format=preserve_format):
+                        expected = get_thumbnail(
+                            post.image, geometry, **options).name
+                        ready = thumbnails.ready_thumbnail(
+                            post.image, geometry)
+                        self.assertIsNotNone(ready)
+                        self.assertEqual(ready.name, expected)
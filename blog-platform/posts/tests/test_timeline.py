@@ -0,0 +1,129 @@
+from io import StringIO
+
+from core import tasks
+from core.models import Task
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.old_post = Post.objects.create(
+            text='Старый пост', author=cls.author)
+        Post.objects.create(text='Чужой пост', author=cls.stranger)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def run_tasks(self):
+        for task_id in tasks.claim(100):
+            tasks.execute(task_id)
+
+    def feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_follow_backfills_and_unfollow_clears_timeline(self):
+        """Подписка добавляет посты автора в ленту, отписка убирает"""
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=('author',)))
+        self.assertEqual(self.feed(), [self.old_post.pk])
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=('author',)))
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новый пост раскладывается в ленты подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post))
+        self.assertEqual(self.feed(), [post.pk, self.old_post.pk])
+
+    def test_follow_page_reads_single_table(self):
+        """Лента подписок читается из материализованной таблицы"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.feed()
+        with CaptureQueriesContext(connection) as queries:
+            self.feed()
+        feed_queries = [
+            query['sql'] for query in queries
+            if 'posts_post' in query['sql']
+        ]
+        self.assertEqual(len(feed_queries), 1)
+        self.assertIn('posts_timelineentry', feed_queries[0])
+        self.assertNotIn('posts_follow', feed_queries[0])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_pulled_in_background(self):
+        """Посты популярного автора не раскладываются, а подтягиваются
+        фоновой задачей, которую ставит страница"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.run_tasks()
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        self.assertEqual(self.feed(), [self.old_post.pk])
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        self.run_tasks()
+        self.assertEqual(self.feed(), [post.pk, self.old_post.pk])
+        self.assertFalse(Task.objects.filter(status=Task.PENDING))
+
+    @override_settings(TIMELINE_BACKFILL=1)
+    def test_timeline_keeps_latest_posts_of_author(self):
+        """В ленту попадают только TIMELINE_BACKFILL последних постов
+        автора"""
+        newest = Post.objects.create(text='Новый пост', author=self.author)
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=('author',)))
+        self.assertEqual(self.feed(), [newest.pk])
+        timeline.rebuild()
+        self.assertEqual(self.feed(), [newest.pk])
+
+    def test_rebuild_command_restores_timelines(self):
+        """Команда rebuild_timelines восстанавливает ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        TimelineEntry.objects.create(
+            user=self.reader,
+            post=Post.objects.get(author=self.stranger),
+            author=self.stranger,
+            pub_date=self.old_post.pub_date,
+        )
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.feed(), [self.old_post.pk])
+
+    @override_settings(TIMELINE_BATCH_SIZE=1, TIMELINE_BACKFILL=1)
+    def test_rebuild_in_batches(self):
+        """Пересборка пачками берёт последние посты каждого автора"""
+        newest = Post.objects.create(text='Новый пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.stranger)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        TimelineEntry.objects.all().delete()
+        TimelineEntry.objects.create(
+            user=self.author, post=self.old_post, author=self.author,
+            pub_date=self.old_post.pub_date)
+        with self.assertNumQueries(17):
+            self.assertEqual(timeline.rebuild(), 2)
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('user_id', 'post_id')),
+            {(self.reader.pk, newest.pk),
+             (self.reader.pk, Post.objects.get(author=self.stranger).pk),
+             (self.stranger.pk, newest.pk)})
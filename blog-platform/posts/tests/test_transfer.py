@@ -0,0 +1,214 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from posts import search, transfer
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after(calls):
+    """report, который обрывает работу на calls-м отчёте."""
+    reports = []
+
+    def report(kind, count, rate):
+        reports.append(kind)
+        if len(reports) == calls:
+            raise Interrupted
+    return report
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='cats',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text='Пост про котов %s' % i,
+                author=cls.author,
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(5)
+        ]
+        for i in range(3):
+            Comment.objects.create(
+                text='Комментарий %s' % i,
+                author=cls.reader,
+                post=cls.posts[-1],
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'content.jsonl')
+        self.images = os.path.join(directory.name, 'images.tar')
+
+    def snapshot(self):
+        return {
+            'posts': list(Post.objects.order_by('pk').values_list(
+                'text', 'author__username', 'group__slug', 'pub_date',
+                'comments_count')),
+            'comments': list(Comment.objects.order_by('pk').values_list(
+                'text', 'post__text', 'author__username', 'created')),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username')),
+            'groups': list(Group.objects.values_list(
+                'slug', 'title', 'description')),
+            'users': list(User.objects.order_by('username').values_list(
+                'username', 'first_name', 'last_name')),
+        }
+
+    def clear(self):
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка восстанавливают данные и производные"""
+        before = self.snapshot()
+        call_command('export_content', self.path, batch_size=2,
+                     stdout=StringIO())
+        self.assertFalse(os.path.exists(transfer.checkpoint_path(self.path)))
+        self.clear()
+        call_command('import_content', self.path, batch_size=2,
+                     stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+        author = User.objects.get(username='author')
+        reader = User.objects.get(username='reader')
+        self.assertEqual(author.counters.posts_count, 5)
+        self.assertEqual(author.counters.followers_count, 1)
+        self.assertFalse(reader.has_usable_password())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=reader).count(), 5)
+        self.assertEqual(
+            Post.objects.filter(pk__in=search.matching_ids('котов')).count(),
+            5)
+        self.assertFalse(os.path.exists(transfer.checkpoint_path(self.path)))
+
+    def test_import_keeps_existing_posts(self):
+        """Загрузка в непустую базу сдвигает id постов и комментариев"""
+        transfer.export(self.path)
+        transfer.load(self.path)
+        self.assertEqual(Post.objects.count(), 10)
+        self.assertEqual(Comment.objects.count(), 6)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            User.objects.get(username='author').counters.posts_count, 10)
+
+    def test_export_resumes_from_checkpoint(self):
+        """Прерванная выгрузка продолжается и даёт тот же файл"""
+        transfer.export(self.path, batch_size=2)
+        with open(self.path, 'rb') as complete:
+            expected = complete.read()
+        os.remove(self.path)
+        with self.assertRaises(Interrupted):
+            transfer.export(
+                self.path, batch_size=2, report=interrupt_after(4))
+        self.assertTrue(os.path.exists(transfer.checkpoint_path(self.path)))
+        transfer.export(self.path, batch_size=2)
+        with open(self.path, 'rb') as resumed:
+            self.assertEqual(resumed.read(), expected)
+
+    def test_import_resumes_from_checkpoint(self):
+        """Прерванная загрузка продолжается без повторов"""
+        transfer.export(self.path)
+        before = self.snapshot()
+        self.clear()
+        with self.assertRaises(Interrupted):
+            transfer.load(
+                self.path, batch_size=2, report=interrupt_after(4))
+        self.assertTrue(os.path.exists(transfer.checkpoint_path(self.path)))
+        counts = transfer.load(self.path, batch_size=2)
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(counts['post'], 5)
+
+    def test_resumed_export_counts_all_rows(self):
+        """Продолженная выгрузка считает и строки до обрыва"""
+        expected = transfer.export(self.path, batch_size=2)
+        os.remove(self.path)
+        with self.assertRaises(Interrupted):
+            transfer.export(
+                self.path, batch_size=2, report=interrupt_after(4))
+        self.assertEqual(transfer.export(self.path, batch_size=2), expected)
+
+    def test_images_travel_in_archive(self):
+        """Картинки постов переносятся через tar-архив"""
+        post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.author,
+            image=SimpleUploadedFile(
+                name='a.gif', content=SMALL_GIF, content_type='image/gif'),
+        )
+        name = post.image.name
+        transfer.export(self.path, images=self.images)
+        self.clear()
+        default_storage.delete(name)
+        transfer.load(self.path, images=self.images)
+        imported = Post.objects.get(text='Пост с картинкой')
+        self.assertEqual(imported.image.name, name)
+        with imported.image.open('rb') as image:
+            self.assertEqual(image.read(), SMALL_GIF)
+        self.assertFalse(Post.objects.exclude(pk=imported.pk).exclude(
+            image='').exists())
+
+    def test_failed_batch_removes_its_images(self):
+        """Откат пачки удаляет её картинки, и повтор не плодит копии"""
+        post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.author,
+            image=SimpleUploadedFile(
+                name='b.gif', content=SMALL_GIF, content_type='image/gif'),
+        )
+        name = post.image.name
+        transfer.export(self.path, images=self.images)
+        self.clear()
+        default_storage.delete(name)
+        with mock.patch.object(
+                transfer, 'explicit_dates', side_effect=Interrupted):
+            with self.assertRaises(Interrupted):
+                transfer.load(self.path, images=self.images)
+        self.assertFalse(default_storage.exists(name))
+        transfer.load(self.path, images=self.images)
+        self.assertEqual(
+            Post.objects.get(text='Пост с картинкой').image.name, name)
+        directory, filename = os.path.split(name)
+        stem = os.path.splitext(filename)[0]
+        self.assertEqual(
+            [image for image in default_storage.listdir(directory)[1]
+             if image.startswith(stem)],
+            [filename])
@@ -0,0 +1,164 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import trending
+from posts.models import Comment, Follow, Group, Post, PostScore
+
+User = get_user_model()
+
+
+@override_settings(
+    BACKGROUND_WORKERS=0,
+    TRENDING_FLUSH_INTERVAL=3600,
+    TRENDING_BATCH_SIZE=1000,
+)
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test-user')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='cats',
+            description='Тестовое описание',
+        )
+        cls.commented = Post.objects.create(
+            text='Старый пост', author=cls.author, group=cls.group)
+        cls.viewed = Post.objects.create(
+            text='Просматриваемый пост', author=cls.author)
+        cls.fresh = Post.objects.create(
+            text='Свежий пост', author=cls.user, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        trending._buffer.reset()
+        trending.rebuild()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def popular(self, url):
+        response = self.client.get(url)
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_log_add(self):
+        """log_add складывает степени двойки без переполнения"""
+        self.assertAlmostEqual(trending.log_add(3, 3), 4)
+        self.assertEqual(trending.log_add(None, 5), 5)
+        self.assertAlmostEqual(trending.log_add(5000, 1), 5000)
+
+    def test_newer_event_weighs_more(self):
+        """Событие через период полураспада весит вдвое больше"""
+        now = trending.EPOCH + 10 ** 6
+        half_life = trending.settings.TRENDING_HALF_LIFE
+        self.assertAlmostEqual(
+            trending.log_weight(1, now + half_life)
+            - trending.log_weight(1, now), 1)
+
+    def test_events_are_written_in_batch(self):
+        """События копятся в памяти и записываются одной пачкой"""
+        before = PostScore.objects.get(post=self.viewed).score
+        for _ in range(3):
+            self.client.get(
+                reverse('posts:post_detail', args=(self.viewed.pk,)))
+        self.assertEqual(
+            PostScore.objects.get(post=self.viewed).score, before)
+        trending.flush(force=True)
+        self.assertGreater(
+            PostScore.objects.get(post=self.viewed).score, before + 1)
+
+    def test_flush_when_batch_is_full(self):
+        """Полная пачка записывается без ожидания интервала"""
+        with override_settings(TRENDING_BATCH_SIZE=2):
+            trending.record(self.commented.pk, trending.VIEW)
+            self.assertEqual(trending._buffer.size, 1)
+            trending.record(self.commented.pk, trending.VIEW)
+        self.assertEqual(trending._buffer.size, 0)
+
+    def test_popular_order(self):
+        """Комментарии и просмотры поднимают пост в популярном"""
+        self.assertEqual(
+            self.popular(reverse('posts:popular')),
+            [self.fresh.pk, self.viewed.pk, self.commented.pk])
+        Comment.objects.create(
+            text='Комментарий', author=self.user, post=self.commented)
+        trending.record(self.viewed.pk, trending.VIEW)
+        trending.flush(force=True)
+        self.assertEqual(
+            self.popular(reverse('posts:popular')),
+            [self.commented.pk, self.viewed.pk, self.fresh.pk])
+
+    def test_group_popular(self):
+        """Популярное группы содержит только посты группы"""
+        Comment.objects.create(
+            text='Комментарий', author=self.user, post=self.commented)
+        trending.flush(force=True)
+        self.assertEqual(
+            self.popular(reverse('posts:group_popular', args=('cats',))),
+            [self.commented.pk, self.fresh.pk])
+
+    def test_group_change_moves_score(self):
+        """Перенос поста в группу переносит и его рейтинг"""
+        post = Post.objects.get(pk=self.viewed.pk)
+        post.group = self.group
+        post.save()
+        self.assertEqual(
+            PostScore.objects.get(post=post).group_id, self.group.pk)
+
+    def test_follow_boosts_author_posts(self):
+        """Новый подписчик поднимает последние посты автора"""
+        before = PostScore.objects.get(post=self.commented).score
+        Follow.objects.create(user=self.user, author=self.author)
+        trending.flush(force=True)
+        self.assertGreater(
+            PostScore.objects.get(post=self.commented).score, before)
+        self.assertGreater(
+            PostScore.objects.get(post=self.viewed).score, before)
+
+    @override_settings(NUMBER_OF_POSTS=2)
+    def test_cursor_pagination(self):
+        """Курсор следующей страницы продолжает рейтинг"""
+        response = self.client.get(reverse('posts:popular'))
+        first = [post.pk for post in response.context['page_obj']]
+        cursor = response.context['page_obj'].next_querystring
+        second = self.popular(reverse('posts:popular') + '?' + cursor)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(
+            sorted(first + second),
+            sorted([self.commented.pk, self.viewed.pk, self.fresh.pk]))
+
+    def test_new_post_gets_score(self):
+        """Новый пост попадает в популярное после записи пачки"""
+        post = Post.objects.create(text='Новый пост', author=self.user)
+        trending.flush(force=True)
+        self.assertTrue(PostScore.objects.filter(post=post).exists())
+
+    def test_rebuild_in_batches(self):
+        """Пересчёт по диапазонам даёт те же рейтинги, что и целиком"""
+        Comment.objects.create(
+            text='Комментарий', author=self.user, post=self.commented)
+        trending.rebuild()
+        expected = dict(PostScore.objects.values_list('post_id', 'score'))
+        PostScore.objects.update(score=0)
+        self.assertEqual(trending.rebuild(batch_size=1), 3)
+        self.assertEqual(
+            dict(PostScore.objects.values_list('post_id', 'score')), expected)
+
+    def test_not_modified_view_is_counted(self):
+        """Просмотр, получивший 304, тоже засчитывается"""
+        url = reverse('posts:post_detail', args=(self.viewed.pk,))
+        self.client.get(url)
+        response = self.client.get(url)
+        repeated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeated.status_code, 304)
+        self.assertEqual(trending._buffer.size, 3)
+
+    def test_due_events_flush_after_any_request(self):
+        """Накопленные события уходят после любого запроса, когда пора"""
+        trending.record(self.viewed.pk, trending.COMMENT * 100)
+        score = PostScore.objects.get(post=self.viewed).score
+        trending._buffer.flushed -= 7200
+        self.client.get(reverse('about:author'))
+        self.assertGreater(
+            PostScore.objects.get(post=self.viewed).score, score)
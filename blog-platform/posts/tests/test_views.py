@@ -1,6 +1,9 @@
 from django import forms
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from posts.forms import PostForm
 from posts.models import Follow, Group, Post
@@ -249,3 +252,48 @@ class PostPagesTests(TestCase):
         )
         self.assertRedirects(response, reverse(
             'posts:profile', args=('test_2-user',)))
+
+
+@override_settings(NUMBER_OF_FOLLOWS=2)
+class FollowListTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [
+            User.objects.create_user(username='reader-%s' % number)
+            for number in range(3)]
+        for reader in cls.readers:
+            Follow.objects.create(user=reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def people(self, response):
+        return [person.username for person in response.context['page_obj']]
+
+    def test_followers_pages(self):
+        """Подписчики листаются курсором, новые подписчики первыми"""
+        url = reverse('posts:followers', args=('author',))
+        response = self.client.get(url)
+        self.assertEqual(self.people(response), ['reader-2', 'reader-1'])
+        self.assertEqual(response.context['count'], 3)
+        response = self.client.get(
+            url + '?' + response.context['page_obj'].next_querystring)
+        self.assertEqual(self.people(response), ['reader-0'])
+
+    def test_following_page(self):
+        """Страница подписок показывает авторов пользователя"""
+        response = self.client.get(
+            reverse('posts:following', args=('reader-0',)))
+        self.assertEqual(self.people(response), ['author'])
+        self.assertEqual(response.context['count'], 1)
+
+    def test_counts_come_from_counters(self):
+        """Число подписчиков берётся из счётчиков, без COUNT"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:followers', args=('author',)))
+        self.assertFalse([
+            query for query in queries
+            if 'COUNT(' in query['sql'].upper()])
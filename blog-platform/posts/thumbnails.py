@@ -0,0 +1,47 @@
+"""Заранее подготовленные миниатюры картинок постов.
+
+Миниатюры всех вариантов из ``VARIANTS`` создаются фоновой задачей
+после обработки загруженной картинки в ``posts.images``. Шаблоны только
+читают готовую миниатюру из хранилища sorl-thumbnail и никогда не
+запускают её генерацию.
+"""
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+VARIANTS = {
+    '960x339': {'crop': 'center', 'upscale': True},
+    '1080x200': {'crop': 'center', 'upscale': True},
+}
+
+
+def generate(name):
+    """Создаёт все варианты миниатюр для файла name."""
+    for geometry, options in VARIANTS.items():
+        get_thumbnail(name, geometry, **options)
+
+
+def _thumbnail_options(source, options):
+    """Повторяет подготовку опций ThumbnailBackend.get_thumbnail."""
+    backend = default.backend
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def ready_thumbnail(file_, geometry):
+    """Готовая миниатюра или None, если она ещё не создана."""
+    if not file_:
+        return None
+    source = ImageFile(file_)
+    options = _thumbnail_options(source, VARIANTS[geometry])
+    name = default.backend._get_thumbnail_filename(source, geometry, options)
+    return default.kvstore.get(ImageFile(name, default.storage))
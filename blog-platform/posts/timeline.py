@@ -0,0 +1,197 @@
+"""Лента подписок, материализованная при записи.
+
+Новый пост раскладывается в ``TimelineEntry`` всех подписчиков автора,
+поэтому страница ``follow_index`` читается одним проходом по индексу
+(user, pub_date, post). Посты авторов, у которых подписчиков больше
+``TIMELINE_FANOUT_LIMIT``, не раскладываются: открытие страницы ставит
+фоновую задачу, которая подтягивает их в ленту читателя, а сама
+страница в базу не пишет.
+
+Лента хранит не больше ``TIMELINE_BACKFILL`` постов каждого автора на
+момент подписки или пересборки: более старые посты в ней не видны,
+их можно найти в профиле автора.
+"""
+from core import db
+from core.background import run_in_background
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Follow, Post, TimelineEntry, UserCounter
+
+TIMELINE_ORDERING = ('-pub_date', '-post_id')
+
+CELEBRITIES_KEY = 'timeline:celebrities'
+CELEBRITIES_TIMEOUT = 600
+PULLED_KEY = 'timeline:pulled:%s'
+
+# Последние TIMELINE_BACKFILL постов автора каждой подписки из пачки.
+REBUILD_SQL = (
+    'INSERT INTO {entries} (user_id, post_id, author_id, pub_date) '
+    'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+    'FROM {follows} f JOIN {posts} p ON p.id IN ('
+    'SELECT id FROM {posts} WHERE author_id = f.author_id '
+    'ORDER BY pub_date DESC LIMIT %s) '
+    'WHERE f.id IN ({ids}) '
+    'ON CONFLICT DO NOTHING'
+)
+
+
+def celebrity_ids():
+    """Авторы, посты которых не раскладываются по лентам."""
+    ids = cache.get(CELEBRITIES_KEY)
+    if ids is None:
+        ids = set(
+            UserCounter.objects.filter(
+                followers_count__gt=settings.TIMELINE_FANOUT_LIMIT)
+            .values_list('user_id', flat=True)
+        )
+        cache.set(CELEBRITIES_KEY, ids, CELEBRITIES_TIMEOUT)
+    return ids
+
+
+def _entry(user_id, post):
+    return TimelineEntry(
+        user_id=user_id,
+        post_id=post.pk,
+        author_id=post.author_id,
+        pub_date=post.pub_date,
+    )
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_post(post):
+    if post.author_id in celebrity_ids():
+        return
+    followers = (
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=settings.TIMELINE_BATCH_SIZE)
+    )
+    batch = []
+    for user_id in followers:
+        batch.append(user_id)
+        if len(batch) == settings.TIMELINE_BATCH_SIZE:
+            _bulk_insert([_entry(user, post) for user in batch])
+            batch = []
+    if batch:
+        _bulk_insert([_entry(user, post) for user in batch])
+
+
+def add_author(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date')
+        .only('pk', 'author_id', 'pub_date')
+        [:settings.TIMELINE_BACKFILL]
+    )
+    _bulk_insert([_entry(user_id, post) for post in posts])
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def _celebrity_posts(user_id):
+    """Посты популярных авторов читателя, ещё не подтянутые в ленту."""
+    celebrities = celebrity_ids()
+    if not celebrities:
+        return None
+    authors = list(
+        Follow.objects.filter(user_id=user_id, author_id__in=celebrities)
+        .values_list('author_id', flat=True)
+    )
+    if not authors:
+        return None
+    posts = Post.objects.filter(author_id__in=authors)
+    since = cache.get(PULLED_KEY % user_id)
+    if since is not None:
+        posts = posts.filter(pub_date__gt=since)
+    return posts
+
+
+def schedule_pull(user_id):
+    """Ставит в очередь подтягивание, если есть новые посты."""
+    posts = _celebrity_posts(user_id)
+    if posts is not None and posts.exists():
+        run_in_background(
+            pull_celebrity_posts, user_id, key='pull:%s' % user_id)
+
+
+def pull_celebrity_posts(user_id):
+    """Подтягивает в ленту новые посты популярных авторов."""
+    started = timezone.now()
+    posts = _celebrity_posts(user_id)
+    if posts is None:
+        return
+    posts = (
+        posts.order_by('-pub_date')
+        .only('pk', 'author_id', 'pub_date')
+        [:settings.TIMELINE_BACKFILL]
+    )
+    _bulk_insert([_entry(user_id, post) for post in posts])
+    cache.set(PULLED_KEY % user_id, started, None)
+
+
+def entries_for(user):
+    schedule_pull(user.pk)
+    return TimelineEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group')
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты пользователей по таблице подписок.
+
+    Подписки обходятся пачками по ``TIMELINE_BATCH_SIZE`` в порядке
+    (user, author), и каждая пачка пишется своей транзакцией: ленты её
+    пользователей очищаются и заполняются одним INSERT ... SELECT.
+    """
+    follows = Follow.objects.order_by('user_id', 'author_id')
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+    users = 0
+    last_user = last_author = 0
+    while True:
+        batch = list(
+            follows.filter(
+                Q(user_id__gt=last_user)
+                | Q(user_id=last_user, author_id__gt=last_author))
+            .values_list('pk', 'user_id', 'author_id')
+            [:settings.TIMELINE_BATCH_SIZE])
+        if not batch:
+            break
+        # Лента пользователя очищается в пачке с его первой подпиской,
+        # заодно с лентами пользователей без подписок перед ним.
+        db.write(
+            _rebuild_batch,
+            entries.filter(
+                user_id__gt=last_user, user_id__lte=batch[-1][1]),
+            [pk for pk, _, _ in batch])
+        users += len({user_id for _, user_id, _ in batch} - {last_user})
+        _, last_user, last_author = batch[-1]
+    entries.filter(user_id__gt=last_user).delete()
+    return users
+
+
+def _rebuild_batch(stale, follow_ids):
+    stale.delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            REBUILD_SQL.format(
+                entries=TimelineEntry._meta.db_table,
+                follows=Follow._meta.db_table,
+                posts=Post._meta.db_table,
+                ids=', '.join(['%s'] * len(follow_ids))),
+            [settings.TIMELINE_BACKFILL] + follow_ids)
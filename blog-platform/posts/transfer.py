@@ -0,0 +1,403 @@
+"""Выгрузка и загрузка содержимого блога в JSON Lines.
+
+Файл выгрузки содержит по строке на запись в порядке групп,
+пользователей, постов, комментариев и подписок; у каждой строки есть
+поле ``type``. Авторы и группы указываются именем пользователя и slug,
+посты и комментарии сохраняют свои id. Картинки постов пишутся в
+несжатый tar-архив рядом с файлом в том же порядке, что и посты.
+
+Выгрузка читает таблицы через ``.iterator()`` по возрастанию pk, а
+загрузка читает файл построчно и вставляет записи пачками
+``bulk_create``, каждую пачку в своей транзакции, поэтому память не
+растёт с объёмом данных. После каждой пачки прогресс сохраняется в
+файл ``<путь>.checkpoint``, и прерванная работа продолжается с него.
+Пачки загрузки можно повторять: конфликтующие строки пропускаются.
+Счётчики, ленты подписок и поисковый индекс пересчитываются один раз в
+конце загрузки.
+"""
+import json
+import os
+import tarfile
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from . import (counters, freshness, recommendations, search, timeline,
+               trending)
+from .models import Comment, Follow, Group, Post, User
+from .utils import explicit_dates
+
+KINDS = ('group', 'user', 'post', 'comment', 'follow')
+
+EXPORTED = {
+    'group': (Group, ('slug', 'title', 'description')),
+    'user': (User, ('username', 'first_name', 'last_name')),
+    'post': (Post, (
+        'id', 'author__username', 'group__slug', 'text', 'pub_date',
+        'modified', 'image')),
+    'comment': (Comment, (
+        'id', 'post_id', 'author__username', 'text', 'created')),
+    'follow': (Follow, ('user__username', 'author__username')),
+}
+
+
+def _field_name(lookup):
+    name = lookup.split('__')[0]
+    return name[:-3] if name.endswith('_id') else name
+
+
+def checkpoint_path(path):
+    return path + '.checkpoint'
+
+
+def load_checkpoint(path):
+    try:
+        with open(checkpoint_path(path)) as source:
+            return json.load(source)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, state):
+    temporary = checkpoint_path(path) + '.tmp'
+    with open(temporary, 'w') as output:
+        json.dump(state, output)
+    os.replace(temporary, checkpoint_path(path))
+
+
+def remove_checkpoint(path):
+    try:
+        os.remove(checkpoint_path(path))
+    except FileNotFoundError:
+        pass
+
+
+def _open_truncated(path, offset):
+    """Файл для дозаписи с позиции offset: хвост после сбоя отбрасывается."""
+    output = open(path, 'ab')
+    output.truncate(offset)
+    return output
+
+
+class Progress:
+    """Число строк по типам и скорость для отчёта."""
+
+    def __init__(self, counts=None, report=None):
+        self.counts = dict(counts or {})
+        self.report = report
+        self.started = time.monotonic()
+        self.processed = 0
+
+    def add(self, kind, count):
+        self.counts[kind] = self.counts.get(kind, 0) + count
+        self.processed += count
+        if self.report is not None:
+            self.report(kind, self.counts[kind], self.rate())
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed else 0.0
+
+
+class ImageArchiveWriter:
+    def __init__(self, path, offset):
+        self.file = _open_truncated(path, offset)
+        self.tar = tarfile.open(fileobj=self.file, mode='w')
+
+    @property
+    def offset(self):
+        return self.tar.offset
+
+    def add(self, name):
+        """Добавляет файл хранилища; False, если файла нет."""
+        try:
+            size = default_storage.size(name)
+            source = default_storage.open(name)
+        except OSError:
+            return False
+        info = tarfile.TarInfo(name)
+        info.size = size
+        with source:
+            self.tar.addfile(info, source)
+        # TarFile помнит все заголовки; без очистки память растёт.
+        self.tar.members = []
+        return True
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.tar.close()
+        self.file.close()
+
+
+class ImageArchiveReader:
+    """Читает архив последовательно, в порядке постов выгрузки."""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.tar = tarfile.open(fileobj=self.file, mode='r|')
+
+    def save(self, name):
+        """Сохраняет картинку name в хранилище и возвращает новое имя."""
+        while True:
+            member = self.tar.next()
+            self.tar.members = []
+            if member is None:
+                return ''
+            if member.name == name:
+                return default_storage.save(
+                    name, File(self.tar.extractfile(member), name=name))
+
+    def close(self):
+        self.tar.close()
+        self.file.close()
+
+
+def export(path, images=None, batch_size=1000, report=None):
+    """Выгружает содержимое в path, картинки постов — в архив images."""
+    state = load_checkpoint(path) or {
+        'kind': KINDS[0], 'last_pk': 0, 'offset': 0, 'images_offset': 0,
+        'counts': {},
+    }
+    progress = Progress(state['counts'], report)
+    output = _open_truncated(path, state['offset'])
+    archive = None
+    if images:
+        archive = ImageArchiveWriter(images, state['images_offset'])
+    try:
+        for kind in KINDS[KINDS.index(state['kind']):]:
+            if kind != state['kind']:
+                state.update(kind=kind, last_pk=0)
+            _export_kind(kind, state, output, archive, progress, path,
+                         batch_size)
+    finally:
+        output.close()
+        if archive is not None:
+            archive.close()
+    remove_checkpoint(path)
+    return progress.counts
+
+
+def _export_kind(kind, state, output, archive, progress, path, batch_size):
+    model, lookups = EXPORTED[kind]
+    rows = (
+        model.objects.filter(pk__gt=state['last_pk'])
+        .order_by('pk')
+        .values('pk', *lookups)
+        .iterator(chunk_size=batch_size)
+    )
+    written = 0
+    for row in rows:
+        record = {'type': kind}
+        for lookup in lookups:
+            record[_field_name(lookup)] = row[lookup]
+        if kind == 'post' and record['image']:
+            if archive is None or not archive.add(record['image']):
+                record['image'] = ''
+        output.write(json.dumps(
+            record, ensure_ascii=False, default=str).encode() + b'\n')
+        state['last_pk'] = row['pk']
+        written += 1
+        if written == batch_size:
+            progress.add(kind, written)
+            _export_checkpoint(state, output, archive, path, progress)
+            written = 0
+    progress.add(kind, written)
+    _export_checkpoint(state, output, archive, path, progress)
+
+
+def _export_checkpoint(state, output, archive, path, progress):
+    output.flush()
+    os.fsync(output.fileno())
+    state['offset'] = output.tell()
+    state['counts'] = progress.counts
+    if archive is not None:
+        archive.flush()
+        state['images_offset'] = archive.offset
+    save_checkpoint(path, state)
+
+
+class Importer:
+    def __init__(self, images=None):
+        self.images = ImageArchiveReader(images) if images else None
+        self.password = make_password(None)
+        self.saved = []
+
+    def load(self, kind, records, state):
+        """Загружает пачку одной транзакцией.
+
+        Если транзакция откатилась, картинки пачки удаляются из
+        хранилища, чтобы повтор не оставил их копии без постов.
+        """
+        self.saved = []
+        try:
+            with transaction.atomic():
+                getattr(self, 'load_' + kind)(records, state)
+        except BaseException:
+            for name in self.saved:
+                default_storage.delete(name)
+            raise
+
+    def user_ids(self, usernames):
+        return dict(
+            User.objects.filter(username__in=set(usernames))
+            .values_list('username', 'pk'))
+
+    def group_ids(self, slugs):
+        return dict(
+            Group.objects.filter(slug__in=set(slugs) - {None})
+            .values_list('slug', 'pk'))
+
+    def load_group(self, records, state):
+        Group.objects.bulk_create([
+            Group(
+                slug=record['slug'],
+                title=record['title'],
+                description=record['description'],
+            )
+            for record in records
+        ], ignore_conflicts=True)
+
+    def load_user(self, records, state):
+        User.objects.bulk_create([
+            User(
+                username=record['username'],
+                first_name=record['first_name'],
+                last_name=record['last_name'],
+                password=self.password,
+            )
+            for record in records
+        ], ignore_conflicts=True)
+
+    def load_post(self, records, state):
+        authors = self.user_ids(record['author'] for record in records)
+        groups = self.group_ids(record['group'] for record in records)
+        # Посты, записанные до сбоя перед сохранением отметки, уже есть
+        # в базе: их картинки второй раз не сохраняются.
+        loaded = set(Post.objects.filter(pk__in=[
+            record['id'] + state['post_offset'] for record in records
+        ]).values_list('pk', flat=True))
+        posts = []
+        for record in records:
+            if record['id'] + state['post_offset'] in loaded:
+                continue
+            image = record['image']
+            if image:
+                image = self.images.save(image) if self.images else ''
+            if image:
+                self.saved.append(image)
+            posts.append(Post(
+                pk=record['id'] + state['post_offset'],
+                author_id=authors[record['author']],
+                group_id=groups.get(record['group']),
+                text=record['text'],
+                pub_date=parse_datetime(record['pub_date']),
+                modified=parse_datetime(record['modified']),
+                image=image,
+            ))
+        with explicit_dates(Post, 'pub_date', 'modified'):
+            Post.objects.bulk_create(posts, ignore_conflicts=True)
+
+    def load_comment(self, records, state):
+        authors = self.user_ids(record['author'] for record in records)
+        comments = [
+            Comment(
+                pk=record['id'] + state['comment_offset'],
+                post_id=record['post'] + state['post_offset'],
+                author_id=authors[record['author']],
+                text=record['text'],
+                created=parse_datetime(record['created']),
+            )
+            for record in records
+        ]
+        with explicit_dates(Comment, 'created'):
+            Comment.objects.bulk_create(comments, ignore_conflicts=True)
+
+    def load_follow(self, records, state):
+        users = self.user_ids(
+            name for record in records
+            for name in (record['user'], record['author']))
+        Follow.objects.bulk_create([
+            Follow(
+                user_id=users[record['user']],
+                author_id=users[record['author']],
+            )
+            for record in records
+        ], ignore_conflicts=True)
+
+    def close(self):
+        if self.images is not None:
+            self.images.close()
+
+
+def _last_pk(model):
+    return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+def _read_batches(source, batch_size):
+    """Пачки записей одного типа и позиция файла после каждой пачки."""
+    kind, batch = None, []
+    for line in iter(source.readline, b''):
+        record = json.loads(line)
+        if batch and (record['type'] != kind or len(batch) == batch_size):
+            yield kind, batch, source.tell() - len(line)
+            batch = []
+        kind = record['type']
+        batch.append(record)
+    if batch:
+        yield kind, batch, source.tell()
+
+
+def load(path, images=None, batch_size=1000, report=None):
+    """Загружает выгрузку path и пересчитывает производные данные.
+
+    id постов и комментариев сдвигаются на наибольший id в базе перед
+    загрузкой, поэтому непустая база не мешает загрузке.
+    """
+    state = load_checkpoint(path) or {
+        'offset': 0,
+        'post_offset': _last_pk(Post),
+        'comment_offset': _last_pk(Comment),
+        'counts': {},
+    }
+    progress = Progress(state['counts'], report)
+    importer = Importer(images)
+    try:
+        with open(path, 'rb') as source:
+            source.seek(state['offset'])
+            for kind, records, offset in _read_batches(source, batch_size):
+                importer.load(kind, records, state)
+                state['offset'] = offset
+                progress.add(kind, len(records))
+                state['counts'] = progress.counts
+                save_checkpoint(path, state)
+    finally:
+        importer.close()
+    rebuild_derived(batch_size)
+    remove_checkpoint(path)
+    return progress.counts
+
+
+def rebuild_derived(batch_size=1000):
+    """Производные данные после вставки в обход сигналов."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+                no_style(), [Post, Comment]):
+            cursor.execute(sql)
+    counters.recount_users(batch_size)
+    counters.recount_comments(batch_size)
+    # Каждая пачка пишется своей транзакцией, чтобы после большого
+    # импорта запись на сайте не ждала пересборки целиком.
+    timeline.rebuild()
+    trending.rebuild(batch_size)
+    search.rebuild()
+    recommendations.reset()
+    freshness.touch(freshness.SITE, freshness.NAMES)
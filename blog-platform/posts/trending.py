@@ -0,0 +1,218 @@
+"""Популярные посты: рейтинг по затухающей во времени активности.
+
+Публикация, просмотр, комментарий и новый подписчик автора добавляют
+посту вес, который вдвое теряет значимость за ``TRENDING_HALF_LIFE``
+секунд. Вместо того чтобы уменьшать все рейтинги со временем, новые
+события растут в цене: событие в момент t весит
+``weight * 2 ** ((t - EPOCH) / TRENDING_HALF_LIFE)``. Порядок постов
+при этом тот же, а хранимый рейтинг меняется только при новых
+событиях. ``PostScore.score`` хранит log2 суммы весов, чтобы числа не
+переполнялись.
+
+События копятся в памяти процесса и не чаще раза в
+``TRENDING_FLUSH_INTERVAL`` секунд или по ``TRENDING_BATCH_SIZE``
+событий уходят одной фоновой задачей, которая пишет рейтинги пачкой.
+Срок проверяется после каждого запроса, а остаток записывается при
+выходе процесса.
+Страница популярного читает индекс (score, post) или
+(group, score, post) с keyset-пагинацией, поэтому её стоимость
+зависит только от размера страницы.
+"""
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+
+from core import db
+from core.background import run_in_background
+from django.conf import settings
+
+from .models import Comment, Post, PostScore
+from .utils import batches
+
+logger = logging.getLogger(__name__)
+
+TRENDING_ORDERING = ('-score', '-post_id')
+
+# 2020-01-01 00:00 UTC: точка отсчёта роста весов.
+EPOCH = 1577836800
+
+PUBLISH = 1
+VIEW = 1
+COMMENT = 5
+FOLLOW = 10
+
+
+def log_weight(weight, timestamp):
+    """log2 веса события в момент timestamp."""
+    return (
+        math.log2(weight)
+        + (timestamp - EPOCH) / settings.TRENDING_HALF_LIFE)
+
+
+def log_add(first, second):
+    """log2(2 ** first + 2 ** second) без переполнения."""
+    if first is None:
+        return second
+    high, low = max(first, second), min(first, second)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+class Buffer:
+    """События одного процесса, ещё не записанные в базу."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.posts = {}
+        self.authors = {}
+        self.size = 0
+        self.flushed = time.monotonic()
+
+    def add(self, target, key, score):
+        with self.lock:
+            if self.pid != os.getpid():
+                # Процесс создан fork: события родителя запишет он сам.
+                self.reset()
+            events = getattr(self, target)
+            events[key] = log_add(events.get(key), score)
+            self.size += 1
+
+    def take(self, force=False):
+        """Забирает накопленное, если пора записывать, иначе None."""
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+            due = (
+                self.size >= settings.TRENDING_BATCH_SIZE
+                or time.monotonic() - self.flushed
+                >= settings.TRENDING_FLUSH_INTERVAL)
+            if not self.size or not (force or due):
+                return None
+            events = self.posts, self.authors
+            self.reset()
+            return events
+
+
+_buffer = Buffer()
+
+
+def record(post_id, weight):
+    """Засчитывает посту событие с весом weight."""
+    _buffer.add('posts', post_id, log_weight(weight, time.time()))
+    flush()
+
+
+def record_follow(author_id):
+    """Засчитывает нового подписчика последним постам автора."""
+    _buffer.add('authors', author_id, log_weight(FOLLOW, time.time()))
+    flush()
+
+
+def flush(force=False):
+    events = _buffer.take(force)
+    if events is not None:
+        # Пары, а не словари: ключи словаря в JSON стали бы строками.
+        posts, authors = events
+        run_in_background(apply, list(posts.items()), list(authors.items()))
+
+
+def flush_at_exit():
+    try:
+        flush(force=True)
+    except Exception:
+        logger.exception('Trending events lost at exit')
+
+
+atexit.register(flush_at_exit)
+
+
+def apply(posts, authors):
+    """Прибавляет накопленные события к рейтингам постов."""
+    posts = dict(posts)
+    for author_id, score in dict(authors).items():
+        recent = (
+            Post.objects.filter(author_id=author_id)
+            .order_by('-pub_date')
+            .values_list('pk', flat=True)
+            [:settings.TRENDING_FOLLOW_POSTS]
+        )
+        for post_id in recent:
+            posts[post_id] = log_add(posts.get(post_id), score)
+    for batch in batches(posts.items(), settings.TRENDING_BATCH_SIZE):
+        db.write(_store, dict(batch))
+
+
+def _store(posts):
+    existing = PostScore.objects.in_bulk(list(posts))
+    groups = dict(
+        Post.objects.filter(pk__in=set(posts) - set(existing))
+        .values_list('pk', 'group_id')
+    )
+    for post_id, row in existing.items():
+        row.score = log_add(row.score, posts[post_id])
+    PostScore.objects.bulk_update(existing.values(), ['score'])
+    PostScore.objects.bulk_create([
+        PostScore(post_id=post_id, group_id=group_id, score=posts[post_id])
+        for post_id, group_id in groups.items()
+    ])
+
+
+def move(post_id, group_id):
+    """Переносит рейтинг поста в другую группу."""
+    PostScore.objects.filter(post_id=post_id).update(group_id=group_id)
+
+
+def scores(group=None):
+    rows = PostScore.objects.select_related('post__author', 'post__group')
+    if group is not None:
+        rows = rows.filter(group=group)
+    return rows
+
+
+def rebuild(batch_size=1000):
+    """Пересчитывает рейтинги по датам постов и комментариев.
+
+    Посты обходятся диапазонами первичного ключа по batch_size, и каждый
+    диапазон записывается своей транзакцией, поэтому память не растёт
+    с таблицей, а запись не блокируется надолго. Просмотры и подписки
+    не хранятся, поэтому после пересчёта их вклад пропадает.
+    """
+    rebuilt = 0
+    last = 0
+    while True:
+        batch = list(
+            Post.objects.filter(pk__gt=last).order_by('pk')
+            .values_list('pk', 'group_id', 'pub_date')[:batch_size])
+        if not batch:
+            break
+        db.write(_rebuild_range, last, batch)
+        last = batch[-1][0]
+        rebuilt += len(batch)
+    PostScore.objects.filter(post_id__gt=last).delete()
+    return rebuilt
+
+
+def _rebuild_range(after, batch):
+    last = batch[-1][0]
+    posts = {
+        post_id: log_weight(PUBLISH, pub_date.timestamp())
+        for post_id, _, pub_date in batch}
+    comments = Comment.objects.filter(
+        post_id__gt=after, post_id__lte=last).values_list(
+        'post_id', 'created')
+    for post_id, created in comments.iterator():
+        # Пост мог появиться или исчезнуть после чтения диапазона.
+        if post_id in posts:
+            posts[post_id] = log_add(
+                posts[post_id], log_weight(COMMENT, created.timestamp()))
+    PostScore.objects.filter(post_id__gt=after, post_id__lte=last).delete()
+    PostScore.objects.bulk_create([
+        PostScore(post_id=post_id, group_id=group_id, score=posts[post_id])
+        for post_id, group_id, _ in batch
+    ])
@@ -6,13 +6,36 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('feed/<str:feed_format>/', views.feed, name='feed'),
+    path('popular/', views.popular, name='popular'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/popular/',
+         views.group_popular,
+         name='group_popular'),
+    path('group/<slug:slug>/feed/<str:feed_format>/',
+         views.group_feed,
+         name='group_feed'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/followers/',
+         views.followers,
+         name='followers'),
+    path('profile/<str:username>/following/',
+         views.following,
+         name='following'),
+    path('profile/<str:username>/feed/<str:feed_format>/',
+         views.profile_feed,
+         name='profile_feed'),
+    path('search/', views.post_search, name='search'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/', views.add_comment, name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('inbox/', views.inbox, name='inbox'),
+    path('inbox/read/', views.inbox_read, name='inbox_read'),
     path('profile/<str:username>/follow/',
          views.profile_follow,
          name='profile_follow'),
@@ -1,10 +1,259 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import json
+from contextlib import contextmanager
+from datetime import date
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
 
+POST_ORDERING = ('-pub_date', '-pk')
+COMMENT_ORDERING = ('created', 'pk')
+FOLLOW_ORDERING = ('-pk',)
 
-def paginate(request, post_list):
-    paginator = Paginator(post_list, settings.NUMBER_OF_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+CURSOR_PARAM = 'cursor'
+PAGE_PARAM = 'page'
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+# Старые ссылки ?page=N дальше этой страницы упираются в неё: OFFSET
+# глубже стоит слишком дорого, а огромный номер не влезает в запрос.
+MAX_PAGE = 1000
+# Целые вне 64 бит SQLite не принимает в параметрах запроса.
+MAX_INT = 2 ** 63 - 1
+
+
+class CursorPage:
+    """Страница keyset-пагинации.
+
+    Повторяет ту часть интерфейса ``django.core.paginator.Page``,
+    которой пользуются шаблоны, но вместо номеров страниц хранит
+    курсоры соседних страниц.
+    """
+
+    def __init__(self, object_list, querydict, next_cursor=None,
+                 previous_cursor=None, last_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.last_cursor = last_cursor
+        self._querydict = querydict
+
+    def __repr__(self):
+        return '<CursorPage %s>' % self.next_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _querystring(self, cursor):
+        querydict = self._querydict.copy()
+        querydict.pop(PAGE_PARAM, None)
+        querydict.pop(CURSOR_PARAM, None)
+        if cursor is not None:
+            querydict[CURSOR_PARAM] = cursor
+        return querydict.urlencode()
+
+    @property
+    def first_querystring(self):
+        return self._querystring(None)
+
+    @property
+    def last_querystring(self):
+        return self._querystring(self.last_cursor)
+
+    @property
+    def next_querystring(self):
+        return self._querystring(self.next_cursor)
+
+    @property
+    def previous_querystring(self):
+        return self._querystring(self.previous_cursor)
+
+
+def encode_cursor(direction, values=()):
+    raw = [direction] + [
+        value.isoformat() if isinstance(value, date) else value
+        for value in values
+    ]
+    data = json.dumps(raw, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает пару (направление, значения) или None."""
+    try:
+        data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        raw = json.loads(data.decode())
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(raw, list) or raw[:1] not in ([NEXT], [PREVIOUS]):
+        return None
+    return raw[0], raw[1:]
+
+
+def batches(iterable, size):
+    """Разбивает iterable на списки длиной не больше size."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@contextmanager
+def explicit_dates(model, *names):
+    """Отключает auto_now и auto_now_add, чтобы задать даты вручную."""
+    fields = [model._meta.get_field(name) for name in names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _key_name(field):
+    return field.lstrip('-')
+
+
+def _reversed_ordering(ordering):
+    return [
+        field[1:] if field.startswith('-') else '-' + field
+        for field in ordering
+    ]
+
+
+def _to_python(object_list, ordering, values):
+    if not isinstance(object_list, QuerySet):
+        return object_list.to_python(ordering, values)
+    opts = object_list.model._meta
+    result = []
+    for field, value in zip(ordering, values):
+        name = _key_name(field)
+        model_field = opts.pk if name == 'pk' else opts.get_field(name)
+        result.append(model_field.to_python(value))
+    return result
+
+
+def _valid_key(values):
+    """Годятся ли значения курсора в параметры запроса SQLite."""
+    for value in values:
+        if value is None:
+            return False
+        if isinstance(value, int) and not -MAX_INT <= value <= MAX_INT:
+            return False
+    return True
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """Условие «строго после values» для заданного порядка ключей."""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = _key_name(field)
+        descending = field.startswith('-') != reverse
+        lookup = '%s__%s' % (name, 'lt' if descending else 'gt')
+        condition |= Q(**equal, **{lookup: value})
+        equal[name] = value
+    return condition
+
+
+def keyset_slice(queryset, ordering, values=None, reverse=False,
+                 offset=0, limit=None):
+    if values:
+        queryset = queryset.filter(keyset_filter(ordering, values, reverse))
+    if reverse:
+        ordering = _reversed_ordering(ordering)
+    return list(queryset.order_by(*ordering)[offset:offset + limit])
+
+
+def key_values(obj, ordering):
+    if isinstance(obj, dict):
+        return [obj[_key_name(field)] for field in ordering]
+    return [getattr(obj, _key_name(field)) for field in ordering]
+
+
+def _requested_page(request, per_page):
+    cursor = decode_cursor(request.GET.get(CURSOR_PARAM, ''))
+    if cursor is not None:
+        direction, values = cursor
+        return direction, values, 0
+    try:
+        number = min(max(int(request.GET.get(PAGE_PARAM, 1)), 1), MAX_PAGE)
+    except ValueError:
+        number = 1
+    return NEXT, [], (number - 1) * per_page
+
+
+def paginate(request, object_list, ordering=POST_ORDERING, per_page=None):
+    """Keyset-пагинация по ключам ordering.
+
+    Страница выбирается курсором ``?cursor=``, который указывает на
+    соседнюю запись, поэтому глубина страницы не влияет на стоимость
+    запроса, а новые записи не сдвигают уже открытую ленту. Старые
+    ссылки ``?page=N`` продолжают работать через OFFSET без COUNT(*).
+
+    Помимо QuerySet, object_list может быть любым объектом с методами
+    ``keyset_slice(ordering, values, reverse, offset, limit)`` и
+    ``to_python(ordering, values)``.
+    """
+    per_page = per_page or settings.NUMBER_OF_POSTS
+    direction, values, offset = _requested_page(request, per_page)
+    reverse = direction == PREVIOUS
+    if values:
+        try:
+            if len(values) != len(ordering):
+                raise ValueError('Cursor does not match ordering')
+            values = _to_python(object_list, ordering, values)
+        except (ValidationError, TypeError, ValueError, OverflowError):
+            values = None
+        if values is None or not _valid_key(values):
+            values, reverse, offset = [], False, 0
+    if isinstance(object_list, QuerySet):
+        rows = keyset_slice(
+            object_list, ordering, values, reverse, offset, per_page + 1)
+    else:
+        rows = object_list.keyset_slice(
+            ordering, values, reverse, offset, per_page + 1)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if reverse:
+        rows.reverse()
+        has_next, has_previous = bool(values), has_more
+    else:
+        has_next, has_previous = has_more, bool(values or offset)
+    next_cursor = previous_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(NEXT, key_values(rows[-1], ordering))
+    if rows and has_previous:
+        previous_cursor = encode_cursor(
+            PREVIOUS, key_values(rows[0], ordering))
+    return CursorPage(
+        rows,
+        request.GET,
+        next_cursor=next_cursor,
+        previous_cursor=previous_cursor,
+        last_cursor=encode_cursor(PREVIOUS),
+    )
@@ -1,13 +1,65 @@
+from core import db
+from core.throttle import throttle
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
 
+from . import (counters, freshness, images, notifications, recommendations,
+               search, syndication, timeline, trending)
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
-from .utils import paginate
+from .utils import COMMENT_ORDERING, FOLLOW_ORDERING, paginate
 
 
+def page_state(request, *scopes, vary=()):
+    """Версия страницы для текущего посетителя.
+
+    Страница зависит от вошедшего пользователя и числа его
+    непрочитанных в шапке, а форма комментария — от CSRF-cookie,
+    поэтому всё это входит в версию вместе с vary.
+    """
+    unread = 0
+    if request.user.is_authenticated:
+        unread = notifications.unread_count(request.user)
+    return freshness.state(
+        freshness.NAMES, *scopes,
+        vary=(request.user.pk, unread,
+              request.COOKIES.get(settings.CSRF_COOKIE_NAME), *vary))
+
+
+def index_state(request):
+    return page_state(request, freshness.SITE)
+
+
+def group_state(request, slug):
+    return page_state(request, freshness.group(slug))
+
+
+def profile_state(request, username):
+    # Рекомендации меняются с чужими подписками, а не с профилем автора.
+    return page_state(
+        request, freshness.author(username),
+        vary=(recommendations.suggestions_for(request.user),))
+
+
+def post_state(request, post_id):
+    username = Post.objects.filter(pk=post_id).values_list(
+        'author__username', flat=True).first()
+    if username is None:
+        return None
+    # Просмотр засчитывается и тогда, когда страница ответит 304.
+    trending.record(post_id, trending.VIEW)
+    return page_state(
+        request, freshness.post(post_id), freshness.author(username))
+
+
+def comments_state(request, post_id):
+    return freshness.state(freshness.post(post_id), freshness.NAMES)
+
+
+@freshness.conditional(index_state)
 def index(request):
-    post_list = Post.objects.select_related('group').all()
+    post_list = Post.objects.select_related('author', 'group')
     page_obj = paginate(request, post_list)
     context = {
         'page_obj': page_obj,
@@ -15,9 +67,10 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@freshness.conditional(group_state)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.filter(group=group)
+    post_list = Post.objects.filter(group=group).select_related('author')
     page_obj = paginate(request, post_list)
     context = {
         'group': group,
@@ -26,10 +79,13 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@freshness.conditional(profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author=author)
-    posts_count = author.posts.count()
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username)
+    post_list = Post.objects.filter(author=author).select_related(
+        'author', 'group')
+    counter = counters.get_user_counter(author)
     page_obj = paginate(request, post_list)
     if request.user.is_authenticated:
         following = Follow.objects.filter(
@@ -39,18 +95,123 @@ def profile(request, username):
         following = False
     context = {
         'author': author,
-        'posts_count': posts_count,
+        'posts_count': counter.posts_count,
+        'counter': counter,
         'page_obj': page_obj,
         'following': following,
+        'suggestions': recommendations.suggestions_for(request.user),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def popular(request):
+    page_obj = paginate(
+        request,
+        trending.scores(),
+        ordering=trending.TRENDING_ORDERING,
+    )
+    page_obj.object_list = [score.post for score in page_obj]
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/popular.html', context)
+
+
+def group_popular(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    page_obj = paginate(
+        request,
+        trending.scores(group),
+        ordering=trending.TRENDING_ORDERING,
+    )
+    page_obj.object_list = [score.post for score in page_obj]
+    context = {
+        'group': group,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/popular.html', context)
+
+
+def followers(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username)
+    page_obj = paginate(
+        request,
+        Follow.objects.filter(author=author).select_related('user'),
+        ordering=FOLLOW_ORDERING,
+        per_page=settings.NUMBER_OF_FOLLOWS,
+    )
+    page_obj.object_list = [follow.user for follow in page_obj]
+    context = {
+        'author': author,
+        'title': 'Подписчики',
+        'count': counters.get_user_counter(author).followers_count,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+def following(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username)
+    page_obj = paginate(
+        request,
+        Follow.objects.filter(user=author).select_related('author'),
+        ordering=FOLLOW_ORDERING,
+        per_page=settings.NUMBER_OF_FOLLOWS,
+    )
+    page_obj.object_list = [follow.author for follow in page_obj]
+    context = {
+        'author': author,
+        'title': 'Подписки',
+        'count': counters.get_user_counter(author).following_count,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+@freshness.conditional(syndication.state)
+def feed(request, feed_format):
+    return syndication.feed_response(
+        request, feed_format, 'site', syndication.site_source)
+
+
+@freshness.conditional(syndication.state)
+def group_feed(request, slug, feed_format):
+    return syndication.feed_response(
+        request, feed_format, 'group:%s' % slug,
+        lambda: syndication.group_source(slug))
+
+
+@freshness.conditional(syndication.state)
+def profile_feed(request, username, feed_format):
+    return syndication.feed_response(
+        request, feed_format, 'profile:%s' % username,
+        lambda: syndication.profile_source(username))
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = paginate(
+        request,
+        search.PostSearch(query),
+        ordering=search.SEARCH_ORDERING,
+    )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@freshness.conditional(post_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'),
+        pk=post_id)
     form = CommentForm()
-    comments = post.comments.all()
-    posts_count = post.author.posts.count()
+    comments = comments_page(request, post)
+    posts_count = counters.get_user_counter(post.author).posts_count
     context = {
         'post': post,
         'posts_count': posts_count,
@@ -60,7 +221,34 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_page(request, post):
+    return paginate(
+        request,
+        post.comments.select_related('author'),
+        ordering=COMMENT_ORDERING,
+        per_page=settings.NUMBER_OF_COMMENTS,
+    )
+
+
+@freshness.conditional(comments_state)
+def post_comments(request, post_id):
+    """Следующая страница комментариев для подгрузки на странице поста."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': comments_page(request, post),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+def save_post(post, image_changed=True):
+    post.save()
+    if image_changed:
+        images.schedule(post)
+
+
 @login_required
+@throttle('post')
 def post_create(request):
     is_edit = False
     form = PostForm(
@@ -69,7 +257,7 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        db.write(save_post, post)
         return redirect('posts:profile', request.user)
     return render(request, 'posts/create_post.html',
                            {'form': form},
@@ -78,15 +266,20 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    post = get_object_or_404(
+        Post.objects.select_related('author'), pk=post_id)
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post_id=post.pk)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
         instance=post)
     if form.is_valid():
-        post.save()
+        image_changed = 'image' in form.changed_data
+        if image_changed:
+            post.image_width = post.image_height = None
+            post.image_variants = ''
+        db.write(save_post, post, image_changed)
         return redirect('posts:post_detail', post_id=post.pk)
     context = {
         'post': post,
@@ -97,6 +290,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@throttle('comment')
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -104,33 +298,61 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        db.write(comment.save)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginate(request, post_list)
+    page_obj = paginate(
+        request,
+        timeline.entries_for(request.user),
+        ordering=timeline.TIMELINE_ORDERING,
+    )
+    page_obj.object_list = [entry.post for entry in page_obj]
     context = {
         'page_obj': page_obj,
+        'suggestions': recommendations.suggestions_for(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+def inbox(request):
+    page_obj = paginate(
+        request,
+        notifications.inbox(request.user),
+        ordering=notifications.NOTIFICATION_ORDERING,
+    )
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/inbox.html', context)
+
+
+@login_required
+def inbox_read(request):
+    if request.method == 'POST':
+        notifications.mark_read(request.user)
+    return redirect('posts:inbox')
+
+
+@login_required
+@throttle('follow', methods=('GET', 'POST'))
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        Follow.objects.get_or_create(author=author, user=request.user)
+        db.write(
+            Follow.objects.get_or_create, author=author, user=request.user)
     return redirect('posts:profile', username)
 
 
 @login_required
+@throttle('follow', methods=('GET', 'POST'))
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     follower = Follow.objects.filter(
         author=author,
         user=request.user,)
-    follower.delete()
+    db.write(follower.delete)
     return redirect('posts:profile', username)
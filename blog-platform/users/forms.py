@@ -1,6 +1,9 @@
-from django.contrib.auth.forms import UserCreationForm
+from core.background import run_in_background
 from django.contrib.auth import get_user_model
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
+from django.contrib.sites.shortcuts import get_current_site
 
+from .tasks import send_password_reset
 
 User = get_user_model()
 
@@ -9,3 +12,30 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Письмо сброса пароля отправляется фоновой задачей.
+
+    В очередь попадают только id пользователя и адрес: токен и текст
+    письма создаёт задача.
+    """
+
+    def save(self, domain_override=None,
+             subject_template_name='registration/password_reset_subject.txt',
+             email_template_name='registration/password_reset_email.html',
+             use_https=False, token_generator=None, from_email=None,
+             request=None, html_email_template_name=None,
+             extra_email_context=None):
+        if domain_override:
+            site_name = domain = domain_override
+        else:
+            site = get_current_site(request)
+            site_name, domain = site.name, site.domain
+        email_field_name = User.get_email_field_name()
+        for user in self.get_users(self.cleaned_data['email']):
+            run_in_background(
+                send_password_reset, user.pk,
+                getattr(user, email_field_name), domain, site_name,
+                use_https, from_email, subject_template_name,
+                email_template_name, html_email_template_name)